@@ -3,32 +3,70 @@
 # 导入标准库
 import os
 import re
+import sys
 import time
 import json
+import math
+import atexit
+import gzip
+import queue
+import base64
+import socket
+import sqlite3
+import hashlib
 import logging
+import logging.handlers
+import functools
+import threading
+import importlib
+import importlib.util
+import unicodedata
+from html.parser import HTMLParser
+from urllib.parse import urlsplit, unquote
 from itertools import combinations
-from collections import defaultdict
+from collections import defaultdict, OrderedDict, Counter, deque
+from concurrent.futures import ThreadPoolExecutor
 
 # 导入第三方库
-import pyautogui
-import pyperclip
-from airtest.core.cv import Template
-import numpy as np
-import cv2
+# pyautogui / airtest / numpy / cv2 的导入需要数百毫秒，且 pyautogui 在没有桌面的环境中会直接报错。
+# 这里只创建延迟导入的代理，第一次真正使用时才导入，这样工具脚本和基准测试可以快速导入解析/题库函数。
+class _LazyModule:
+    """模块代理：第一次访问属性时才导入真正的模块。"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+def _module_available(name):
+    """判断模块是否可以导入，但不真正导入它。"""
+    if name in sys.modules:
+        return True
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+pyautogui = _LazyModule("pyautogui")
+pyperclip = _LazyModule("pyperclip")
+airtest_cv = _LazyModule("airtest.core.cv")  # 使用 airtest_cv.Template
+np = _LazyModule("numpy")
+cv2 = _LazyModule("cv2")
 
 # ============================ 新增依赖库导入 (可选，但强烈推荐) ============================
-try:
-    # 导入用于访问Windows剪贴板高级格式 (HTML) 的库
-    import win32clipboard
-    # 导入用于解析HTML内容的库
-    from bs4 import BeautifulSoup
-    # 标记为Windows环境，可以启用高级功能
-    IS_WINDOWS = True
-except ImportError:
-    # 如果缺少库，则标记为非Windows环境，并禁用相关功能
-    IS_WINDOWS = False
-    print("警告：未找到 'pywin32' 或 'beautifulsoup4' 库。基于HTML的题目内容和选中状态验证功能将不可用。")
-    print("请运行 'pip install pywin32 beautifulsoup4' 来安装这些库以获得最佳体验。")
+# 用于访问Windows剪贴板高级格式 (HTML) 的库。可用时标记为Windows环境，启用高级功能
+win32clipboard = _LazyModule("win32clipboard")
+IS_WINDOWS = _module_available("win32clipboard")
+
+# 用于解析HTML内容的库。默认使用内置的快速解析器，BeautifulSoup 仅作为备用方案。
+bs4 = _LazyModule("bs4")
+HAS_BS4 = _module_available("bs4")
 # =========================================================================================
 
 
@@ -36,41 +74,120 @@ except ImportError:
 # 使用当前时间戳为本次运行创建唯一的标识符
 RUN_TIMESTAMP = time.strftime('%Y%m%d_%H%M%S')
 
-# 日志文件存放目录
+# 日志文件存放目录 (目录和日志文件在 setup_runtime() 中创建)
 LOG_DIR = "logs"
-if not os.path.exists(LOG_DIR): os.makedirs(LOG_DIR)
 LOG_FILE_PATH = os.path.join(LOG_DIR, f"{RUN_TIMESTAMP}.log")
+# 各阶段计时区间 (JSONL)，与日志文件放在一起，可用 tools/report_spans.py 汇总
+SPANS_FILE_PATH = os.path.join(LOG_DIR, f"{RUN_TIMESTAMP}_spans.jsonl")
 
 # 截图文件存放基础目录
 SCREENSHOT_BASE_DIR = "screenshots"
 # 为本次运行创建一个单独的截图文件夹，方便管理和回溯
 SCREENSHOT_RUN_DIR = os.path.join(SCREENSHOT_BASE_DIR, RUN_TIMESTAMP)
-if not os.path.exists(SCREENSHOT_RUN_DIR): os.makedirs(SCREENSHOT_RUN_DIR)
 
 # 全局变量，用于在程序运行期间存储数据
 solved_questions = {}  # 存储本次运行成功解答的题目及其答案
 qa_bank = {}           # 存储从文件中加载的题库数据
+qa_bank_index = {}     # 题库索引: (规范化问题, 规范化选项frozenset) -> 答案文本列表
+qa_bank_questions = set()  # 题库中所有规范化后的问题文本，用于区分"新题"和"新变种"
+qa_bank_eliminated = {}  # 已排除的错误组合: (规范化问题, 规范化选项frozenset) -> {combo_key(组合选项文本), ...}
+answer_prior = {}      # 从题库中统计出的多选题答案先验，用于决定遍历组合的尝试顺序
+qa_bank_store = None   # QA_BANK_BACKEND = 'SQLITE' 时的 SQLiteQABank 实例
+run_stats = defaultdict(float)       # 本次运行累计的性能统计 (当前题目的统计保存在各会话的 question_stats 中)
 
 # ==================== 日志配置 START ====================
 # 获取一个日志记录器实例
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO) # 设置日志记录的最低级别为INFO
 
-# 防止重复添加处理器
-if not logger.handlers:
+
+LOG_TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+_log_handlers = []     # 实际输出日志的文件和控制台处理器 (LOG_ASYNC 时由后台线程调用)
+_log_listener = None   # LOG_ASYNC 时的 QueueListener
+
+class CompactLogFormatter(logging.Formatter):
+    """LOG_FORMAT = 'JSON' 时使用的格式：每条日志一行JSON，便于用脚本筛选和统计。"""
+
+    def format(self, record):
+        entry = {"t": round(record.created, 3), "level": record.levelname, "logger": record.name,
+                 "thread": record.threadName, "msg": record.getMessage()}
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+class _LogQueueHandler(logging.handlers.QueueHandler):
+    """
+    LOG_ASYNC 时使用的队列处理器。标准的 QueueHandler 放入队列前会把异常堆栈拼接进消息文本，
+    JSON 格式的日志就无法把它放在单独的 exc 字段中；这里只合并消息参数，异常堆栈留给输出处理器各自的格式化器。
+    """
+
+    def format(self, record):
+        return record.getMessage()
+
+    def prepare(self, record):
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = logging.Formatter().formatException(record.exc_info)
+        stack_info = record.stack_info
+        record = super().prepare(record)
+        record.exc_text, record.stack_info = exc_text, stack_info
+        return record
+
+def apply_log_levels():
+    """按 LOG_LEVELS 设置各模块日志记录器的级别。第三方库 (如 airtest) 在导入时会重设自己的级别，因此加载模板后会再调用一次。"""
+    for name, level in LOG_LEVELS.items():
+        logging.getLogger(name).setLevel(level)
+
+def setup_logging():
+    """
+    创建日志目录，并为日志记录器添加文件和控制台处理器 (只在第一次调用时添加)。
+    LOG_ASYNC 为 True 时，日志记录器上只有一个 QueueHandler，答题线程只需把日志放入队列，
+    格式化和写文件/控制台都在 QueueListener 的后台线程中进行。
+    """
+    global LOG_FILE_PATH, _log_listener
+    # 防止重复添加处理器
+    if logger.handlers:
+        return
+    if not os.path.exists(LOG_DIR): os.makedirs(LOG_DIR)
+    LOG_FILE_PATH = os.path.join(LOG_DIR, f"{RUN_TIMESTAMP}.jsonl" if LOG_FORMAT == 'JSON' else f"{RUN_TIMESTAMP}.log")
     # 创建一个文件处理器，用于将日志写入文件
     file_handler = logging.FileHandler(LOG_FILE_PATH, mode='w', encoding='utf-8')
     # 创建一个控制台处理器，用于将日志输出到屏幕
     console_handler = logging.StreamHandler()
-    
-    # 定义日志格式
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    file_handler.setFormatter(formatter)
+    console_handler.setLevel(LOG_CONSOLE_LEVEL)
+
+    # 定义日志格式 (控制台总是使用便于阅读的文本格式)
+    formatter = logging.Formatter(LOG_TEXT_FORMAT)
+    file_handler.setFormatter(CompactLogFormatter() if LOG_FORMAT == 'JSON' else formatter)
     console_handler.setFormatter(formatter)
-    
+    _log_handlers[:] = [file_handler, console_handler]
+
     # 将处理器添加到日志记录器
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    if LOG_ASYNC:
+        _log_listener = logging.handlers.QueueListener(queue.SimpleQueue(), *_log_handlers, respect_handler_level=True)
+        _log_listener.start()
+        logger.addHandler(_LogQueueHandler(_log_listener.queue))
+        # 脚本结束 (包括 Ctrl+C) 时写完队列中剩余的日志
+        atexit.register(close_logging)
+    else:
+        for handler in _log_handlers:
+            logger.addHandler(handler)
+    apply_log_levels()
+
+def set_log_text_format(fmt):
+    """更换文本格式处理器的日志格式 (JSON 格式的日志文件不受影响)。"""
+    for handler in _log_handlers:
+        if not isinstance(handler.formatter, CompactLogFormatter):
+            handler.setFormatter(logging.Formatter(fmt))
+
+def close_logging():
+    """停止后台日志线程，写完队列中剩余的日志。可重复调用。"""
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
 # ==================== 日志配置 END ====================
 
 
@@ -88,6 +205,25 @@ SCREEN_REGION = (2959, 0, 828, 2062)
 USE_QA_BANK = True
 # 主题库文件名。脚本将从此文件加载和更新题库。
 QA_BANK_FILE = "master_qa_bank.json"
+# 题库存储后端。
+# 'JSON': 启动时把 QA_BANK_FILE 整个读入内存 (默认，适合小题库)。
+# 'SQLITE': 使用 QA_BANK_DB_FILE 中带索引的 SQLite 题库，按需查询，启动时间和内存不随题库大小增长。
+#           可用 `python tools/qa_bank_sqlite.py import` 从 JSON 题库生成。
+# 'SERVER': 连接本机的题库服务 (`python tools/qa_bank_server.py`)。同时运行多个脚本时共用一份题库，
+#           一个脚本解出的答案会立即推送给其他脚本。连接不上 (或运行中断开) 时自动回退到 'JSON' 模式。
+QA_BANK_BACKEND = 'JSON'
+QA_BANK_DB_FILE = "master_qa_bank.db"
+# 题库服务的地址 (主机, 端口) 和单次请求的超时秒数
+QA_BANK_SERVER_ADDRESS = ("127.0.0.1", 8765)
+QA_BANK_SERVER_TIMEOUT = 1.0
+# 解题日志文件名。每解出一道题就立即追加一行到本次运行目录下的此文件，即使脚本被强制结束也不会丢失答案。
+SOLUTION_JOURNAL_FILENAME = "solution_journal.jsonl"
+# 启动时是否回放以往异常中断 (没有生成 solution_map.json) 的运行留下的解题日志，使其答案立即可用。
+# 已被 merge_tool 合并过 (记录在合并清单中且之后没有变化) 的日志，以及写入时间早于题库文件的记录不会回放，
+# 否则旧答案会覆盖题库中更新的答案。
+REPLAY_SOLUTION_JOURNALS = True
+# merge_tool.py 的增量合并清单文件名，位于 SCREENSHOT_BASE_DIR 下 (与 tools/merge_tool.py 中的 MANIFEST_FILE 一致)
+MERGE_MANIFEST_FILENAME = "merge_manifest.json"
 
 # ============================ 图像识别相似度配置 ============================
 # 选项图片(如 A.png, B.png)的识别阈值。范围 0.0 ~ 1.0，值越高代表要求匹配越精确。
@@ -96,12 +232,148 @@ SIMILARITY_THRESHOLD_OPTION = 0.6
 # “提交”按钮图片的识别阈值。范围 0.0 ~ 1.0，值越高代表要求匹配越精确。根据自己屏幕清晰度来调整。
 SIMILARITY_THRESHOLD_SUBMIT = 0.6
 
+# ============================ 【新增】模板匹配区域缓存 ============================
+# 是否启用区域缓存。启用后，每个模板会记住上一次匹配到的位置，下次先在该位置附近的小窗口内搜索，
+# 找不到时才回退到整个 SCREEN_REGION 的全图搜索。选项和提交按钮位置基本固定时可大幅减少匹配耗时。
+USE_TEMPLATE_ROI_CACHE = True
+# 小窗口的半宽/半高（像素），以上次匹配到的中心点为中心。
+TEMPLATE_ROI_MARGIN = 80
+# 在小窗口内匹配时使用的最低相似度。比全图阈值更严格，避免在窗口内误匹配到相邻的其他选项标识。
+TEMPLATE_ROI_MIN_CONFIDENCE = 0.8
+
+# ============================ 【新增】选项布局校准 ============================
+# 选项总是从 A 开始等间距地排成一列。启用后，第一次完整匹配到所有选项时记住这一列的 x 坐标、行间距，
+# 以及每种选项数量下 A 的位置；之后的题目直接按布局推算各选项的坐标，只在最后一个选项的推算位置附近
+# 做一次小窗口匹配来确认。确认失败时 (例如题目文字换行使选项整体下移)，先在这一列中重新查找 A 并再次确认，
+# 仍然失败 (例如某个选项的文字换行使行距不等) 才回退到逐个模板的完整匹配。
+USE_OPTION_LAYOUT = True
+# 确认匹配的小窗口半宽/半高 (像素)，以推算的中心点为中心。需大于选项图标尺寸的一半加上 OPTION_LAYOUT_TOLERANCE。
+OPTION_LAYOUT_MARGIN = 48
+# 校准和确认时允许的坐标偏差 (像素)。
+OPTION_LAYOUT_TOLERANCE = 8
+
+# ============================ 【新增】预处理模板缓存与多尺度匹配 ============================
+# 是否使用内置的多尺度模板匹配器 (代替 airtest 的 Template.match_in)。默认关闭，仍使用 airtest。
+# 启用后，模板图片在启动时解码为灰度数组并保存在内存中，
+# 匹配时先按会话记住的缩放比例匹配；还不知道比例时先试 1.0，失败再做由粗到细的多尺度搜索，
+# 找到后在本次运行中记住这个比例。Windows 缩放 (DPI) 或窗口缩放改变后不必重新截取模板。
+# 在原始比例下两者的识别结果一致 (见 tests/test_template_matcher.py)，但相似度的计算并不完全相同，
+# 阈值 (SIMILARITY_THRESHOLD_*) 的含义也会略有不同；启用前请先用 tools/bench_template_matcher.py 在自己的截图上对比。
+USE_TEMPLATE_CACHE = False
+# 多尺度搜索的缩放比例范围 (截图中的图标尺寸 / 模板图片尺寸)。
+TEMPLATE_SCALE_MIN = 0.5
+TEMPLATE_SCALE_MAX = 2.0
+# 粗搜索在该范围内按等比间隔尝试的比例个数。粗搜索在缩小一半的图像上进行，之后在最佳比例附近细搜索。
+TEMPLATE_SCALE_STEPS = 13
+
+# ============================ 【新增】截图帧缓存 ============================
+# 是否启用截图帧缓存。启用后，在没有点击/滚动/按键操作的情况下，连续的截图请求会复用同一帧，
+# 查找提交按钮、查找选项和环境校验可以共享一次截图和一次颜色转换。
+USE_FRAME_CACHE = True
+# 缓存帧的最长有效期（秒）。超过此时间即使没有任何操作也会重新截图，以应对页面自身的动画或刷新。
+FRAME_CACHE_TTL = 0.5
+
+# ============================ 【新增】截图匹配与剪贴板读取流水线 ============================
+# 是否启用流水线模式。启用后，每轮检测先截一帧，然后在后台线程中匹配提交按钮和选项，
+# 同时主线程执行 Ctrl+A/Ctrl+C 和HTML解析，两者都完成后才开始点击。
+# 截图在按下 Ctrl+A 之前完成，全选高亮不会影响匹配；提交按钮需要滚动才能看到时仍按原流程查找。
+PIPELINE_CAPTURE_WITH_CLIPBOARD = True
+
+# ============================ 【新增】阶段计时 ============================
+# 是否记录剪贴板读取、HTML解析、截图、模板匹配、点击、滚动、提交后等待等阶段的计时区间。
+# 每个区间以一行JSON写入 logs/<时间戳>_spans.jsonl，运行结束后可用 tools/report_spans.py 生成性能报告。
+RECORD_TIMING_SPANS = True
+
+# ============================ 【新增】运行录制 ============================
+# 是否录制本次运行：剪贴板HTML片段及其解析结果、每一帧新截图、模板匹配结果、点击/滚动和提交结果都按时间顺序
+# 写入一个 gzip 压缩的归档 (screenshots/<时间戳>/run_recording.jsonl.gz)。
+# 归档可以用 tools/replay_run.py 在没有桌面的环境中回放：把录制的HTML和截图重新交给解析器、模板匹配器和解题逻辑，
+# 用来复现问题、对比解析器/匹配器改动前后的结果和耗时。录制会编码每一帧新截图，只建议在排查问题时开启。
+RECORD_RUN = False
+RUN_RECORDING_FILENAME = "run_recording.jsonl.gz"
+# 归档大小上限 (MB)。超过后不再保存截图帧，剪贴板和操作事件 (体积很小) 照常记录。
+RUN_RECORDING_MAX_MB = 200
+# 截图帧的编码格式。'.png' 无损，回放时匹配结果与录制时完全一致；'.jpg' 体积约为十分之一，但匹配分数会略有差异。
+RUN_RECORDING_FRAME_FORMAT = '.png'
+
+# ============================ 【新增】截图保存 ============================
+# 解题过程中的截图由后台线程编码并写入磁盘，答题线程只把图像放入队列，不再等待PNG编码。
+# 保存策略：
+# 'ALWAYS': 每次查找提交按钮的截图都保存 (原有行为)
+# 'ON_FAILURE': 只保存出问题时的截图 (找不到提交按钮或选项、题目多次尝试仍未解出、启动校验等)
+# 'EVERY_N': 每 SCREENSHOT_EVERY_N 张保存一张，出问题时的截图总是保存
+# 'NEVER': 不保存任何截图
+SCREENSHOT_POLICY = 'ALWAYS'
+SCREENSHOT_EVERY_N = 10
+# 保存前的缩放比例 (1.0 为原尺寸，0.5 时文件约为四分之一)
+SCREENSHOT_SCALE = 1.0
+# 保存格式: '.png' (无损) 或 '.jpg' (体积小、编码快)
+SCREENSHOT_FORMAT = '.png'
+SCREENSHOT_JPEG_QUALITY = 85
+# 后台写入队列的长度。队列满时直接丢弃新的截图 (不阻塞答题) 并计入 screenshots_dropped 统计。
+SCREENSHOT_QUEUE_SIZE = 16
+# 每个运行目录最多保留的截图数量，超过后删除最旧的截图 (0 表示不限制)。只删除截图，不影响答案文件。
+SCREENSHOT_MAX_FILES_PER_RUN = 500
+
+# ============================ 【新增】日志输出 ============================
+# 是否在后台线程中输出日志。开启后答题线程只把日志记录放入队列，不再等待写文件和控制台
+# (Windows 控制台输出带 emoji 的日志很慢)。调试时如需日志与操作严格同步，可以关闭。
+LOG_ASYNC = True
+# 日志文件格式: 'TEXT' (便于阅读) 或 'JSON' (每行一条JSON，文件名为 <时间戳>.jsonl，便于用脚本分析)
+LOG_FORMAT = 'TEXT'
+# 控制台只显示此级别及以上的日志 (日志文件不受影响)。设为 'WARNING' 可以进一步减少控制台输出。
+LOG_CONSOLE_LEVEL = 'INFO'
+# 各模块日志记录器的级别。airtest 默认输出大量 DEBUG 日志，会拖慢模板匹配。
+# 也可以在这里调整本脚本自身的级别，例如 {"auto_solver_refactored": "WARNING"} (直接运行时为 "__main__")。
+LOG_LEVELS = {"airtest": "WARNING"}
+
+# ============================ 【新增】选中状态跟踪 ============================
+# 是否跟踪选项的选中状态。每次读取剪贴板后记住当前题目的已选选项，点击 (包括提交) 或滚动后失效。
+# verify_and_click 在状态仍然有效时跳过点击前的剪贴板读取，遍历模式下每次尝试的剪贴板往返约减少一半。
+TRACK_SELECTION_STATE = True
+
+# ============================ 【新增】图片选项识别 ============================
+# 图片选项以图片URL作为选项文本，而CDN域名、防缓存参数和签名会随会话变化。
+# 因此题库匹配时，图片选项只按URL路径中的文件名比较 (例如 "img:wzry_giude_task93.png")。
+# 是否额外使用图片选项在屏幕上的截图计算感知哈希 (pHash)。启用后即使文件名也变了，只要图片内容相同仍能命中题库。
+USE_IMAGE_OPTION_PHASH = False
+# 图片URL -> 感知哈希的本地缓存文件，同一URL只需计算一次。
+IMAGE_OPTION_KEY_CACHE_FILE = "image_option_keys.json"
+# 两个感知哈希的汉明距离 (共64位) 不超过此值时视为同一张图片。
+IMAGE_OPTION_PHASH_MAX_DISTANCE = 6
+# 图片选项的截图区域，相对于选项字母图标中心的偏移 (左, 上, 右, 下)，单位像素。
+IMAGE_OPTION_CROP_BOX = (30, -50, 330, 50)
+
+# ============================ 【新增】多窗口会话 ============================
+# 同时运行多个答题窗口时，在这里列出每个窗口的投屏区域 (格式同 SCREEN_REGION)，例如：
+# SESSION_REGIONS = [(0, 0, 828, 2062), (960, 0, 828, 2062)]
+# 为空时只使用 SCREEN_REGION 单窗口运行。多窗口运行时，同一时刻只有一个会话控制鼠标和键盘，
+# 会话在提交后等待、滚动后等待等空闲时间让出控制权，所有会话共享题库，一个窗口解出的答案其他窗口立即可用。
+SESSION_REGIONS = []
+# 等待时间不少于此值 (秒) 时才让出控制权。提交后的等待总是让出。
+SESSION_MIN_YIELD_SECONDS = 0.5
+# 会话重新获得控制权、且上一个操作的是其他窗口时，先点击一次本窗口以获得键盘焦点 (Ctrl+A/Ctrl+C 发往焦点窗口)。
+# 点击位置为相对于区域宽高的比例 (x, y)，应当落在题目标题上方等点击后不会改变答题状态的位置。
+SESSION_FOCUS_POINT = (0.5, 0.02)
+
 # 滚动页面的方式。
 # 'PC_WHEEL': 模拟桌面电脑的鼠标滚轮滚动，速度快，推荐在PC端模拟器或网页上使用。
 # 'MOBILE_DRAG': 模拟手机屏幕的拖动操作（从下往上拖动以向下滚动），适用于无法使用滚轮的场景。
 # 'BOTH': 两种方式都执行一次，兼容性更强。
 SCROLL_MODE = 'PC_WHEEL'
 
+# 是否使用内置的流式HTML解析器。它只提取题号、题目和选项，读到选项列表结束即停止，
+# 比构建完整的 BeautifulSoup 文档树快得多。解析失败时会自动回退到 BeautifulSoup。
+USE_FAST_HTML_PARSER = True
+# 剪贴板解析结果缓存的容量（条）。相同的HTML片段（按内容哈希判断）直接返回缓存的解析结果，
+# 题目未变化时的轮询和点击前后内容相同的读取几乎不再产生解析开销。设置为 0 可禁用。
+CLIPBOARD_PARSE_CACHE_SIZE = 16
+
+# 多选题遍历模式下尝试组合的顺序。
+# 'PRIOR': 根据题库统计的先验 (答案个数分布、各位置正确率、选项文本是否曾是正确答案) 从最可能到最不可能依次尝试。
+# 'LEXICOGRAPHIC': 旧版行为，从2个选项的组合开始按字母顺序依次尝试。
+MULTI_CHOICE_SEARCH_ORDER = 'PRIOR'
+
 # --- 延时与重试配置 ---
 # ============================ 【新增】解题重试配置 ============================
 # 当一道题目解答失败时 (例如，所有选项都试过但题目未刷新)，允许的最大重试次数。
@@ -121,8 +393,43 @@ RETRY_DELAY_BETWEEN_ATTEMPTS = 1.5
 INITIAL_VALIDATION_DELAY = 3.0
 
 # --- 已有延时配置 ---
-# 提交答案后，等待题目刷新的固定延时（秒）。
+# 提交答案后，等待题目刷新的固定延时（秒）。仅在 ADAPTIVE_POST_SUBMIT_WAIT = False 时使用。
 FIXED_POST_SUBMIT_DELAY = 1
+
+# ============================ 【新增】界面稳定检测 ============================
+# 点击选项、滚动和激活窗口后，不再总是等满 POST_TOUCH_DELAY、DELAY_BEFORE_VERIFY_CLICK、POST_SCROLL_DELAY、
+# POST_ACTIVATION_CLICK_DELAY，而是每隔 SETTLE_POLL_INTERVAL 秒截取一次缩小的灰度画面：
+# 画面相对操作前发生变化、并且之后连续 SETTLE_STABLE_FRAMES 次与上一帧几乎相同时，即认为界面已稳定。
+# 上述固定延时作为等待上限；画面一直没有变化 (例如点击没有可见的反应) 时仍会等满上限。
+USE_SETTLE_DETECTION = True
+SETTLE_POLL_INTERVAL = 0.1
+SETTLE_STABLE_FRAMES = 2
+# 稳定检测画面的缩放比例 (越小截图后的比较越快，但太小可能看不到勾选标记之类的小变化)
+SETTLE_SCALE = 0.25
+# 两帧之间灰度差超过 SETTLE_PIXEL_DELTA 的像素 (缩小后) 不超过 SETTLE_MAX_CHANGED_PIXELS 个时，视为相同
+SETTLE_PIXEL_DELTA = 16
+SETTLE_MAX_CHANGED_PIXELS = 4
+# 只比较区域内的这一部分，格式: (左, 上, 宽, 高)，均为占区域宽/高的比例。
+# 界面中有一直在变化的动画 (会导致每次都等满上限) 时，可以用它排除动画所在的位置。None 表示整个区域。
+SETTLE_ROI = None
+
+# ============================ 【新增】提交后自适应等待配置 ============================
+# 是否启用自适应等待。启用后，提交答案后会以指数退避的间隔轮询剪贴板，
+# 一旦检测到新题目就立即返回，而不是固定等待 FIXED_POST_SUBMIT_DELAY 秒。
+ADAPTIVE_POST_SUBMIT_WAIT = True
+# 提交后第一次检查题目前的等待时间（秒）。
+POST_SUBMIT_FIRST_POLL_DELAY = 0.2
+# 每次轮询后，等待间隔乘以此系数（指数退避）。
+POST_SUBMIT_BACKOFF_FACTOR = 1.5
+# 轮询间隔的上限（秒）。
+POST_SUBMIT_MAX_POLL_INTERVAL = 0.6
+# 提交后等待题目刷新的最长时间（秒）。超过此时间仍未刷新则判定为答错。
+POST_SUBMIT_WAIT_DEADLINE = 3.0
+# 快速失败：提交后超过此时间（秒）仍读到同一道题，则先按答错处理并继续尝试下一个组合 (与固定等待 FIXED_POST_SUBMIT_DELAY 秒相同)。
+# 题目没有刷新只是超时，并不能证明答案错误，因此这次提交被记为"未确认"：尝试下一个组合前会再读一次题目 (慢刷新检查)，
+# 如果题目在此期间刷新了 (界面较慢)，就把这次提交的组合作为正确答案，也不会把它记为错误组合。
+# 实际使用的时间不会短于 FIXED_POST_SUBMIT_DELAY。None 表示关闭快速失败，一直等到 POST_SUBMIT_WAIT_DEADLINE。
+POST_SUBMIT_SAME_QUESTION_TIMEOUT = FIXED_POST_SUBMIT_DELAY
 # 每次点击选项后的等待时间（秒）。如果点击后UI反应慢，可适当增加此值。
 POST_TOUCH_DELAY = 0.6
 
@@ -171,9 +478,9 @@ STOP_AT_QUESTION_NUM = None
 # ------------------- 资源与模板定义 -------------------
 # 存放模板图片的目录 (如 option_A_1.png, option_A_2.png, option_B_1.png 等)
 TEMPLATES_DIR = "templates"
-if not os.path.exists(TEMPLATES_DIR): 
-    os.makedirs(TEMPLATES_DIR)
-    logger.warning(f"模板目录 '{TEMPLATES_DIR}' 不存在，已自动创建。请将模板图片放入其中。")
+# 模板在 setup_runtime() 中加载
+TEMPLATE_SUBMIT = None
+TEMPLATE_OPTIONS = {}
 
 def load_option_templates(directory, threshold=0.7):
     """
@@ -204,7 +511,7 @@ def load_option_templates(directory, threshold=0.7):
             option_name = match.group(1)
             full_path = os.path.join(directory, filename)
             # 使用配置的阈值创建Template对象
-            template = Template(full_path, threshold=threshold)
+            template = airtest_cv.Template(full_path, threshold=threshold)
             option_templates[option_name].append(template)
             logger.info(f"  -> 已加载模板: {filename} for Option {option_name}")
             
@@ -219,65 +526,653 @@ def load_option_templates(directory, threshold=0.7):
     logger.info("选项模板加载完成。")
     return dict(option_templates)
 
-# 使用全局配置的相似度阈值来加载模板
-TEMPLATE_SUBMIT = Template(os.path.join(TEMPLATES_DIR, "submit_button.png"), threshold=SIMILARITY_THRESHOLD_SUBMIT)
-TEMPLATE_OPTIONS = load_option_templates(TEMPLATES_DIR, threshold=SIMILARITY_THRESHOLD_OPTION)
+def load_templates():
+    """使用全局配置的相似度阈值加载提交按钮和选项模板，启用多尺度匹配器时同时把模板解码为灰度数组。"""
+    global TEMPLATE_SUBMIT, TEMPLATE_OPTIONS
+    TEMPLATE_SUBMIT = airtest_cv.Template(os.path.join(TEMPLATES_DIR, "submit_button.png"), threshold=SIMILARITY_THRESHOLD_SUBMIT)
+    TEMPLATE_OPTIONS = load_option_templates(TEMPLATES_DIR, threshold=SIMILARITY_THRESHOLD_OPTION)
+    if USE_TEMPLATE_CACHE:
+        paths = [TEMPLATE_SUBMIT.filename] + [t.filename for ts in TEMPLATE_OPTIONS.values() for t in ts]
+        for path in paths:
+            _get_template_gray(path)
+        logger.info(f"多尺度匹配器: 已预处理 {len(paths)} 个模板。")
+
+def setup_runtime():
+    """
+    运行前的初始化：配置日志、创建本次运行的截图目录、加载模板并打印关键配置。
+    导入本模块不会产生任何副作用，只有真正开始答题 (或模拟答题) 前才需要调用此函数。
+
+    Returns:
+        bool: 选项模板加载成功返回 True，否则返回 False (此时无法进行答题)。
+    """
+    setup_logging()
+    if not IS_WINDOWS:
+        # 如果缺少库，则标记为非Windows环境，并禁用相关功能
+        print("警告：未找到 'pywin32' 库。基于HTML的题目内容和选中状态验证功能将不可用。")
+        print("请运行 'pip install pywin32' 来安装该库以获得最佳体验。")
+    if not os.path.exists(SCREENSHOT_RUN_DIR): os.makedirs(SCREENSHOT_RUN_DIR)
+    if not os.path.exists(TEMPLATES_DIR):
+        os.makedirs(TEMPLATES_DIR)
+        logger.warning(f"模板目录 '{TEMPLATES_DIR}' 不存在，已自动创建。请将模板图片放入其中。")
+
+    load_templates()
+    apply_log_levels()  # airtest 在加载模板时才被导入，导入时会重设自己的日志级别
+    if USE_IMAGE_OPTION_PHASH:
+        logger.info(f"图片选项感知哈希: 已从 '{IMAGE_OPTION_KEY_CACHE_FILE}' 加载 {load_image_option_keys()} 条。")
+
+    # 如果选项模板加载失败，则无法进行答题
+    if not TEMPLATE_OPTIONS:
+        logger.critical("由于选项模板加载失败，脚本无法继续运行。")
+        return False
+
+    # 打印关键配置信息，方便用户检查
+    logger.info(f"=========== 配置加载 ===========")
+    logger.info(f"日志文件将保存至: {LOG_FILE_PATH}")
+    logger.info(f"本次运行截图将保存至: {SCREENSHOT_RUN_DIR}")
+    if SESSION_REGIONS:
+        logger.info(f"多窗口运行，投屏区域 (Regions): {SESSION_REGIONS}")
+    else:
+        logger.info(f"投屏区域 (Region): {SCREEN_REGION}")
+    logger.info(f"启用题库模式: {'是' if USE_QA_BANK else '否'}")
+    logger.info(f"启用HTML验证: {'是' if IS_WINDOWS else '否 (环境不支持)'}")
+    logger.info(f"选项识别阈值: {SIMILARITY_THRESHOLD_OPTION}")
+    logger.info(f"提交按钮识别阈值: {SIMILARITY_THRESHOLD_SUBMIT}")
+    if RECORD_TIMING_SPANS:
+        open_span_log()
+        logger.info(f"阶段计时将保存至: {SPANS_FILE_PATH}")
+    if RECORD_RUN:
+        start_run_recording()
+        logger.info(f"运行录制将保存至: {_run_recorder.path}")
+    return True
+
+
+# --- 阶段计时 ---
+
+_span_log = {"file": None, "lock": threading.Lock(), "next_id": 0, "start": 0.0}
+_span_local = threading.local()  # 每个线程当前打开的计时区间栈，用于记录父区间
+
+def open_span_log():
+    """打开本次运行的计时区间文件 (JSONL)，之后 timed_span 装饰的函数每次调用都会写入一行。"""
+    global SPANS_FILE_PATH
+    close_span_log()
+    SPANS_FILE_PATH = os.path.join(LOG_DIR, f"{RUN_TIMESTAMP}_spans.jsonl")
+    os.makedirs(LOG_DIR, exist_ok=True)
+    _span_log["file"] = open(SPANS_FILE_PATH, 'a', encoding='utf-8')
+    _span_log["start"] = time.perf_counter()
+
+def close_span_log():
+    """关闭计时区间文件。"""
+    with _span_log["lock"]:
+        if _span_log["file"] is not None:
+            _span_log["file"].close()
+            _span_log["file"] = None
+
+def set_span_question(q_num):
+    """设置当前会话之后的计时区间所属的题号，并把已记录的区间刷新到磁盘。"""
+    current_session().span_question = q_num
+    with _span_log["lock"]:
+        if _span_log["file"] is not None:
+            _span_log["file"].flush()
+    if _run_recorder is not None:
+        _run_recorder.flush()
+
+def timed_span(name):
+    """
+    装饰器：把函数的每次调用记录为一个名为 name 的计时区间。
+    每条记录包含区间ID、父区间ID (同一线程中外层的区间)、会话名、题号、线程名、相对运行开始的起始时间和耗时。
+    未调用 open_span_log() 时 (例如被工具脚本导入) 直接调用原函数，没有额外开销。
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _span_log["file"] is None:
+                return func(*args, **kwargs)
+            stack = _span_local.__dict__.setdefault("stack", [])
+            with _span_log["lock"]:
+                _span_log["next_id"] += 1
+                span_id = _span_log["next_id"]
+            parent_id = stack[-1] if stack else None
+            session = current_session()
+            stack.append(span_id)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                duration = time.perf_counter() - start
+                stack.pop()
+                record = {
+                    "run": RUN_TIMESTAMP, "id": span_id, "parent": parent_id, "span": name,
+                    "session": session.name, "q": session.span_question, "thread": threading.current_thread().name,
+                    "start": round(start - _span_log["start"], 6), "dur": round(duration, 6),
+                }
+                with _span_log["lock"]:
+                    if _span_log["file"] is not None:
+                        _span_log["file"].write(json.dumps(record, ensure_ascii=False) + "\n")
+        return wrapper
+    return decorator
+
+
+# --- 运行录制 ---
+
+class RunRecorder:
+    """
+    运行录制器：把事件按时间顺序写入 gzip 压缩的 JSONL 归档，每行一个事件，包含相对运行开始的时间、会话名和题号。
+    截图帧编码后以 base64 内嵌在 frame 事件中，内容相同的帧只保存一次；匹配事件通过帧编号引用所用的帧。
+    每道题开始时刷新一次压缩流，脚本被强制结束时归档仍可读取，最多丢失最后一道题的事件。
+
+    Args:
+        path (str): 归档文件路径。
+        max_bytes (int): 归档大小上限，超过后不再保存帧图像。
+        frame_format (str): 帧的编码格式 ('.png' 或 '.jpg')。
+    """
+
+    def __init__(self, path, max_bytes, frame_format):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.frame_format = frame_format
+        self.events = 0
+        self.frames = 0
+        self.frames_dropped = 0
+        self._raw = open(path, 'wb')
+        self._gzip = gzip.GzipFile(fileobj=self._raw, mode='wb', compresslevel=6)
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._frame_digests = {}            # 帧内容哈希 -> 帧编号
+        self._recent_frames = OrderedDict()  # id(帧数组) -> (帧数组, 帧编号)，用于给匹配事件标注所用的帧
+
+    def size(self):
+        """已写入磁盘的压缩字节数 (不含压缩流中尚未输出的部分)。"""
+        return self._raw.tell()
+
+    def event(self, kind, **fields):
+        session = current_session()
+        record = {"t": round(time.perf_counter() - self._start, 4), "kind": kind,
+                  "session": session.name, "q": session.span_question, **fields}
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8')
+        with self._lock:
+            if self._gzip is not None:
+                self._gzip.write(line)
+                self.events += 1
+
+    def frame(self, image):
+        """记录一帧新截图。与已保存的帧内容相同时只记录引用；超过大小上限时只记录编号、不保存图像。"""
+        digest = hashlib.blake2b(image.tobytes(), digest_size=16).hexdigest()
+        with self._lock:
+            number = self._frame_digests.get(digest)
+            is_new = number is None
+            if is_new:
+                self.frames += 1
+                number = self._frame_digests[digest] = self.frames
+            self._recent_frames[id(image)] = (image, number)
+            while len(self._recent_frames) > 8:
+                self._recent_frames.popitem(last=False)
+        if not is_new:
+            self.event("frame", id=number, same_as=number)
+        elif self.size() >= self.max_bytes:
+            self.frames_dropped += 1
+            self.event("frame", id=number, dropped=True)
+        else:
+            params = [cv2.IMWRITE_JPEG_QUALITY, 90] if self.frame_format == '.jpg' else [cv2.IMWRITE_PNG_COMPRESSION, 1]
+            ok, encoded = cv2.imencode(self.frame_format, image, params)
+            self.event("frame", id=number, format=self.frame_format, data=base64.b64encode(encoded.tobytes()).decode('ascii'))
+
+    def frame_id(self, image):
+        """返回截图对应的帧编号，不是 capture_region 截取的帧 (例如已缩放的图像) 时返回None。"""
+        with self._lock:
+            entry = self._recent_frames.get(id(image))
+        return entry[1] if entry and entry[0] is image else None
+
+    def flush(self):
+        with self._lock:
+            if self._gzip is not None:
+                self._gzip.flush()
+                self._raw.flush()
+
+    def close(self):
+        with self._lock:
+            if self._gzip is not None:
+                self._gzip.close()
+                self._raw.close()
+                self._gzip = None
+
+_run_recorder = None  # RECORD_RUN 为 True 时的 RunRecorder 实例
+
+def start_run_recording():
+    """在本次运行目录中创建录制归档。"""
+    global _run_recorder
+    stop_run_recording()
+    os.makedirs(SCREENSHOT_RUN_DIR, exist_ok=True)
+    _run_recorder = RunRecorder(os.path.join(SCREENSHOT_RUN_DIR, RUN_RECORDING_FILENAME),
+                                int(RUN_RECORDING_MAX_MB * 1024 * 1024), RUN_RECORDING_FRAME_FORMAT)
+    _run_recorder.event("config", region=list(current_session().region), run=RUN_TIMESTAMP,
+                        pipeline=PIPELINE_CAPTURE_WITH_CLIPBOARD, template_cache=USE_TEMPLATE_CACHE)
+
+def stop_run_recording():
+    """结束录制并关闭归档。"""
+    global _run_recorder
+    if _run_recorder is None:
+        return
+    recorder, _run_recorder = _run_recorder, None
+    recorder.close()
+    logger.info(f"运行录制已保存至: {recorder.path} ({recorder.events} 个事件, {recorder.frames} 帧, "
+                f"{os.path.getsize(recorder.path) / 1024 / 1024:.1f} MB, 因超过大小上限未保存 {recorder.frames_dropped} 帧)")
+
+def record_event(kind, **fields):
+    """录制一个事件。未开启录制时没有任何开销。"""
+    if _run_recorder is not None:
+        _run_recorder.event(kind, **fields)
+
 
-# 如果选项模板加载失败，则无法进行答题，直接退出
-if not TEMPLATE_OPTIONS:
-    logger.critical("由于选项模板加载失败，脚本无法继续运行。")
-    exit()
+# --- 多窗口会话 ---
 
-# 打印关键配置信息，方便用户检查
-logger.info(f"=========== 配置加载 ===========")
-logger.info(f"日志文件将保存至: {LOG_FILE_PATH}")
-logger.info(f"本次运行截图将保存至: {SCREENSHOT_RUN_DIR}")
-logger.info(f"投屏区域 (Region): {SCREEN_REGION}")
-logger.info(f"启用题库模式: {'是' if USE_QA_BANK else '否'}")
-logger.info(f"启用HTML验证: {'是' if IS_WINDOWS else '否 (环境不支持)'}")
-logger.info(f"选项识别阈值: {SIMILARITY_THRESHOLD_OPTION}")
-logger.info(f"提交按钮识别阈值: {SIMILARITY_THRESHOLD_SUBMIT}")
+def _empty_option_layout():
+    """未校准的选项布局: 选项列的 x 坐标、行间距、选项数量 -> A 的 y 坐标、最近一道题的选项数量。"""
+    return {"x": None, "pitch": None, "offsets": {}, "last_count": None}
+
+class SolverSession:
+    """
+    一个答题窗口的会话：保存只属于这个窗口的状态 (区域、截图目录、帧缓存、选中状态、模板位置缓存、本题统计)。
+    题库、模板和运行统计由所有会话共享。单窗口运行时使用默认会话，其区域和截图目录跟随 SCREEN_REGION / SCREENSHOT_RUN_DIR。
+
+    Args:
+        name (str): 会话名称，用于日志、线程名和截图子目录。
+        region (tuple, optional): 投屏区域，默认使用 SCREEN_REGION。
+        screenshot_dir (str, optional): 截图目录，默认使用 SCREENSHOT_RUN_DIR。
+    """
+
+    def __init__(self, name, region=None, screenshot_dir=None):
+        self.name = name
+        self._region = region
+        self._screenshot_dir = screenshot_dir
+        self.frame_cache = {"image": None, "time": 0.0}           # 最近一次截图 (BGR) 及其截取时间
+        self.gray_frame = (None, None)  # (最近一次转换为灰度的截图, 灰度图)，同一帧只转换一次
+        self.selection_state = {"q_text": None, "selected": None}  # 最近一次从剪贴板读到的题目及其已选选项
+        self.template_roi_cache = {}  # 模板文件路径 -> 上一次匹配到的区域内坐标 (x, y)
+        self.option_layout = _empty_option_layout()  # 校准的选项布局，见 calibrate_option_layout
+        self.question_stats = defaultdict(float)  # 当前题目的性能统计 (每道新题开始时清空)
+        self.rejected_combos = {"key": None, "counts": Counter()}  # 当前题目变种中提交后未刷新的组合 -> 次数
+        self.attempt_rejections = []  # 本次遍历中提交后未刷新的组合 (选项字母列表)，见 finish_elimination_attempt
+        self.unconfirmed_submit = None  # 最近一次提交后题目未刷新 (超时) 的 {"q_text", "letters", "time"}，见 late_advanced_answer
+        self.ambiguous_advance = None   # 题目刷新时还有未确认的上一次提交，无法确定哪一次答对 {"q_text", "letters"}
+        self.slow_advance_timeout = 0.0  # 本会话观察到的慢刷新所需时间，快速失败时间不会短于它
+        self.advance_latency = 0.0       # 本会话观察到的最长的提交后刷新时间 (0 表示还没有观察到)
+        self.span_question = None     # 计时区间所属的题号
+
+    @property
+    def region(self):
+        return self._region or SCREEN_REGION
+
+    @property
+    def screenshot_dir(self):
+        return self._screenshot_dir or SCREENSHOT_RUN_DIR
+
+
+class SessionAborted(Exception):
+    """调度器被中止 (例如触发了 Fail-Safe)，等待控制权的会话应立即结束。"""
+
+
+class InputScheduler:
+    """
+    在多个会话之间分配鼠标和键盘的控制权：同一时刻只有一个会话 (及其后台截图线程) 在操作桌面。
+    会话等待时交出控制权并登记最早的恢复时间，调度器总是把控制权交给恢复时间最早的会话；
+    没有会话可以立即运行时，由拿到控制权的会话睡眠到它的恢复时间。
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._owner = None
+        self._due = {}       # 等待控制权的会话 -> (恢复时间, 登记顺序)
+        self._order = 0
+        self._focused = None  # 最后一次获得键盘焦点的会话
+        self.aborted = False
+
+    def _dispatch(self):
+        if self._owner is None and self._due:
+            session = min(self._due, key=self._due.get)
+            del self._due[session]
+            self._owner = session
+            self._cond.notify_all()
+
+    def _wait_for_turn(self, session, due):
+        with self._cond:
+            self._order += 1
+            self._due[session] = (due, self._order)
+            if self._owner is session:
+                self._owner = None
+            self._dispatch()
+            while self._owner is not session:
+                if self.aborted:
+                    self._due.pop(session, None)
+                    raise SessionAborted()
+                self._cond.wait()
+        remaining = due - time.time()
+        if remaining > 0:
+            time.sleep(remaining)
+        if self._focused is not session:
+            focus_session_window(session)
+            self._focused = session
+
+    def acquire(self, session):
+        """等待轮到 session 控制桌面。"""
+        self._wait_for_turn(session, time.time())
+
+    def wait(self, session, seconds):
+        """交出控制权 seconds 秒，到时后 (且轮到它时) 再继续。"""
+        self._wait_for_turn(session, time.time() + seconds)
+
+    def leave(self, session):
+        """会话结束，交出控制权且不再排队。"""
+        with self._cond:
+            self._due.pop(session, None)
+            if self._owner is session:
+                self._owner = None
+            self._dispatch()
+
+    def abort(self):
+        """中止所有正在排队的会话。"""
+        with self._cond:
+            self.aborted = True
+            self._cond.notify_all()
+
+
+_default_session = SolverSession("main")
+_session_local = threading.local()  # 当前线程所属的会话
+_scheduler = None  # 多窗口运行时的 InputScheduler，单窗口运行时为None
+
+def current_session():
+    """返回当前线程所属的会话，未设置时返回默认会话。"""
+    return getattr(_session_local, "session", None) or _default_session
+
+def use_session(session):
+    """让当前线程之后的桌面操作都作用于 session。"""
+    _session_local.session = session
+
+def focus_session_window(session):
+    """点击会话区域内的空白处，使其窗口获得键盘焦点。不会改变选中状态，因此不使已知的选中状态失效。"""
+    region_x, region_y, region_w, region_h = session.region
+    pyautogui.click(region_x + int(region_w * SESSION_FOCUS_POINT[0]), region_y + int(region_h * SESSION_FOCUS_POINT[1]))
+    session.frame_cache["image"] = None
+    record_event("focus")
+    run_stats["session_focus_clicks"] += 1
+
+def session_wait(seconds, force_yield=False):
+    """
+    等待 seconds 秒。多窗口运行时，若等待足够长 (或 force_yield 为 True)，在等待期间把鼠标和键盘交给其他会话。
+    只能在一组完整的桌面操作之间调用 (例如不能在 Ctrl+C 和读取剪贴板之间)。
+    """
+    if _scheduler is None or (seconds < SESSION_MIN_YIELD_SECONDS and not force_yield):
+        time.sleep(seconds)
+        return
+    record_stat("session_yields")
+    _scheduler.wait(current_session(), seconds)
+
+
+# --- 截图保存 ---
+
+class ScreenshotWriter:
+    """
+    后台截图写入器：答题线程调用 submit 把图像放入有界队列，后台线程负责缩放、编码和写盘，
+    并按 max_files 为每个目录只保留最新的若干张截图。
+
+    Args:
+        queue_size (int): 队列长度，队列满时丢弃新的截图。
+        max_files (int): 每个目录最多保留的截图数量，0 表示不限制。
+    """
+
+    def __init__(self, queue_size, max_files):
+        self.max_files = max_files
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._written = defaultdict(deque)  # 目录 -> 按写入顺序排列的截图路径
+        self._thread = threading.Thread(target=self._run, name="screenshot_writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, path, image):
+        """把截图放入写入队列，队列已满时返回 False。image 在写入前不能被修改 (截图帧本来就不会被原地修改)。"""
+        try:
+            self._queue.put_nowait((path, image))
+            return True
+        except queue.Full:
+            return False
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+            except Exception as e:
+                logger.warning(f"保存截图 '{item[0]}' 失败: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, path, image):
+        if SCREENSHOT_SCALE != 1.0:
+            image = cv2.resize(image, None, fx=SCREENSHOT_SCALE, fy=SCREENSHOT_SCALE, interpolation=cv2.INTER_AREA)
+        params = [cv2.IMWRITE_JPEG_QUALITY, SCREENSHOT_JPEG_QUALITY] if SCREENSHOT_FORMAT == '.jpg' else []
+        ok, encoded = cv2.imencode(SCREENSHOT_FORMAT, image, params)
+        if not ok:
+            raise ValueError(f"无法编码为 {SCREENSHOT_FORMAT}")
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # cv2.imwrite 在 Windows 上无法写入包含中文的路径 (例如 "第1题_1_find_submit.png")，因此先编码再写文件
+        with open(path, 'wb') as f:
+            f.write(encoded.tobytes())
+        written = self._written[directory]
+        written.append(path)
+        while self.max_files and len(written) > self.max_files:
+            try:
+                os.remove(written.popleft())
+                run_stats["screenshots_pruned"] += 1
+            except OSError:
+                pass
+        run_stats["screenshots_written"] += 1
+
+    def close(self):
+        """写完队列中剩余的截图后停止后台线程。"""
+        self._queue.put(None)
+        self._thread.join()
+
+_screenshot_writer = None  # 第一次保存截图时创建
+_screenshot_counter = {"count": 0, "lock": threading.Lock()}  # EVERY_N 策略的截图计数
+
+def save_screenshot(image, filename, important=False):
+    """
+    按 SCREENSHOT_POLICY 决定是否保存截图，需要保存时交给后台线程写入，不等待编码和写盘。
+
+    Args:
+        image (numpy.ndarray): 要保存的截图 (BGR)。
+        filename (str): 保存路径，扩展名会换成 SCREENSHOT_FORMAT。
+        important (bool): 是否为出问题时的截图或一次性的诊断截图，这类截图在 ON_FAILURE / EVERY_N 策略下也总是保存。
+
+    Returns:
+        str or None: 加入写入队列的路径，按策略跳过或队列已满时返回None。
+    """
+    global _screenshot_writer
+    if SCREENSHOT_POLICY == 'NEVER' or (SCREENSHOT_POLICY == 'ON_FAILURE' and not important):
+        record_stat("screenshots_skipped")
+        return None
+    if SCREENSHOT_POLICY == 'EVERY_N' and not important:
+        with _screenshot_counter["lock"]:
+            _screenshot_counter["count"] += 1
+            keep = (_screenshot_counter["count"] - 1) % max(1, SCREENSHOT_EVERY_N) == 0  # 保存第 1、N+1、2N+1... 张
+        if not keep:
+            record_stat("screenshots_skipped")
+            return None
+    if _screenshot_writer is None:
+        _screenshot_writer = ScreenshotWriter(SCREENSHOT_QUEUE_SIZE, SCREENSHOT_MAX_FILES_PER_RUN)
+    path = os.path.splitext(filename)[0] + SCREENSHOT_FORMAT
+    if not _screenshot_writer.submit(path, image):
+        record_stat("screenshots_dropped")
+        logger.warning(f"截图写入队列已满，丢弃截图: {path}")
+        return None
+    logger.info(f"截图将保存至: {path}")
+    return path
+
+def close_screenshot_writer():
+    """等待队列中的截图全部写入磁盘。脚本结束前调用。"""
+    global _screenshot_writer
+    if _screenshot_writer is not None:
+        _screenshot_writer.close()
+        _screenshot_writer = None
 
 
 # --- 桌面操作核心函数 ---
 
-def capture_region(filename=None):
+def invalidate_frame_cache():
+    """使截图帧缓存失效。任何可能改变屏幕内容的操作（点击、滚动、按键）之后都应调用。"""
+    current_session().frame_cache["image"] = None
+
+def remember_selection_state(q_info):
+    """记住刚从剪贴板读到的选中状态。"""
+    selection_state = current_session().selection_state
+    selection_state["q_text"] = q_info.get('q_text')
+    selection_state["selected"] = set(q_info.get('selected_options', []))
+
+def invalidate_selection_state():
+    """使已知的选中状态失效。任何点击 (包括提交) 和滚动之后都应调用；换题后的第一次读取会覆盖旧题目的状态。"""
+    current_session().selection_state["selected"] = None
+
+def known_selection_state(q_text):
+    """
+    返回仍然有效的已知选中状态。
+
+    Args:
+        q_text (str): 当前题目的问题文本。已知状态是为其他题目读到的 (例如已经换题) 时视为无效。
+
+    Returns:
+        set or None: 自上次读取剪贴板以来没有点击/滚动、且读到的是同一道题时返回已选选项集合，否则返回None。
     """
-    截取在 SCREEN_REGION 中定义的屏幕区域。
+    selection_state = current_session().selection_state
+    selected = selection_state["selected"]
+    if not TRACK_SELECTION_STATE or selected is None or selection_state["q_text"] != q_text:
+        return None
+    return set(selected)
+
+@timed_span("capture")
+def capture_region(filename=None, important=False):
+    """
+    截取当前会话的屏幕区域 (单窗口运行时即 SCREEN_REGION)。
+    启用帧缓存时，若自上次截图以来没有点击/滚动/按键且未超过 FRAME_CACHE_TTL，则直接复用上一帧。
+    返回的数组可能被多个调用方共享，请勿原地修改。
 
     Args:
-        filename (str, optional): 如果提供，截图将被保存到指定路径。 Defaults to None.
+        filename (str, optional): 如果提供，截图将按 SCREENSHOT_POLICY 在后台保存到指定路径。 Defaults to None.
+        important (bool, optional): 是否为出问题时的截图或一次性的诊断截图，见 save_screenshot。
 
     Returns:
         numpy.ndarray: 返回OpenCV格式的图像数组 (BGR)。
     """
-    pil_img = pyautogui.screenshot(region=SCREEN_REGION)
+    now = time.time()
+    frame_cache = current_session().frame_cache
+    opencv_img = frame_cache["image"]
+    if USE_FRAME_CACHE and opencv_img is not None and now - frame_cache["time"] <= FRAME_CACHE_TTL:
+        record_stat("captures_avoided")
+    else:
+        pil_img = pyautogui.screenshot(region=current_session().region)
+        # 将Pillow图像转换为numpy数组，并从RGB转为OpenCV兼容的BGR格式
+        np_array = np.array(pil_img)
+        opencv_img = cv2.cvtColor(np_array, cv2.COLOR_RGB2BGR)
+        frame_cache["image"], frame_cache["time"] = opencv_img, now
+        record_stat("captures")
+        if _run_recorder is not None:
+            _run_recorder.frame(opencv_img)
     if filename:
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
-        pil_img.save(filename)
-        logger.info(f"截图已保存至: {filename}")
-    # 将Pillow图像转换为numpy数组，并从RGB转为OpenCV兼容的BGR格式
-    np_array = np.array(pil_img)
-    opencv_img = cv2.cvtColor(np_array, cv2.COLOR_RGB2BGR)
+        save_screenshot(opencv_img, filename, important)
     return opencv_img
 
+# --- 界面稳定检测 ---
+
+def settle_view(image):
+    """把截图 (BGR) 转换为稳定检测使用的缩小灰度画面 (只保留 SETTLE_ROI 部分)。"""
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return _shrink_settle_view(gray)
+
+def _shrink_settle_view(gray):
+    if SETTLE_ROI:
+        h, w = gray.shape
+        x, y, rw, rh = SETTLE_ROI
+        gray = gray[int(y * h):int((y + rh) * h), int(x * w):int((x + rw) * w)]
+    return cv2.resize(gray, None, fx=SETTLE_SCALE, fy=SETTLE_SCALE, interpolation=cv2.INTER_AREA)
+
+def capture_settle_view():
+    """截取当前会话区域的稳定检测画面。不使用也不更新帧缓存，不计入运行录制。"""
+    pil_img = pyautogui.screenshot(region=current_session().region)
+    record_stat("settle_captures")
+    return _shrink_settle_view(cv2.cvtColor(np.array(pil_img), cv2.COLOR_RGB2GRAY))
+
+def settle_views_differ(a, b):
+    """比较两帧稳定检测画面，明显不同时返回 True。"""
+    if a.shape != b.shape:
+        return True
+    return np.count_nonzero(cv2.absdiff(a, b) > SETTLE_PIXEL_DELTA) > SETTLE_MAX_CHANGED_PIXELS
+
+@timed_span("settle")
+def wait_until_settled(max_delay, before=None):
+    """
+    操作 (点击、滚动) 之后等待界面稳定，最多等待 max_delay 秒。
+    画面发生变化后连续 SETTLE_STABLE_FRAMES 次不再变化即返回；画面一直没有变化时等满 max_delay，
+    与原来的固定延时相同。未启用 USE_SETTLE_DETECTION 时直接等待 max_delay 秒。
+
+    Args:
+        max_delay (float): 等待上限，即原来的固定延时 (秒)。
+        before (numpy.ndarray, optional): 操作前的稳定检测画面。提供时，第一次截取的画面与它不同也算作"已变化"，
+            这样在第一次截图前就已完成的变化也能被发现。
+
+    Returns:
+        numpy.ndarray or None: 最后一次截取的稳定检测画面 (可作为下一次操作的 before)，未进行稳定检测时返回None。
+    """
+    if not USE_SETTLE_DETECTION or max_delay <= SETTLE_POLL_INTERVAL:
+        session_wait(max_delay)
+        return None
+    # 与固定延时一样，多窗口运行时足够长的等待会把控制权交给其他会话，但每次等待只在第一次截图前让出一次：
+    # 每次重新获得控制权都可能需要一次焦点点击，每个轮询间隔都让出会让焦点点击比答题操作还多
+    force_yield = _scheduler is not None and max_delay >= SESSION_MIN_YIELD_SECONDS
+    start = time.time()
+    view = capture_settle_view()
+    changed = before is not None and settle_views_differ(before, view)
+    stable = 0
+    while not (changed and stable >= SETTLE_STABLE_FRAMES):
+        remaining = max_delay - (time.time() - start)
+        if remaining <= 0:
+            break
+        session_wait(min(SETTLE_POLL_INTERVAL, remaining), force_yield=force_yield)
+        force_yield = False
+        previous, view = view, capture_settle_view()
+        if settle_views_differ(previous, view):
+            changed, stable = True, 0
+        else:
+            stable += 1
+    waited = time.time() - start
+    settled = changed and stable >= SETTLE_STABLE_FRAMES
+    record_stat("settle_waits")
+    record_stat("settle_saved_seconds", max(0.0, max_delay - waited))
+    if not settled:
+        record_stat("settle_timeouts")
+    record_event("settle", limit=max_delay, waited=round(waited, 4), settled=settled)
+    return view
+
 def click_at_region_pos(region_pos):
     """
-    在 SCREEN_REGION 内的相对坐标上执行点击。
+    在当前会话区域内的相对坐标上执行点击。
 
     Args:
         region_pos (tuple): (x, y) 相对坐标。
     """
     if not region_pos: return
     # 计算绝对屏幕坐标
-    absolute_x = SCREEN_REGION[0] + region_pos[0]
-    absolute_y = SCREEN_REGION[1] + region_pos[1]
+    region = current_session().region
+    absolute_x = region[0] + region_pos[0]
+    absolute_y = region[1] + region_pos[1]
     pyautogui.click(absolute_x, absolute_y)
+    invalidate_frame_cache()
+    invalidate_selection_state()
+    record_event("click", pos=[float(region_pos[0]), float(region_pos[1])])
 
 def _scroll_with_drag():
     """私有函数：通过模拟鼠标拖动来实现滚动。"""
     logger.info("执行[拖动滚动]...")
-    region_x, region_y, region_w, region_h = SCREEN_REGION
+    region_x, region_y, region_w, region_h = current_session().region
     # 计算拖动的起点和终点
     drag_center_x = region_x + region_w // 2
     start_y = region_y + region_h * 0.70
@@ -286,20 +1181,26 @@ def _scroll_with_drag():
     pyautogui.mouseDown()
     pyautogui.moveTo(drag_center_x, end_y, duration=0.5)
     pyautogui.mouseUp()
+    invalidate_frame_cache()
+    invalidate_selection_state()
 
 def _scroll_with_wheel():
     """私有函数：通过模拟鼠标滚轮来实现滚动。"""
     logger.info("执行[PC滚轮滚动]...")
-    region_x, region_y, region_w, region_h = SCREEN_REGION
+    region_x, region_y, region_w, region_h = current_session().region
     # 将鼠标移动到区域中心以确保滚动作用于目标窗口
     center_x = region_x + region_w // 2
     center_y = region_y + region_h // 2
     pyautogui.moveTo(center_x, center_y, duration=0.2)
     # 负值表示向下滚动
     pyautogui.scroll(-500)
+    invalidate_frame_cache()
+    invalidate_selection_state()
 
+@timed_span("scroll")
 def scroll_in_region():
     """根据全局配置 SCROLL_MODE 来执行滚动操作。"""
+    record_event("scroll", mode=SCROLL_MODE)
     if SCROLL_MODE == 'MOBILE_DRAG':
         _scroll_with_drag()
     elif SCROLL_MODE == 'PC_WHEEL':
@@ -343,10 +1244,63 @@ def _get_html_from_clipboard():
             win32clipboard.CloseClipboard()
     return None
 
-def _parse_html_data(html_content):
+def _build_question_info(q_num, q_type, q_text, option_items):
     """
-    使用 BeautifulSoup 解析HTML字符串，智能提取问题、选项（文本或图片URL）和选中状态。
-    这是脚本获取题目信息最可靠的方式。
+    根据HTML中提取出的原始片段构建题目信息字典。两种HTML解析器共用此函数，保证结果一致。
+
+    Args:
+        q_num (str or None): ts_title_count 中 <i> 的文本，没有 <i> 时为 None。
+        q_type (str or None): ts_title_count 中 <em> 的文本，没有 <em> 时为 None。
+        q_text (str): ts_title_text 的文本。
+        option_items (list): 每个选项 <li> 的 (class列表, 第一个<span>的文本或None, li的完整文本, 第一个<img>的src或None)。
+
+    Returns:
+        dict or None: 解析成功则返回包含题目信息的字典，否则返回None。
+    """
+    q_num = q_num or ""
+    q_type = f"{q_type}题" if q_type is not None else ""
+
+    options = {}
+    selected_options = []
+    for classes, span_text, li_text, img_src in option_items:
+        # 提取选项字母 (A, B, C, D)
+        text_content = span_text if span_text is not None else li_text
+        match = re.match(r'([A-D])\.', text_content)
+        if not match and span_text is not None: # 有时字母不在span里, 需要从li的完整文本匹配
+             match = re.match(r'([A-D])\.', li_text)
+
+        if match:
+            option_letter = match.group(1)
+            
+            # ======================= 【核心升级点】 =======================
+            # 智能判断选项是图片还是文字
+            if img_src is not None:
+                # 如果li标签内有<img>，则这是一个图片选项，我们使用图片的URL作为其内容。
+                option_content = img_src
+            else:
+                # 否则，这是一个文字选项，移除开头的 "A."、"B." 等，得到纯净的选项文本。
+                option_content = re.sub(r'^[A-D]\.', '', li_text, 1).strip()
+            
+            options[option_letter] = option_content
+            
+            # 通过检查li标签的class属性是否包含 'active' 来判断此选项是否被选中。
+            if any('active' in c for c in classes):
+                selected_options.append(option_letter)
+    
+    # 如果成功提取到所有关键信息，则构建并返回结果字典
+    if q_num and q_text and options:
+        return {
+            "q_num": q_num,
+            "q_type": q_type,
+            "q_text": q_text,
+            "options": options, # 选项内容可能是文本或图片URL
+            "selected_options": sorted(selected_options) # 返回已排序的选中选项列表
+        }
+    return None
+
+def _parse_html_data_bs4(html_content):
+    """
+    【备用方案】使用 BeautifulSoup 解析HTML字符串，智能提取问题、选项（文本或图片URL）和选中状态。
 
     Args:
         html_content (str): 包含题目信息的HTML代码片段。
@@ -354,16 +1308,17 @@ def _parse_html_data(html_content):
     Returns:
         dict or None: 解析成功则返回包含题目信息的字典，否则返回None。
     """
+    if not HAS_BS4: return None
     try:
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = bs4.BeautifulSoup(html_content, 'html.parser')
         
         # 1. 提取题号和题目类型
         title_count_div = soup.find('div', class_='ts_title_count')
         if not title_count_div: return None
         q_num_tag = title_count_div.find('i')
         q_type_tag = title_count_div.find('em')
-        q_num = q_num_tag.get_text(strip=True) if q_num_tag else ""
-        q_type = f"{q_type_tag.get_text(strip=True)}题" if q_type_tag else ""
+        q_num = q_num_tag.get_text(strip=True) if q_num_tag else None
+        q_type = q_type_tag.get_text(strip=True) if q_type_tag else None
 
         # 2. 提取问题文本
         q_text_div = soup.find('div', class_='ts_title_text')
@@ -374,54 +1329,189 @@ def _parse_html_data(html_content):
         options_wrapper = soup.find('div', class_='options-wrapper')
         if not options_wrapper: return None
         
-        options = {}
-        selected_options = []
+        option_items = []
         # 找到所有选项的列表项 (li 标签)
-        option_lis = options_wrapper.find_all('li', class_=True)
-
-        for li in option_lis:
-            # 提取选项字母 (A, B, C, D)
+        for li in options_wrapper.find_all('li', class_=True):
             option_letter_span = li.find('span')
-            text_content = option_letter_span.get_text(strip=True) if option_letter_span else li.get_text(strip=True)
-            match = re.match(r'([A-D])\.', text_content)
-            if not match and option_letter_span: # 有时字母不在span里, 需要从li的完整文本匹配
-                 match = re.match(r'([A-D])\.', li.get_text(strip=True))
-
-            if match:
-                option_letter = match.group(1)
-                
-                # ======================= 【核心升级点】 =======================
-                # 智能判断选项是图片还是文字
-                img_tag = li.find('img')
-                if img_tag and img_tag.has_attr('src'):
-                    # 如果li标签内有<img>，则这是一个图片选项，我们使用图片的URL作为其内容。
-                    option_content = img_tag['src']
-                else:
-                    # 否则，这是一个文字选项，我们提取其文本内容。
-                    full_text = li.get_text(strip=True)
-                    # 移除开头的 "A."、"B." 等，得到纯净的选项文本。
-                    option_content = re.sub(r'^[A-D]\.', '', full_text, 1).strip()
-                
-                options[option_letter] = option_content
-                
-                # 通过检查li标签的class属性是否包含 'active' 来判断此选项是否被选中。
-                classes = li.get('class', [])
-                if any('active' in c for c in classes):
-                    selected_options.append(option_letter)
-        
-        # 如果成功提取到所有关键信息，则构建并返回结果字典
-        if q_num and q_text and options:
-            return {
-                "q_num": q_num,
-                "q_type": q_type,
-                "q_text": q_text,
-                "options": options, # 选项内容可能是文本或图片URL
-                "selected_options": sorted(selected_options) # 返回已排序的选中选项列表
-            }
+            img_tag = li.find('img')
+            option_items.append((
+                li.get('class', []),
+                option_letter_span.get_text(strip=True) if option_letter_span else None,
+                li.get_text(strip=True),
+                img_tag['src'] if img_tag and img_tag.has_attr('src') else None,
+            ))
+        return _build_question_info(q_num, q_type, q_text, option_items)
     except Exception as e:
         logger.error(f"解析HTML时发生严重错误: {e}", exc_info=True)
     return None
 
+class _StopParsing(Exception):
+    """流式解析器在读完选项列表后用于提前终止解析。"""
+
+class _QuestionHTMLParser(HTMLParser):
+    """
+    只提取题目信息的流式HTML解析器，不构建文档树。
+    它跟踪 ts_title_count 中的第一个 <i>/<em>、ts_title_text 的文本，
+    以及 options-wrapper 中每个带 class 的 <li> 的 class、<span>文本、完整文本和 <img> 的 src，
+    并在选项列表关闭后立即停止。提取规则与 BeautifulSoup 版本 (get_text(strip=True)) 保持一致。
+    """
+
+    # 没有结束标签的空元素，不入栈
+    VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []
+        self.q_num = None
+        self.q_type = None
+        self.q_text = None
+        self.option_items = []
+        self.wrapper_done = False
+        self.failed = False
+        # 正在采集的区域: 名称 -> (所在栈深度, 文本片段列表)
+        self._captures = {}
+        self._seen = set()
+        self._li = None
+
+    @staticmethod
+    def _classes(attrs):
+        for name, value in attrs:
+            if name == 'class':
+                return (value or "").split()
+        return None
+
+    def _open_capture(self, name):
+        self._seen.add(name)
+        self._captures[name] = (len(self.stack), [])
+
+    def handle_starttag(self, tag, attrs):
+        captures = self._captures
+        if tag == 'div':
+            classes = self._classes(attrs) or []
+            for name, css in (('count', 'ts_title_count'), ('text', 'ts_title_text'), ('wrapper', 'options-wrapper')):
+                if css in classes and name not in self._seen:
+                    self.stack.append(tag)
+                    self._open_capture(name)
+                    return
+        elif tag in ('i', 'em') and 'count' in captures and tag not in self._seen:
+            self.stack.append(tag)
+            self._open_capture(tag)
+            return
+        elif tag == 'li' and 'wrapper' in captures:
+            classes = self._classes(attrs)
+            if classes is not None:
+                if self._li is not None:
+                    # 嵌套的选项 li 不在支持范围内，交给 BeautifulSoup 处理
+                    self.failed = True
+                    raise _StopParsing()
+                self.stack.append(tag)
+                self._li = {"classes": classes, "span": None, "img": None, "has_img": False}
+                self._captures['li'] = (len(self.stack), [])
+                return
+        elif tag == 'span' and self._li is not None and 'span' not in captures and self._li["span"] is None:
+            self.stack.append(tag)
+            self._captures['span'] = (len(self.stack), [])
+            return
+        elif tag == 'img' and self._li is not None and not self._li["has_img"]:
+            self._li["has_img"] = True
+            for name, value in attrs:
+                if name == 'src':
+                    self._li["img"] = value or ""
+                    break
+        if tag not in self.VOID_TAGS:
+            self.stack.append(tag)
+
+    def handle_endtag(self, tag):
+        if tag not in self.stack:
+            return
+        while self.stack:
+            if self.stack.pop() == tag:
+                break
+        self._close_captures_deeper_than(len(self.stack))
+
+    def _close_captures_deeper_than(self, depth):
+        # 由内向外关闭，保证 <span> 先于所在的 <li> 结束
+        for name, (capture_depth, parts) in sorted(self._captures.items(), key=lambda item: -item[1][0]):
+            if capture_depth > depth:
+                del self._captures[name]
+                self._close_capture(name, "".join(parts))
+
+    def finish(self):
+        """片段结束时仍未闭合的标签视为在此处闭合 (与 BeautifulSoup 的容错行为一致)。"""
+        self.stack.clear()
+        try:
+            self._close_captures_deeper_than(0)
+        except _StopParsing:
+            pass
+
+    def _close_capture(self, name, text):
+        if name == 'i':
+            self.q_num = text
+        elif name == 'em':
+            self.q_type = text
+        elif name == 'text':
+            self.q_text = text
+        elif name == 'span':
+            self._li["span"] = text
+        elif name == 'li':
+            li = self._li
+            self._li = None
+            self.option_items.append((li["classes"], li["span"], text, li["img"]))
+        elif name == 'wrapper':
+            self.wrapper_done = True
+            if 'count' in self._seen and 'text' in self._seen:
+                raise _StopParsing()
+
+    def handle_data(self, data):
+        data = data.strip()
+        if not data:
+            return
+        for _, parts in self._captures.values():
+            parts.append(data)
+
+def _parse_html_data_fast(html_content):
+    """
+    使用流式解析器提取题目信息，读完选项列表即停止。
+
+    Args:
+        html_content (str): 包含题目信息的HTML代码片段。
+
+    Returns:
+        dict or None: 解析成功则返回包含题目信息的字典，否则返回None。
+    """
+    parser = _QuestionHTMLParser()
+    try:
+        parser.feed(html_content)
+        parser.close()
+        parser.finish()
+    except _StopParsing:
+        pass
+    except Exception as e:
+        logger.warning(f"快速HTML解析器出错，将回退到 BeautifulSoup: {e}")
+        return None
+    if parser.failed or not parser.wrapper_done or 'count' not in parser._seen or parser.q_text is None:
+        return None
+    return _build_question_info(parser.q_num, parser.q_type, parser.q_text, parser.option_items)
+
+@timed_span("parse")
+def _parse_html_data(html_content):
+    """
+    解析HTML字符串，智能提取问题、选项（文本或图片URL）和选中状态。
+    这是脚本获取题目信息最可靠的方式。优先使用快速流式解析器，失败时回退到 BeautifulSoup。
+
+    Args:
+        html_content (str): 包含题目信息的HTML代码片段。
+
+    Returns:
+        dict or None: 解析成功则返回包含题目信息的字典，否则返回None。
+    """
+    if USE_FAST_HTML_PARSER:
+        parsed_data = _parse_html_data_fast(html_content)
+        if parsed_data:
+            return parsed_data
+        record_stat("html_parser_fallbacks")
+    return _parse_html_data_bs4(html_content)
+
 def _parse_text_data(clipboard_text):
     """
     【备用方案】解析纯文本格式的剪贴板内容。
@@ -460,10 +1550,40 @@ def _parse_text_data(clipboard_text):
         return q_info
     return None
 
+_parse_cache = OrderedDict()  # HTML内容哈希 -> 解析结果 (LRU)
+
+def _parse_html_data_cached(html_content):
+    """
+    带LRU缓存的HTML解析。以HTML片段的内容哈希为键，内容完全相同时直接返回缓存结果的副本。
+
+    Returns:
+        tuple: (解析结果或None, 是否命中缓存)
+    """
+    if CLIPBOARD_PARSE_CACHE_SIZE <= 0:
+        return _parse_html_data(html_content), False
+    digest = hashlib.blake2b(html_content.encode('utf-8', errors='ignore'), digest_size=16).digest()
+    if digest in _parse_cache:
+        _parse_cache.move_to_end(digest)
+        record_stat("parse_cache_hits")
+        parsed_data, hit = _parse_cache[digest], True
+    else:
+        record_stat("parse_cache_misses")
+        parsed_data, hit = _parse_html_data(html_content), False
+        _parse_cache[digest] = parsed_data
+        if len(_parse_cache) > CLIPBOARD_PARSE_CACHE_SIZE:
+            _parse_cache.popitem(last=False)
+    if parsed_data:
+        # 返回副本，避免调用方修改缓存中的结果
+        parsed_data = dict(parsed_data, options=dict(parsed_data['options']),
+                           selected_options=list(parsed_data['selected_options']))
+    return parsed_data, hit
+
+@timed_span("clipboard")
 def get_clipboard_data_robust():
     """
     健壮的剪贴板数据获取和解析函数。
     它会模拟 "全选" (Ctrl+A) 和 "复制" (Ctrl+C)，然后优先尝试用HTML格式解析剪贴板内容。
+    内容与之前读取过的片段完全相同时，直接使用缓存的解析结果。
     这是获取当前屏幕题目信息的主要入口点。
 
     Returns:
@@ -473,16 +1593,28 @@ def get_clipboard_data_robust():
     # 模拟键盘操作，确保题目区域被选中并复制
     pyautogui.hotkey('ctrl', 'a'); time.sleep(DELAY_AFTER_SELECT_ALL)
     pyautogui.hotkey('ctrl', 'c'); time.sleep(DELAY_AFTER_COPY)
+    # 全选会改变页面的高亮状态，之前的截图不再可信
+    invalidate_frame_cache()
     
     html_content = _get_html_from_clipboard()
     if not html_content:
         logger.error("❌ 未能从剪贴板获取HTML内容。请确保目标窗口支持HTML复制。")
+        record_event("clipboard", html=None)
         return None
         
-    parsed_data = _parse_html_data(html_content)
+    parse_start = time.perf_counter()
+    parsed_data, cache_hit = _parse_html_data_cached(html_content)
+    record_event("clipboard", html=html_content, parsed=parsed_data, cache_hit=cache_hit,
+                 parse_dur=round(time.perf_counter() - parse_start, 6))
     if parsed_data:
-        logger.info(f"✅ [HTML解析成功] 题目: {parsed_data['q_num']}, 已选: {parsed_data['selected_options'] or '无'}")
+        lookups = run_stats["parse_cache_hits"] + run_stats["parse_cache_misses"]
+        hit_rate = f", 解析缓存{'命中' if cache_hit else '未命中'} (命中率 {run_stats['parse_cache_hits'] / lookups:.0%})" if lookups else ""
+        logger.info(f"✅ [HTML解析成功] 题目: {parsed_data['q_num']}, 已选: {parsed_data['selected_options'] or '无'}{hit_rate}")
+        remember_selection_state(parsed_data)
         return parsed_data
+    elif cache_hit:
+        logger.error("❌ HTML内容解析失败 (与之前失败的内容相同)，无法获取题目信息。")
+        return None
     else:
         logger.error("❌ HTML内容解析失败，无法获取题目信息。")
         # 将解析失败的HTML内容保存到文件，以便于调试分析问题
@@ -492,8 +1624,200 @@ def get_clipboard_data_robust():
         logger.error(f"失败的HTML内容已保存至: {failed_html_path}")
         return None
 
+# --- 模板匹配 ---
+
+_roi_templates = {}      # 模板文件路径 -> 在小窗口内匹配时使用的更严格的Template对象
+template_gray = {}       # 模板文件路径 -> 预处理后的灰度数组
+template_match_scale = None  # 本次运行中确定的模板缩放比例，None 表示尚未确定
+_scaled_templates = {}   # (模板文件路径, 缩放比例) -> 缩放后的灰度数组
+
+def _decode_template_gray(path):
+    """把模板图片解码为灰度数组 (使用 imdecode 以支持包含中文的路径)。"""
+    image = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        raise ValueError(f"无法解码模板图片: {path}")
+    return image
+
+def _get_template_gray(path):
+    """获取模板的灰度数组，未预加载时解码并缓存在内存中。"""
+    gray = template_gray.get(path)
+    if gray is None:
+        gray = template_gray[path] = _decode_template_gray(path)
+    return gray
+
+def _get_scaled_template(path, scale):
+    """获取按 scale 缩放后的模板灰度数组 (带缓存)。"""
+    key = (path, scale)
+    scaled = _scaled_templates.get(key)
+    if scaled is None:
+        scaled = _scaled_templates[key] = _resize_gray(_get_template_gray(path), scale)
+    return scaled
+
+def _resize_gray(image, scale):
+    if scale == 1.0:
+        return image
+    interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+    return cv2.resize(image, None, fx=scale, fy=scale, interpolation=interpolation)
+
+def _to_gray(screen_img):
+    """
+    把截图转换为灰度图。连续对同一帧调用时直接返回上一次的结果。
+    结果按会话缓存，并作为一个元组整体替换，会话的后台匹配线程同时调用时也不会拿到另一帧的灰度图。
+    """
+    if screen_img.ndim == 2:
+        return screen_img
+    session = current_session()
+    source, gray = session.gray_frame
+    if source is not screen_img:
+        gray = cv2.cvtColor(screen_img, cv2.COLOR_BGR2GRAY)
+        session.gray_frame = (screen_img, gray)
+    return gray
+
+def _match_gray(template_img, screen_gray):
+    """
+    在灰度截图中做一次归一化相关系数匹配 (与 airtest 的 tpl 方法相同)。
+
+    Returns:
+        tuple: (最高相似度, 模板中心坐标)。模板过小或大于截图时返回 (-1.0, None)。
+    """
+    th, tw = template_img.shape[:2]
+    if th < 6 or tw < 6 or th > screen_gray.shape[0] or tw > screen_gray.shape[1]:
+        return -1.0, None
+    result = cv2.matchTemplate(screen_gray, template_img, cv2.TM_CCOEFF_NORMED)
+    _, max_val, _, max_loc = cv2.minMaxLoc(result)
+    return max_val, (int(max_loc[0] + tw / 2), int(max_loc[1] + th / 2))
+
+def _search_template_scale(template_img, screen_gray):
+    """
+    由粗到细地搜索模板在截图中的缩放比例：
+    先在缩小一半的图像上按等比间隔尝试 TEMPLATE_SCALE_STEPS 个比例，再在原图上细化最佳比例附近。
+
+    Returns:
+        tuple: (最高相似度, 模板中心坐标, 缩放比例)
+    """
+    ratio = (TEMPLATE_SCALE_MAX / TEMPLATE_SCALE_MIN) ** (1.0 / max(TEMPLATE_SCALE_STEPS - 1, 1))
+    scales = [TEMPLATE_SCALE_MIN * ratio ** i for i in range(TEMPLATE_SCALE_STEPS)]
+    small_screen = _resize_gray(screen_gray, 0.5)
+    best_scale = max(scales, key=lambda scale: _match_gray(_resize_gray(template_img, scale * 0.5), small_screen)[0])
+    best = (-1.0, None, best_scale)
+    for k in range(-2, 3):
+        scale = best_scale * ratio ** (k / 4.0)
+        score, pos = _match_gray(_resize_gray(template_img, scale), screen_gray)
+        if score > best[0]:
+            best = (score, pos, scale)
+    return best
+
+def reset_template_scale():
+    """忘记本次运行中确定的模板缩放比例 (以及依赖它的区域缓存和选项布局)，下次匹配时重新搜索。"""
+    global template_match_scale
+    template_match_scale = None
+    _scaled_templates.clear()
+    current_session().template_roi_cache.clear()
+    current_session().option_layout = _empty_option_layout()
+
+def match_template_multiscale(path, screen_gray, threshold, allow_search=True):
+    """
+    使用预处理的灰度模板进行多尺度匹配。
+    已确定缩放比例时只在该比例下匹配；否则先试 1.0，失败再搜索比例，找到后在本次运行中记住它。
+
+    Args:
+        path (str): 模板图片路径。
+        screen_gray (numpy.ndarray): 灰度截图。
+        threshold (float): 相似度阈值。
+        allow_search (bool): 缩放比例未确定时是否允许进行多尺度搜索。
+
+    Returns:
+        tuple or None: 模板中心在截图中的坐标，未找到返回None。
+    """
+    global template_match_scale
+    if template_match_scale is not None:
+        score, pos = _match_gray(_get_scaled_template(path, template_match_scale), screen_gray)
+        return pos if score >= threshold else None
+
+    scale = 1.0
+    score, pos = _match_gray(_get_template_gray(path), screen_gray)
+    if score < threshold:
+        if not allow_search:
+            return None
+        record_stat("template_scale_searches")
+        score, pos, scale = _search_template_scale(_get_template_gray(path), screen_gray)
+        # 非 1.0 的比例会被整个运行沿用，要求更高的相似度，避免因一次误匹配锁定错误的比例
+        if score < max(threshold, TEMPLATE_ROI_MIN_CONFIDENCE):
+            return None
+    template_match_scale = scale
+    if scale != 1.0:
+        logger.info(f"🔍 模板缩放比例已确定为 {scale:.3f} (相似度 {score:.2f})，本次运行中将沿用。")
+    return pos
+
+def _get_roi_template(template):
+    """获取(或创建)与 template 同图片、但使用更严格阈值的Template对象，用于小窗口匹配。"""
+    roi_template = _roi_templates.get(template.filename)
+    if roi_template is None:
+        roi_template = airtest_cv.Template(template.filename, threshold=max(template.threshold, TEMPLATE_ROI_MIN_CONFIDENCE))
+        _roi_templates[template.filename] = roi_template
+    return roi_template
+
+def _match_once(template, screen_img, strict=False):
+    """用配置的匹配器在 screen_img 中匹配一次模板。strict 为 True 时使用小窗口匹配的更严格阈值。"""
+    if USE_TEMPLATE_CACHE:
+        threshold = max(template.threshold, TEMPLATE_ROI_MIN_CONFIDENCE) if strict else template.threshold
+        return match_template_multiscale(template.filename, screen_img, threshold, allow_search=not strict)
+    return (_get_roi_template(template) if strict else template).match_in(screen_img)
+
+@timed_span("match")
+def match_template(template, screen_img):
+    """
+    在截图中匹配模板，优先在上一次匹配位置附近的小窗口内搜索，未命中时回退到全图搜索。
+
+    Args:
+        template (Template): 要匹配的模板。
+        screen_img (numpy.ndarray): 当前会话区域的截图 (BGR)。
+
+    Returns:
+        tuple or None: 模板中心在区域内的相对坐标，未找到返回None。
+    """
+    if _run_recorder is not None:
+        frame_id = _run_recorder.frame_id(screen_img)
+        start = time.perf_counter()
+        pos = _match_template(template, screen_img)
+        record_event("match", template=os.path.basename(template.filename), frame=frame_id,
+                     pos=[float(pos[0]), float(pos[1])] if pos else None, dur=round(time.perf_counter() - start, 6))
+        return pos
+    return _match_template(template, screen_img)
+
+def _match_template(template, screen_img):
+    """match_template 的实现 (开启运行录制时由 match_template 计时并记录结果)。"""
+    if USE_TEMPLATE_CACHE:
+        # 整帧只转换一次灰度，小窗口匹配直接在灰度图上切片
+        screen_img = _to_gray(screen_img)
+    template_roi_cache = current_session().template_roi_cache
+    if USE_TEMPLATE_ROI_CACHE:
+        last_pos = template_roi_cache.get(template.filename)
+        if last_pos:
+            img_h, img_w = screen_img.shape[:2]
+            x1 = max(0, int(last_pos[0]) - TEMPLATE_ROI_MARGIN)
+            y1 = max(0, int(last_pos[1]) - TEMPLATE_ROI_MARGIN)
+            x2 = min(img_w, int(last_pos[0]) + TEMPLATE_ROI_MARGIN)
+            y2 = min(img_h, int(last_pos[1]) + TEMPLATE_ROI_MARGIN)
+            pos = _match_once(template, screen_img[y1:y2, x1:x2], strict=True)
+            if pos:
+                record_stat("roi_cache_hits")
+                pos = (pos[0] + x1, pos[1] + y1)
+                template_roi_cache[template.filename] = pos
+                return pos
+        record_stat("roi_cache_misses")
+
+    pos = _match_once(template, screen_img)
+    if pos and USE_TEMPLATE_ROI_CACHE:
+        template_roi_cache[template.filename] = pos
+    return pos
+
 # --- 逻辑函数 ---
 
+def _safe_q_num(q_num):
+    """清理题号中的非法文件名字符，用于命名截图文件。"""
+    return re.sub(r'[\\/*?:"<>|]', "_", q_num) if q_num else "unknown_q"
+
 def find_submit_button_with_scroll(q_num, screenshot_dir):
     """
     在屏幕上查找“提交”按钮，如果找不到，则尝试滚动页面后再次查找。
@@ -506,51 +1830,221 @@ def find_submit_button_with_scroll(q_num, screenshot_dir):
         tuple: (坐标, 是否滚动过)，如果找到按钮，返回其在区域内的相对坐标和是否经过滚动；
                如果最终没找到，返回 (None, True)。
     """
-    # 清理题号中的非法文件名字符
-    safe_q_num = re.sub(r'[\\/*?:"<>|]', "_", q_num) if q_num else "unknown_q"
+    safe_q_num = _safe_q_num(q_num)
     screenshot_path_1 = os.path.join(screenshot_dir, f"{safe_q_num}_1_find_submit.png")
     
     # 第一次尝试，不滚动
     screen_img = capture_region(filename=screenshot_path_1)
-    submit_pos = TEMPLATE_SUBMIT.match_in(screen_img)
+    submit_pos = match_template(TEMPLATE_SUBMIT, screen_img)
     if submit_pos:
         return submit_pos, False # 找到了，且未滚动
 
     logger.info(f"未找到[提交按钮]，开始滚动查找...")
     for i in range(MAX_SCROLL_ATTEMPTS):
+        before = settle_view(screen_img) if USE_SETTLE_DETECTION else None
         scroll_in_region()
-        time.sleep(POST_SCROLL_DELAY)
+        wait_until_settled(POST_SCROLL_DELAY, before)
         screen_img = capture_region() # 滚动后重新截图
-        submit_pos = TEMPLATE_SUBMIT.match_in(screen_img)
+        submit_pos = match_template(TEMPLATE_SUBMIT, screen_img)
         if submit_pos:
-            screenshot_path_2 = os.path.join(screenshot_dir, f"{safe_q_num}_2_scrolled_submit.png")
-            cv2.imwrite(screenshot_path_2, screen_img) # 保存找到按钮的截图
-            logger.info(f"滚动后找到[提交按钮]。已保存滚动后的截图: {screenshot_path_2}")
+            logger.info(f"滚动后找到[提交按钮]。")
+            # 保存找到按钮的截图
+            save_screenshot(screen_img, os.path.join(screenshot_dir, f"{safe_q_num}_2_scrolled_submit.png"))
             return submit_pos, True # 找到了，且滚动过
             
     logger.warning(f"滚动 {MAX_SCROLL_ATTEMPTS} 次后仍未找到[提交按钮]！")
+    save_screenshot(screen_img, os.path.join(screenshot_dir, f"{safe_q_num}_3_submit_not_found.png"), important=True)
     return None, True # 最终没找到
 
-def find_available_options():
+# --- 选项布局 ---
+
+def calibrate_option_layout(available):
+    """
+    用一次完整匹配的结果校准当前会话的选项布局。
+    只有从 A 开始连续、x 坐标相同且等间距排列的结果才会被采用 (例如某个选项的文字换行时不更新)。
+
+    Args:
+        available (dict): find_available_options 完整匹配得到的 {选项名: 坐标}。
+
+    Returns:
+        bool: 是否更新了布局。
+    """
+    letters = sorted(available)
+    if len(letters) < 2 or letters != [chr(ord('A') + i) for i in range(len(letters))]:
+        return False
+    xs = [available[letter][0] for letter in letters]
+    ys = [available[letter][1] for letter in letters]
+    x, pitch = sum(xs) / len(xs), (ys[-1] - ys[0]) / (len(letters) - 1)
+    if pitch <= OPTION_LAYOUT_TOLERANCE or any(abs(xs[i] - x) > OPTION_LAYOUT_TOLERANCE or
+                                               abs(ys[i] - (ys[0] + i * pitch)) > OPTION_LAYOUT_TOLERANCE
+                                               for i in range(len(letters))):
+        return False
+    layout = current_session().option_layout
+    layout.update(x=x, pitch=pitch, last_count=len(letters))
+    layout["offsets"][len(letters)] = ys[0]
+    record_stat("layout_calibrations")
+    return True
+
+def _match_option_in_box(screen_img, letter, box):
+    """在截图的 box = (x1, y1, x2, y2) 范围内匹配选项 letter 的模板，返回区域内坐标，未找到返回None。"""
+    img_h, img_w = screen_img.shape[:2]
+    x1, y1 = max(0, int(box[0])), max(0, int(box[1]))
+    x2, y2 = min(img_w, int(box[2])), min(img_h, int(box[3]))
+    if x2 <= x1 or y2 <= y1:
+        return None
+    for template in TEMPLATE_OPTIONS.get(letter, []):
+        pos = _match_once(template, screen_img[y1:y2, x1:x2], strict=True)
+        if pos:
+            return (pos[0] + x1, pos[1] + y1)
+    return None
+
+def _confirm_option_layout(screen_img, first_y, option_count):
+    """按布局推算各选项坐标，在最后一个选项的推算位置附近匹配一次来确认。确认成功返回 {选项名: 坐标}，否则返回None。"""
+    layout = current_session().option_layout
+    x, pitch, margin = layout["x"], layout["pitch"], OPTION_LAYOUT_MARGIN
+    predicted = {chr(ord('A') + i): (x, first_y + i * pitch) for i in range(option_count)}
+    last = chr(ord('A') + option_count - 1)
+    last_x, last_y = predicted[last]
+    # 推算的位置有一部分超出截图时 (例如页面滚动过)，无法确认
+    if first_y - margin < 0 or last_y + margin > screen_img.shape[0]:
+        return None
+    pos = _match_option_in_box(screen_img, last, (last_x - margin, last_y - margin, last_x + margin, last_y + margin))
+    if not pos or abs(pos[0] - last_x) > OPTION_LAYOUT_TOLERANCE or abs(pos[1] - last_y) > OPTION_LAYOUT_TOLERANCE:
+        return None
+    predicted[last] = pos
+    return predicted
+
+def locate_options_by_layout(screen_img, option_count):
+    """
+    按校准的选项布局推算 option_count 个选项的坐标：先用这种选项数量下记住的位置确认一次；
+    失败时在选项列中重新查找 A，按新位置再确认一次 (并记住新位置)。
+
+    Args:
+        screen_img (numpy.ndarray): 当前会话区域的截图 (BGR)。
+        option_count (int): 题目的选项数量。
+
+    Returns:
+        dict or None: {选项名: 区域内坐标}，布局未校准或两次确认都失败时返回None。
+    """
+    layout = current_session().option_layout
+    if layout["pitch"] is None or not 1 <= option_count <= len(TEMPLATE_OPTIONS):
+        return None
+    if USE_TEMPLATE_CACHE:
+        screen_img = _to_gray(screen_img)
+    first_y = layout["offsets"].get(option_count)
+    if first_y is not None:
+        available = _confirm_option_layout(screen_img, first_y, option_count)
+        if available:
+            record_stat("layout_hits")
+            layout["last_count"] = option_count
+            return available
+    # 在选项列 (x 附近的竖条) 中重新查找 A
+    x, margin = layout["x"], OPTION_LAYOUT_MARGIN
+    pos_a = _match_option_in_box(screen_img, 'A', (x - margin, 0, x + margin, screen_img.shape[0]))
+    if pos_a and abs(pos_a[0] - x) <= OPTION_LAYOUT_TOLERANCE:
+        available = _confirm_option_layout(screen_img, pos_a[1], option_count)
+        if available:
+            record_stat("layout_realigned")
+            layout["offsets"][option_count] = pos_a[1]
+            layout["last_count"] = option_count
+            available['A'] = pos_a
+            return available
+    record_stat("layout_misses")
+    return None
+
+def find_available_options(screen_img=None, option_count=None):
     """
     在当前屏幕截图中查找所有可见的选项标识 (A, B, C, D)。
+    提供 option_count 且选项布局已校准时，按布局推算坐标并只做一次确认匹配；否则逐个匹配选项模板，并用结果校准布局。
+
+    Args:
+        screen_img (numpy.ndarray, optional): 要查找的截图，默认重新截取当前会话区域。
+        option_count (int, optional): 题目的选项数量 (来自剪贴板HTML)。
 
     Returns:
         dict: 一个字典，键为选项名 ('A', 'B', ...)，值为其在区域内的相对坐标。
     """
+    if screen_img is None:
+        screen_img = capture_region()
+    if USE_OPTION_LAYOUT and option_count:
+        available = locate_options_by_layout(screen_img, option_count)
+        if available:
+            return available
     available = {}
-    screen_img = capture_region()
     # 遍历所有选项模板进行匹配
     for name, template_list in sorted(TEMPLATE_OPTIONS.items()):
         for template in template_list:
-            pos = template.match_in(screen_img)
+            pos = match_template(template, screen_img)
             if pos:
                 available[name] = pos
                 break # 找到一个匹配的模板后，就不用再试这个选项的其他模板了
+    if USE_OPTION_LAYOUT and available and option_count in (None, len(available)):
+        calibrate_option_layout(available)
     if not available:
         logger.warning("在当前屏幕上未找到任何选项标识 (A, B, C, D)。")
+        if USE_TEMPLATE_CACHE and template_match_scale is not None:
+            # 可能是运行中途改变了缩放，下次匹配时重新搜索缩放比例
+            logger.info("已重置模板缩放比例，下次匹配时重新搜索。")
+            reset_template_scale()
     return available
 
+# --- 截图匹配流水线 ---
+
+_pipeline_executor = None  # 流水线模式使用的后台线程 (第一次使用时创建)
+
+def _prefetch_targets(session, captured):
+    """后台线程：截一帧后立即通知主线程，然后在这一帧上匹配提交按钮和选项。"""
+    use_session(session)
+    try:
+        screen_img = capture_region()
+    finally:
+        captured.set()
+    # 使用线程CPU时间，即顺序执行时本来需要的匹配耗时
+    start = time.thread_time()
+    submit_pos = match_template(TEMPLATE_SUBMIT, screen_img)
+    # 提交按钮不在当前画面时需要滚动后按原流程重新查找，这一帧的选项位置也就用不上了。
+    # 此时剪贴板还没读完，不知道选项数量，先按上一道题的数量推算，主线程拿到题目后再核对
+    options_pos = find_available_options(screen_img, session.option_layout["last_count"]) if submit_pos else {}
+    return {"frame": screen_img, "submit_pos": submit_pos, "options_pos": options_pos,
+            "match_seconds": time.thread_time() - start}
+
+def start_target_prefetch():
+    """
+    在后台线程中启动一次截图与匹配。截图完成后才返回，之后主线程才可以发送按键。
+
+    Returns:
+        Future: 结果为包含 frame/submit_pos/options_pos/match_seconds 的字典。
+    """
+    global _pipeline_executor
+    if _pipeline_executor is None:
+        _pipeline_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="capture_match")
+    captured = threading.Event()
+    future = _pipeline_executor.submit(_prefetch_targets, current_session(), captured)
+    captured.wait()
+    return future
+
+def join_target_prefetch(future, clipboard_seconds):
+    """
+    等待后台匹配完成，并估算流水线节省的时间：顺序执行时匹配和剪贴板读取的耗时相加，
+    流水线执行时只需要两者中较长的一个，因此节省的是较短的那一个。
+
+    Args:
+        future (Future): start_target_prefetch 返回的任务。
+        clipboard_seconds (float): 主线程读取并解析剪贴板的耗时。
+
+    Returns:
+        dict or None: 预取结果 (增加 wait_seconds/saved_seconds 字段)，后台任务出错时返回None。
+    """
+    start = time.perf_counter()
+    try:
+        result = future.result()
+    except Exception as e:
+        logger.warning(f"后台截图/匹配出错，将按顺序重新查找: {e}")
+        return None
+    result["wait_seconds"] = time.perf_counter() - start
+    result["saved_seconds"] = min(result["match_seconds"], clipboard_seconds)
+    return result
+
 def validate_all_options_visible():
     """
     脚本启动时的预检函数。检查是否能识别出所有必需的选项模板 (A,B,C,D)。
@@ -561,9 +2055,9 @@ def validate_all_options_visible():
     """
     logger.info("="*20 + " 开始初始环境校验 " + "="*20)
     logger.info(f"脚本将在{INITIAL_VALIDATION_DELAY}秒后进行屏幕选项校验...")
-    time.sleep(INITIAL_VALIDATION_DELAY)
+    session_wait(INITIAL_VALIDATION_DELAY)
     
-    screen_img = capture_region(filename=os.path.join(SCREENSHOT_RUN_DIR, "validation_screenshot.png"))
+    screen_img = capture_region(filename=os.path.join(current_session().screenshot_dir, "validation_screenshot.png"), important=True)
     expected_options = set(TEMPLATE_OPTIONS.keys())
     found_options_map = find_available_options() # 直接复用查找函数
     found_options = set(found_options_map.keys())
@@ -585,24 +2079,920 @@ def initialize_and_activate():
         bool: 激活成功返回 True, 否则 False。
     """
     logger.info("正在进行初始化操作：激活窗口...")
-    submit_pos, _ = find_submit_button_with_scroll("initial_check", SCREENSHOT_RUN_DIR)
+    submit_pos, _ = find_submit_button_with_scroll("initial_check", current_session().screenshot_dir)
     if submit_pos:
         logger.info("找到[提交按钮]，点击一次以激活窗口。")
+        before = settle_view(capture_region()) if USE_SETTLE_DETECTION else None
         click_at_region_pos(submit_pos)
-        time.sleep(POST_ACTIVATION_CLICK_DELAY) # 等待可能的弹窗或反应
+        wait_until_settled(POST_ACTIVATION_CLICK_DELAY, before) # 等待可能的弹窗或反应
         return True
     else:
         logger.error("初始化失败：未能找到[提交按钮]来激活窗口。请确保目标答题界面已在前台。")
         return False
 
-def load_qa_bank():
-    """在脚本启动时从JSON文件加载题库数据到全局变量 qa_bank。"""
-    global qa_bank
+def normalize_text(text):
+    """
+    规范化题目/选项文本，消除全角/半角标点和空白差异。
+    例如 "你好，世界 " 与 "你好,世界" 规范化后相同。
+    """
+    text = unicodedata.normalize('NFKC', text)
+    return re.sub(r'\s+', '', text)
+
+_IMAGE_URL_RE = re.compile(r'^(?:https?:)?//', re.IGNORECASE)
+image_option_keys = {}  # 图片URL -> 感知哈希键 ("phash:<16位十六进制>")，保存在 IMAGE_OPTION_KEY_CACHE_FILE
+
+def is_image_option(text):
+    """选项文本是否为图片URL (图片选项)。"""
+    return bool(text) and _IMAGE_URL_RE.match(text.strip()) is not None
+
+def canonical_image_key(url):
+    """
+    图片选项的规范键：忽略协议、域名、查询参数和片段，只保留URL路径中的文件名 (小写)。
+    例如 "https://cdn-2.example.com/a/b/Task93.png?t=123&sign=xx" -> "img:task93.png"。
+    """
+    path = urlsplit(url.strip()).path
+    name = unquote(path.rstrip('/').rsplit('/', 1)[-1]).lower()
+    return f"img:{name or path.lower()}"
+
+def normalize_option(text, use_phash=False):
+    """
+    规范化选项文本，作为题库索引中的选项键。
+    文字选项同 normalize_text；图片选项使用 canonical_image_key，
+    use_phash 为 True 时改用缓存的感知哈希键 (该URL还没有哈希时返回None)。
+    """
+    if is_image_option(text):
+        return image_option_keys.get(text.strip()) if use_phash else canonical_image_key(text)
+    return normalize_text(text)
+
+def make_qa_key(q_text, option_texts, use_phash=False):
+    """
+    生成题库索引的键: (规范化问题文本, 规范化选项的frozenset)。
+    use_phash 为 True 时图片选项使用感知哈希键，有图片选项还没有哈希时返回None。
+    """
+    options = [normalize_option(opt, use_phash) for opt in option_texts]
+    if None in options:
+        return None
+    return normalize_text(q_text), frozenset(options)
+
+def add_to_qa_bank_index(q_text, option_texts, answer_texts):
+    """将一个 (问题, 选项集) 变种及其答案加入题库索引，已有的同键变种会被覆盖。"""
+    key = make_qa_key(q_text, option_texts)
+    qa_bank_index[key] = list(answer_texts)
+    qa_bank_questions.add(key[0])
+    if USE_IMAGE_OPTION_PHASH and any(is_image_option(opt) for opt in option_texts):
+        # 图片选项都有感知哈希时，再按哈希键登记一次，文件名变了也能命中
+        phash_key = make_qa_key(q_text, option_texts, use_phash=True)
+        if phash_key:
+            qa_bank_index[phash_key] = list(answer_texts)
+
+def combo_key(option_texts):
+    """一个选项组合的键：规范化选项文本的 frozenset，与选项顺序和字母无关。"""
+    return frozenset(normalize_option(text) for text in option_texts)
+
+def index_variant(q_text, variant):
+    """
+    将题库中的一个变种加入索引：有答案时登记答案；还没有答案、只记录了排除的错误组合 (eliminated) 时，
+    把这些组合登记到 qa_bank_eliminated，遍历时跳过。
+    """
+    if variant['answer']:
+        add_to_qa_bank_index(q_text, variant['options'], variant['answer'])
+    elif variant.get('eliminated'):
+        key = make_qa_key(q_text, variant['options'])
+        qa_bank_eliminated.setdefault(key, set()).update(combo_key(combo) for combo in variant['eliminated'])
+
+def map_answers_to_letters(q_info, answer_texts):
+    """
+    把题库中的答案文本映射回当前屏幕上的选项字母，按规范化的选项键比较。
+    图片选项先按文件名比较，不能完全对应时再按感知哈希比较。
+
+    Returns:
+        list: 选项字母列表，无法完全对应时返回空列表。
+    """
+    for use_phash in ((False, True) if USE_IMAGE_OPTION_PHASH else (False,)):
+        option_to_letter = {normalize_option(text, use_phash): letter for letter, text in q_info['options'].items()}
+        letters = [option_to_letter.get(normalize_option(ans, use_phash)) for ans in answer_texts]
+        if None not in option_to_letter and letters and None not in letters:
+            return letters
+    return []
+
+def perceptual_hash(image):
+    """计算图像的64位感知哈希 (DCT pHash)，返回16位十六进制字符串。"""
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].flatten()
+    bits = low > np.median(low[1:])
+    return f"{int(''.join('1' if bit else '0' for bit in bits), 2):016x}"
+
+def _hamming_distance(hex_a, hex_b):
+    return bin(int(hex_a, 16) ^ int(hex_b, 16)).count("1")
+
+def load_image_option_keys():
+    """从 IMAGE_OPTION_KEY_CACHE_FILE 加载图片URL -> 感知哈希键的缓存。"""
+    image_option_keys.clear()
+    if os.path.exists(IMAGE_OPTION_KEY_CACHE_FILE):
+        try:
+            with open(IMAGE_OPTION_KEY_CACHE_FILE, 'r', encoding='utf-8') as f:
+                image_option_keys.update(json.load(f))
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"图片选项哈希缓存 '{IMAGE_OPTION_KEY_CACHE_FILE}' 读取失败: {e}")
+    return len(image_option_keys)
+
+def hash_image_options(q_info, options_pos, screen_img=None):
+    """
+    为当前题目中还没有哈希的图片选项计算屏幕截图的感知哈希，记入 image_option_keys 并保存缓存。
+    与已知哈希的距离在 IMAGE_OPTION_PHASH_MAX_DISTANCE 以内时沿用已知哈希，保证同一图片的键完全相同。
+    截图区域为空白、或同一题的两个图片选项得到相同的哈希时 (截图区域可能没有对准图片)，不记录任何哈希。
+
+    Args:
+        q_info (dict): 当前题目的信息。
+        options_pos (dict): 选项字母图标的坐标。
+        screen_img (numpy.ndarray, optional): 截图，默认重新截取。
+
+    Returns:
+        int: 新记录的图片选项数量。
+    """
+    image_urls = {letter: text.strip() for letter, text in q_info['options'].items() if is_image_option(text)}
+    pending = {letter: url for letter, url in image_urls.items() if url not in image_option_keys and letter in options_pos}
+    # 选中的选项有高亮背景，截图与未选中时不同
+    if not pending or q_info.get('selected_options'):
+        return 0
+    if screen_img is None:
+        screen_img = capture_region()
+
+    img_h, img_w = screen_img.shape[:2]
+    left, top, right, bottom = IMAGE_OPTION_CROP_BOX
+    known = set(image_option_keys.values())
+    new_keys = {}
+    for letter, url in pending.items():
+        x, y = options_pos[letter]
+        crop = screen_img[max(0, int(y + top)):min(img_h, int(y + bottom)), max(0, int(x + left)):min(img_w, int(x + right))]
+        if crop.size == 0 or float(crop.std()) < 5.0:
+            logger.warning(f"图片选项 {letter} 的截图区域为空白，请检查 IMAGE_OPTION_CROP_BOX。")
+            return 0
+        digest = perceptual_hash(crop)
+        nearest = min(known, key=lambda k: _hamming_distance(k[6:], digest), default=None)
+        if nearest and _hamming_distance(nearest[6:], digest) <= IMAGE_OPTION_PHASH_MAX_DISTANCE:
+            new_keys[url] = nearest
+        else:
+            new_keys[url] = f"phash:{digest}"
+
+    existing = [image_option_keys[url] for url in image_urls.values() if url in image_option_keys]
+    all_keys = existing + list(new_keys.values())
+    if len(set(all_keys)) < len(all_keys):
+        logger.warning("同一题的多个图片选项得到了相同的感知哈希，本题不使用哈希识别。")
+        return 0
+
+    image_option_keys.update(new_keys)
+    try:
+        with open(IMAGE_OPTION_KEY_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(image_option_keys, f, ensure_ascii=False, indent=4)
+    except OSError as e:
+        logger.warning(f"图片选项哈希缓存 '{IMAGE_OPTION_KEY_CACHE_FILE}' 写入失败: {e}")
+    logger.info(f"🖼️ 已为 {len(new_keys)} 个图片选项记录感知哈希。")
+    return len(new_keys)
+
+def build_qa_bank_index():
+    """根据全局 qa_bank 重建题库索引。"""
+    qa_bank_index.clear()
+    qa_bank_questions.clear()
+    qa_bank_eliminated.clear()
+    for q_text, variants in qa_bank.items():
+        for variant in variants:
+            index_variant(q_text, variant)
+
+def build_answer_prior(bank):
+    """
+    从题库中统计多选题遍历所需的先验：
+    - size_counts: 多选题 (答案数>=2) 的答案个数分布
+    - position_counts / position_questions: 各选项字母作为正确答案的次数 (仅统计记录了 answer_letters 的变种)
+    - text_answer_counts / text_option_counts: 每个规范化选项文本作为正确答案/作为选项出现的次数
+
+    Args:
+        bank (dict): 题库数据，格式与 master_qa_bank.json 相同。
+
+    Returns:
+        dict: 先验统计数据。
+    """
+    prior = {
+        "size_counts": Counter(),
+        "position_counts": Counter(),
+        "position_questions": 0,
+        "text_answer_counts": Counter(),
+        "text_option_counts": Counter(),
+    }
+    for variants in bank.values():
+        for variant in variants:
+            if not variant['answer']:
+                continue  # 只记录了排除组合、还没有答案的变种
+            answers = {normalize_option(ans) for ans in variant['answer']}
+            for opt in variant['options']:
+                text = normalize_option(opt)
+                prior["text_option_counts"][text] += 1
+                if text in answers:
+                    prior["text_answer_counts"][text] += 1
+            if len(variant['answer']) >= 2:
+                prior["size_counts"][len(variant['answer'])] += 1
+                letters = variant.get('answer_letters')
+                if letters:
+                    prior["position_counts"].update(letters)
+                    prior["position_questions"] += 1
+    return prior
+
+def _logit(p):
+    p = min(max(p, 0.01), 0.99)
+    return math.log(p / (1 - p))
+
+def rank_multi_choice_combinations(q_info, option_letters, prior, smoothing=2.0):
+    """
+    按先验概率从高到低排列多选题的候选组合 (至少2个选项)。概率相同时保持原来的字典序。
+
+    每个选项被选中的概率由"位置正确率"和"该选项文本在题库中作为正确答案的比例"在对数几率上合成，
+    组合的概率 = P(答案个数) × P(组合 | 答案个数)。
+
+    Args:
+        q_info (dict): 当前题目信息。
+        option_letters (list): 可见选项字母 (已排序)。
+        prior (dict): build_answer_prior 的返回值。
+        smoothing (float): 拉普拉斯平滑强度。
+
+    Returns:
+        list: [(组合字母列表, 概率), ...]，按概率降序。
+    """
+    n = len(option_letters)
+    start_size = 2 if n > 1 else 1
+    sizes = list(range(start_size, n + 1))
+    size_counts = prior.get("size_counts", Counter())
+    size_total = sum(size_counts[k] for k in sizes)
+    size_prob = {k: (size_counts[k] + 1) / (size_total + len(sizes)) for k in sizes}
+
+    # 每个选项的基础正确率 = 期望答案个数 / 选项个数
+    expected_size = sum(k * p for k, p in size_prob.items())
+    base_rate = expected_size / n
+    position_counts = prior.get("position_counts", Counter())
+    position_questions = prior.get("position_questions", 0)
+    text_answer_counts = prior.get("text_answer_counts", Counter())
+    text_option_counts = prior.get("text_option_counts", Counter())
+
+    option_prob = {}
+    for letter in option_letters:
+        p_pos = (position_counts[letter] + base_rate * smoothing) / (position_questions + smoothing)
+        score = _logit(p_pos)
+        text = normalize_option(q_info['options'].get(letter, ""))
+        seen = text_option_counts[text]
+        if seen:
+            p_text = (text_answer_counts[text] + base_rate * smoothing) / (seen + smoothing)
+            score += _logit(p_text) - _logit(base_rate)
+        option_prob[letter] = 1 / (1 + math.exp(-score))
+
+    ranked = []
+    for k in sizes:
+        combos = list(combinations(option_letters, k))
+        weights = [math.prod(option_prob[l] if l in combo else 1 - option_prob[l] for l in option_letters)
+                   for combo in combos]
+        total = sum(weights) or 1.0
+        ranked.extend((list(combo), size_prob[k] * w / total) for combo, w in zip(combos, weights))
+    # sorted 是稳定排序，概率相同的组合保持字典序
+    return sorted(ranked, key=lambda item: -item[1])
+
+def expected_submits(ordered_probs):
+    """给定按尝试顺序排列的各组合概率，计算答对前的期望提交次数。"""
+    total = sum(ordered_probs) or 1.0
+    return sum((i + 1) * p for i, p in enumerate(ordered_probs)) / total
+
+def merge_variant_records(old, new):
+    """
+    合并同一 (问题, 选项集) 的两条变种记录，new 是较新的一条 (merge_tool.deep_merge_qa 使用相同的规则)：
+    - new 有答案时覆盖 old，实现"新答案覆盖旧答案"
+    - new 还没有答案、只记录了排除的错误组合时，old 有答案则保留 old，否则合并双方排除的组合
+    已知答案的变种不再需要排除记录，合并结果中不保留 eliminated。
+    """
+    if new['answer']:
+        return {k: v for k, v in new.items() if k != 'eliminated'}
+    if old['answer']:
+        return old
+    eliminated, seen = [], set()
+    for combo in old.get('eliminated', []) + new.get('eliminated', []):
+        key = combo_key(combo)
+        if key not in seen:
+            seen.add(key)
+            eliminated.append(combo)
+    return dict(new, answer=[], eliminated=eliminated)
+
+def merge_variant_into_bank(bank, q_text, variant):
+    """将一个变种合并进题库，与选项集相同的旧变种按 merge_variant_records 的规则合并。"""
+    variants = bank.setdefault(q_text, [])
+    for i, existing in enumerate(variants):
+        if make_qa_key(q_text, existing['options']) == make_qa_key(q_text, variant['options']):
+            variants[i] = merge_variant_records(existing, variant)
+            return
+    variants.append(variant)
+
+def read_solution_journal(journal_path, since=None):
+    """
+    读取一个解题日志文件。被强制中断时最后一行可能不完整，这类行会被跳过。
+
+    Args:
+        journal_path (str): 日志文件路径。
+        since (float, optional): 只返回写入时间 (记录的 time 字段) 不早于此时间戳的记录。没有 time 字段的记录总是返回。
+
+    Returns:
+        list: [(问题文本, 变种字典), ...]
+    """
+    entries = []
+    with open(journal_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                if since is not None and record.get("time") and \
+                        time.mktime(time.strptime(record["time"], '%Y-%m-%d %H:%M:%S')) < int(since):
+                    continue
+                variant = {"options": record["options"], "answer": record["answer"]}
+                if record.get("answer_letters"):
+                    variant["answer_letters"] = record["answer_letters"]
+                if record.get("eliminated"):
+                    variant["eliminated"] = record["eliminated"]
+                entries.append((record["q_text"], variant))
+            except (ValueError, KeyError, TypeError):
+                continue
+    return entries
+
+def replay_solution_journals(bank_path=None):
+    """
+    回放以往运行中遗留的解题日志：运行目录中有日志但没有 solution_map.json，说明那次运行被异常中断，
+    其答案还没有机会被 merge_tool 合并。按时间顺序将这些答案合并进 qa_bank。
+
+    已经记录在合并清单中且之后没有变化的日志会被跳过；其余日志只回放写入时间不早于题库文件的记录
+    (题库服务的日志会持续追加，其中较早的部分可能已经合并过)，避免旧答案覆盖题库中更新的答案。
+
+    Args:
+        bank_path (str, optional): 本次加载的题库文件，其修改时间作为回放的起点。不存在时回放全部记录。
+    """
+    if not os.path.isdir(SCREENSHOT_BASE_DIR):
+        return
+    manifest_path = os.path.join(SCREENSHOT_BASE_DIR, MERGE_MANIFEST_FILENAME)
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = {os.path.abspath(path): record for path, record in json.load(f).items()}
+    except FileNotFoundError:
+        manifest = {}
+    except (OSError, ValueError, AttributeError) as e:
+        logger.warning(f"读取合并清单 '{manifest_path}' 失败: {e}")
+        manifest = {}
+    bank_mtime = os.path.getmtime(bank_path) if bank_path and os.path.exists(bank_path) else None
+
+    replayed_runs, replayed_entries, skipped_runs = 0, 0, 0
+    for run_dir in sorted(os.listdir(SCREENSHOT_BASE_DIR)):
+        run_path = os.path.join(SCREENSHOT_BASE_DIR, run_dir)
+        journal_path = os.path.join(run_path, SOLUTION_JOURNAL_FILENAME)
+        if run_path == SCREENSHOT_RUN_DIR or not os.path.isfile(journal_path):
+            continue
+        if os.path.isfile(os.path.join(run_path, "solution_map.json")):
+            continue
+        try:
+            stat = os.stat(journal_path)
+            merged = manifest.get(os.path.abspath(journal_path))
+            if (merged and merged.get("size") == stat.st_size and merged.get("mtime") == stat.st_mtime) \
+                    or (bank_mtime is not None and stat.st_mtime <= bank_mtime):
+                skipped_runs += 1
+                continue
+            entries = read_solution_journal(journal_path, since=bank_mtime)
+        except OSError as e:
+            logger.warning(f"读取解题日志 '{journal_path}' 失败: {e}")
+            continue
+        for q_text, variant in entries:
+            merge_variant_into_bank(qa_bank, q_text, variant)
+        replayed_runs += 1
+        replayed_entries += len(entries)
+    if replayed_runs:
+        logger.info(f"已回放 {replayed_runs} 个中断运行的解题日志，共 {replayed_entries} 条记录 (答案或排除的错误组合)。")
+    if skipped_runs:
+        logger.info(f"跳过 {skipped_runs} 个已合并进题库的解题日志。")
+
+def append_solution_journal(q_text, entry):
+    """将一道刚解出的题目 (或一个刚排除的错误组合) 立即追加到本次运行的解题日志，并刷新到磁盘。"""
+    journal_path = os.path.join(SCREENSHOT_RUN_DIR, SOLUTION_JOURNAL_FILENAME)
+    record = dict(entry, q_text=q_text, time=time.strftime('%Y-%m-%d %H:%M:%S'))
+    try:
+        with open(journal_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+    except OSError as e:
+        logger.error(f"写入解题日志失败: {e}")
+
+class _SQLiteCounter:
+    """按需查询 SQLite 中选项文本统计的只读计数器，接口与 Counter 的 [] 取值一致 (不存在时为0)。"""
+
+    def __init__(self, conn, column):
+        self._conn = conn
+        self._column = column
+
+    def __getitem__(self, text):
+        row = self._conn.execute(f"SELECT {self._column} FROM option_texts WHERE text_norm = ?", (text,)).fetchone()
+        return row[0] if row else 0
+
+class SQLiteQABank:
+    """
+    基于 SQLite 的题库存储。以 (规范化问题, 规范化选项集) 为主键，查询时不需要把整个题库读入内存。
+    同时维护多选题先验 (答案个数/位置分布存于 meta 表，选项文本统计存于 option_texts 表)，供遍历排序按需查询。
+
+    Args:
+        db_path (str): 数据库文件路径，不存在时自动创建。
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS variants (
+            q_norm TEXT NOT NULL,
+            options_key TEXT NOT NULL,
+            q_text TEXT NOT NULL,
+            options TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            answer_letters TEXT,
+            eliminated TEXT,
+            PRIMARY KEY (q_norm, options_key)
+        );
+        CREATE TABLE IF NOT EXISTS option_texts (
+            text_norm TEXT PRIMARY KEY,
+            answer_count INTEGER NOT NULL DEFAULT 0,
+            option_count INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript(self.SCHEMA)
+        # 旧版本创建的数据库没有 eliminated 列
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(variants)")}
+        if "eliminated" not in columns:
+            self.conn.execute("ALTER TABLE variants ADD COLUMN eliminated TEXT")
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def _options_key(option_norms):
+        return "\x1f".join(sorted(option_norms))
+
+    @staticmethod
+    def _row_to_variant(options, answer, letters, eliminated):
+        variant = {"options": json.loads(options), "answer": json.loads(answer)}
+        if letters:
+            variant["answer_letters"] = json.loads(letters)
+        if eliminated:
+            variant["eliminated"] = json.loads(eliminated)
+        return variant
+
+    def count_variants(self):
+        # 变种数量记录在 meta 表中，避免启动时对大表做 COUNT(*) 全表扫描
+        return self._meta("variant_count", 0)
+
+    def lookup(self, key):
+        """按 make_qa_key 生成的键查找答案文本列表，未找到返回None。"""
+        row = self.conn.execute("SELECT answer FROM variants WHERE q_norm = ? AND options_key = ?",
+                                (key[0], self._options_key(key[1]))).fetchone()
+        # 只记录了排除组合的变种答案为空列表，视为没有答案
+        return (json.loads(row[0]) or None) if row else None
+
+    def eliminated(self, key):
+        """按 make_qa_key 生成的键查找已排除的错误组合 (选项文本列表的列表)。"""
+        row = self.conn.execute("SELECT eliminated FROM variants WHERE q_norm = ? AND options_key = ?",
+                                (key[0], self._options_key(key[1]))).fetchone()
+        return json.loads(row[0]) if row and row[0] else []
+
+    def has_question(self, q_norm):
+        return self.conn.execute("SELECT 1 FROM variants WHERE q_norm = ? LIMIT 1", (q_norm,)).fetchone() is not None
+
+    def _meta(self, name, default):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set_meta(self, name, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (name, json.dumps(value)))
+
+    def _apply_prior(self, variant, sign):
+        """把一个变种对先验统计的贡献加上 (sign=1) 或减去 (sign=-1)。还没有答案的变种不计入。"""
+        if not variant['answer']:
+            return
+        answers = {normalize_option(ans) for ans in variant['answer']}
+        for opt in variant['options']:
+            text = normalize_option(opt)
+            self.conn.execute(
+                "INSERT INTO option_texts (text_norm, answer_count, option_count) VALUES (?, ?, ?) "
+                "ON CONFLICT(text_norm) DO UPDATE SET answer_count = answer_count + excluded.answer_count, "
+                "option_count = option_count + excluded.option_count",
+                (text, sign if text in answers else 0, sign))
+        if len(variant['answer']) >= 2:
+            size_counts = self._meta("size_counts", {})
+            size = str(len(variant['answer']))
+            size_counts[size] = size_counts.get(size, 0) + sign
+            self._set_meta("size_counts", size_counts)
+            letters = variant.get('answer_letters')
+            if letters:
+                position_counts = self._meta("position_counts", {})
+                for letter in letters:
+                    position_counts[letter] = position_counts.get(letter, 0) + sign
+                self._set_meta("position_counts", position_counts)
+                self._set_meta("position_questions", self._meta("position_questions", 0) + sign)
+
+    def upsert(self, q_text, variant, commit=True):
+        """插入一个变种，选项集相同的旧变种按 merge_variant_records 的规则合并，并同步更新先验统计。"""
+        q_norm, option_norms = make_qa_key(q_text, variant['options'])
+        options_key = self._options_key(option_norms)
+        row = self.conn.execute(
+            "SELECT options, answer, answer_letters, eliminated FROM variants WHERE q_norm = ? AND options_key = ?",
+            (q_norm, options_key)).fetchone()
+        if row:
+            old_variant = self._row_to_variant(*row)
+            self._apply_prior(old_variant, -1)
+            variant = merge_variant_records(old_variant, variant)
+        else:
+            self._set_meta("variant_count", self._meta("variant_count", 0) + 1)
+        letters = variant.get('answer_letters')
+        eliminated = variant.get('eliminated')
+        self.conn.execute(
+            "INSERT OR REPLACE INTO variants (q_norm, options_key, q_text, options, answer, answer_letters, eliminated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (q_norm, options_key, q_text, json.dumps(variant['options'], ensure_ascii=False),
+             json.dumps(variant['answer'], ensure_ascii=False),
+             json.dumps(letters) if letters else None,
+             json.dumps(eliminated, ensure_ascii=False) if eliminated else None))
+        self._apply_prior(variant, 1)
+        if commit:
+            self.conn.commit()
+
+    def import_json(self, bank):
+        """把 JSON 格式的题库 (与 master_qa_bank.json 相同) 合并导入数据库，返回导入的变种数。"""
+        count = 0
+        with self.conn:
+            for q_text, variants in bank.items():
+                for variant in variants:
+                    self.upsert(q_text, variant, commit=False)
+                    count += 1
+        return count
+
+    def export_json(self):
+        """把数据库导出为 JSON 格式的题库字典。"""
+        bank = {}
+        for q_text, *row in self.conn.execute(
+                "SELECT q_text, options, answer, answer_letters, eliminated FROM variants ORDER BY rowid"):
+            bank.setdefault(q_text, []).append(self._row_to_variant(*row))
+        return bank
+
+    def answer_prior(self):
+        """返回与 build_answer_prior 结构相同的先验，其中选项文本统计按需从数据库查询。"""
+        return {
+            "size_counts": Counter({int(k): v for k, v in self._meta("size_counts", {}).items()}),
+            "position_counts": Counter(self._meta("position_counts", {})),
+            "position_questions": self._meta("position_questions", 0),
+            "text_answer_counts": _SQLiteCounter(self.conn, "answer_count"),
+            "text_option_counts": _SQLiteCounter(self.conn, "option_count"),
+        }
+
+class _RemoteCounter:
+    """按需向题库服务查询选项文本统计的只读计数器，接口与 Counter 的 [] 取值一致 (不存在或查询失败时为0)。"""
+
+    def __init__(self, client, field):
+        self._client = client
+        self._field = field
+
+    def __getitem__(self, text):
+        reply = self._client.request({"op": "option_count", "field": self._field, "text": text})
+        return reply["count"] if reply else 0
+
+
+class QABankClient:
+    """
+    题库服务 (tools/qa_bank_server.py) 的客户端，接口与 SQLiteQABank 的查询部分相同 (lookup/has_question/answer_prior)。
+    协议为本机TCP上每行一个JSON的请求/应答。另开一条订阅连接，由后台线程接收其他客户端学到的新答案。
+
+    请求失败时不抛出异常，返回None：服务对某个请求应答 ok=false 时只记录日志，连接仍然可用；
+    连接出错 (OSError、连接被关闭或收到无法解析的应答) 时标记为断开、调用一次 on_disconnect，由调用方回退到本地题库。
+
+    Args:
+        address (tuple): 服务地址 (主机, 端口)。
+        timeout (float): 单次请求的超时秒数。
+        on_learned (callable, optional): 收到推送的新答案时调用 on_learned(q_text, entry)，在后台线程中执行。
+        on_disconnect (callable, optional): 连接断开时调用一次 (可能在任意线程中)。
+    """
+
+    def __init__(self, address, timeout=1.0, on_learned=None, on_disconnect=None):
+        self.address = tuple(address)
+        self.timeout = timeout
+        self.client_id = f"{os.getpid()}-{id(self):x}"
+        self.on_learned = on_learned
+        self.on_disconnect = on_disconnect
+        self.connected = False
+        self._lock = threading.Lock()
+        self._sock = socket.create_connection(self.address, timeout=timeout)
+        self._file = self._sock.makefile('rwb')
+        self._subscriber = None
+        self.connected = True
+
+    def request(self, message):
+        """发送一个请求并等待应答，失败时返回None。"""
+        if not self.connected:
+            return None
+        try:
+            with self._lock:
+                self._file.write(json.dumps(message, ensure_ascii=False).encode('utf-8') + b"\n")
+                self._file.flush()
+                line = self._file.readline()
+            if not line:
+                raise ConnectionError("题库服务关闭了连接")
+            reply = json.loads(line)
+            if not isinstance(reply, dict):
+                raise ValueError(f"无法识别的应答: {line[:80]!r}")
+        except (OSError, ValueError) as e:
+            self._disconnect(e)
+            return None
+        if not reply.get("ok"):
+            # 只是这一个请求出错 (例如请求的字段不对)，连接本身仍然可用
+            logger.warning(f"⚠️ 题库服务未能处理请求 '{message.get('op')}': {reply.get('error', '未知错误')}")
+            return None
+        return reply
+
+    def _disconnect(self, error):
+        was_connected, self.connected = self.connected, False
+        self.close()
+        if was_connected:
+            logger.warning(f"⚠️ 题库服务 {self.address[0]}:{self.address[1]} 请求失败: {error}")
+            if self.on_disconnect:
+                self.on_disconnect()
+
+    def subscribe(self):
+        """打开订阅连接，在后台线程中接收新答案推送。"""
+        sock = socket.create_connection(self.address, timeout=self.timeout)
+        sock.sendall(json.dumps({"op": "subscribe", "client": self.client_id}).encode('utf-8') + b"\n")
+        sock.settimeout(None)
+        self._subscriber = sock
+        threading.Thread(target=self._receive_pushes, args=(sock,), name="qa_bank_push", daemon=True).start()
+
+    def _receive_pushes(self, sock):
+        try:
+            for line in sock.makefile('rb'):
+                message = json.loads(line)
+                if message.get("event") == "learned" and self.on_learned:
+                    self.on_learned(message["q_text"], message["entry"])
+        except (OSError, ValueError):
+            pass
+
+    def lookup(self, key):
+        """按 make_qa_key 生成的键查找答案文本列表，未找到返回None。"""
+        reply = self.request({"op": "lookup", "q_norm": key[0], "options": sorted(key[1])})
+        return reply["answer"] if reply else None
+
+    def has_question(self, q_norm):
+        reply = self.request({"op": "has_question", "q_norm": q_norm})
+        return bool(reply and reply["exists"])
+
+    def eliminated(self, key):
+        """按 make_qa_key 生成的键查询已排除的错误组合，服务不可用时返回空列表。"""
+        reply = self.request({"op": "eliminated", "q_norm": key[0], "options": sorted(key[1])})
+        return reply["eliminated"] if reply else []
+
+    def learn(self, q_text, entry):
+        """把本地刚解出的答案提交给服务，服务会合并、批量写盘并推送给其他客户端。"""
+        return self.request({"op": "learn", "client": self.client_id, "q_text": q_text, "entry": entry}) is not None
+
+    def answer_prior(self):
+        """返回与 build_answer_prior 结构相同的先验，其中选项文本统计按需向服务查询。"""
+        reply = self.request({"op": "prior"}) or {}
+        return {
+            "size_counts": Counter({int(k): v for k, v in reply.get("size_counts", {}).items()}),
+            "position_counts": Counter(reply.get("position_counts", {})),
+            "position_questions": reply.get("position_questions", 0),
+            "text_answer_counts": _RemoteCounter(self, "text_answer_counts"),
+            "text_option_counts": _RemoteCounter(self, "text_option_counts"),
+        }
+
+    def close(self):
+        for closable in (self._file, self._sock, self._subscriber):
+            try:
+                if closable is not None:
+                    closable.close()
+            except OSError:
+                pass
+
+def connect_qa_bank_server():
+    """
+    连接题库服务并订阅新答案推送。推送来的答案直接加入本地索引。
+
+    Returns:
+        QABankClient or None: 服务不可用时返回None。
+    """
+    try:
+        _bank_fallback_pending.clear()
+        client = QABankClient(QA_BANK_SERVER_ADDRESS, timeout=QA_BANK_SERVER_TIMEOUT,
+                              on_learned=index_variant,
+                              on_disconnect=_bank_fallback_pending.set)
+        client.subscribe()
+        return client
+    except OSError as e:
+        logger.warning(f"⚠️ 无法连接题库服务 {QA_BANK_SERVER_ADDRESS[0]}:{QA_BANK_SERVER_ADDRESS[1]} ({e})，将使用本地题库。")
+        return None
+
+_bank_fallback_pending = threading.Event()  # 题库服务已断开、等待回退到本地题库
+
+def apply_pending_bank_fallback():
+    """
+    题库服务断开后，在两次查询之间回退到本地题库。断开可能发生在任意一次请求中 (包括查询进行到一半时)，
+    因此断开时只做标记，由查询函数在不使用题库的时刻调用本函数完成回退。
+
+    Returns:
+        bool: 本次是否进行了回退。
+    """
+    if not _bank_fallback_pending.is_set():
+        return False
+    _bank_fallback_pending.clear()
+    fall_back_to_local_bank()
+    return True
+
+def fall_back_to_local_bank():
+    """运行中与题库服务断开时，改为加载本地 JSON 题库，并保留已推送和本次学到的答案。"""
+    global qa_bank_store
+    qa_bank_store = None
+    kept = dict(qa_bank_index)
+    kept_eliminated = {key: set(combos) for key, combos in qa_bank_eliminated.items()}
+    logger.warning("⚠️ 题库服务已断开，回退到本地 JSON 题库。")
+    load_qa_bank(backend='JSON')
+    for (q_norm, option_norms), answer in kept.items():
+        qa_bank_index.setdefault((q_norm, option_norms), answer)
+        qa_bank_questions.add(q_norm)
+    for key, combos in kept_eliminated.items():
+        qa_bank_eliminated.setdefault(key, set()).update(combos)
+
+def publish_learned_answer(q_text, entry):
+    """使用题库服务时，把刚解出的答案 (或刚排除的错误组合) 提交给服务，使其他脚本立即可用。"""
+    if isinstance(qa_bank_store, QABankClient):
+        qa_bank_store.learn(q_text, entry)
+
+def lookup_qa_answer(q_text, option_texts):
+    """
+    查找题目答案：先查内存索引 (JSON题库、回放的日志和本次运行学到的答案)，再查 SQLite 题库或题库服务。
+
+    Returns:
+        tuple: (题库键, 答案文本列表或None)
+    """
+    apply_pending_bank_fallback()
+    key = make_qa_key(q_text, option_texts)
+    answer = qa_bank_index.get(key)
+    if answer is None and qa_bank_store is not None:
+        answer = qa_bank_store.lookup(key)
+        if answer is None and apply_pending_bank_fallback():
+            # 查询时题库服务断开，回退到本地题库后再查一次
+            answer = qa_bank_index.get(key)
+    if answer is None and USE_IMAGE_OPTION_PHASH:
+        phash_key = make_qa_key(q_text, option_texts, use_phash=True)
+        if phash_key and phash_key != key:
+            answer = qa_bank_index.get(phash_key)
+    return key, answer
+
+def _rejected_combo_counts(key):
+    """返回当前会话在题目变种 key 上记录的未刷新组合计数。换到另一个变种时清空，只在当前题目内有效。"""
+    rejected = current_session().rejected_combos
+    if rejected["key"] != key:
+        rejected["key"], rejected["counts"] = key, Counter()
+    return rejected["counts"]
+
+def forget_rejected_combo(q_info, letters):
+    """撤销当前题目中一个组合的未刷新计数 (例如后来发现题目只是刷新得慢)。"""
+    counts = _rejected_combo_counts(make_qa_key(q_info['q_text'], q_info['options'].values()))
+    counts.pop(combo_key(q_info['options'][letter] for letter in letters), None)
+
+def lookup_eliminated(q_info):
+    """
+    查找当前 (问题, 选项集) 变种已排除的错误组合：内存索引 (题库、回放的日志和本次运行) 与 SQLite 题库或题库服务中记录的并集，
+    再加上当前题目中提交后未刷新、但还未确认的组合。
+
+    Returns:
+        set: combo_key 的集合。
+    """
+    key = make_qa_key(q_info['q_text'], q_info['options'].values())
+    eliminated = set(qa_bank_eliminated.get(key, ()))
+    if qa_bank_store is not None:
+        eliminated.update(combo_key(combo) for combo in qa_bank_store.eliminated(key))
+    eliminated.update(_rejected_combo_counts(key))
+    return eliminated
+
+def record_eliminated_combo(q_info, letters):
+    """
+    记录一个提交后题目没有刷新 (答案错误) 的选项组合。当前题目的后续尝试会先跳过它，
+    但只有在遍历结束时由 finish_elimination_attempt 确认后才会保存。
+    """
+    counts = _rejected_combo_counts(make_qa_key(q_info['q_text'], q_info['options'].values()))
+    counts[combo_key(q_info['options'][letter] for letter in letters)] += 1
+    current_session().attempt_rejections.append(list(letters))
+    record_stat("eliminated_pending")
+
+def begin_elimination_attempt():
+    """开始一次遍历 (solve_single_choice / solve_multiple_choice)，清空上一次遍历的未刷新记录。"""
+    current_session().attempt_rejections = []
+
+def finish_elimination_attempt(q_info, candidates):
+    """
+    遍历结束仍未解出时调用，决定是否保存本次遍历中提交后未刷新的组合。
+    如果本次尝试的所有候选组合都未刷新，更可能是界面太慢或提交没有生效，而不是所有组合都错了，
+    这些记录只在当前题目中使用，不会保存；否则把它们确认为错误组合：加入内存索引和本次运行的解题记录，
+    写入解题日志，使用题库服务时同时提交给服务，之后其他窗口和以后的运行遍历这个变种时会跳过它们。
+
+    Args:
+        q_info (dict): 当前题目信息。
+        candidates (list): 本次遍历尝试的候选组合 (选项字母列表)。
+
+    Returns:
+        int: 保存的错误组合数。
+    """
+    session = current_session()
+    attempt, session.attempt_rejections = session.attempt_rejections, []
+    q_text = q_info['q_text']
+    counts = _rejected_combo_counts(make_qa_key(q_text, q_info['options'].values()))
+    combos = {}
+    for letters in attempt:
+        ck = combo_key(q_info['options'][letter] for letter in letters)
+        if ck in counts:  # 后来发现只是刷新得慢的组合已被撤销
+            combos[ck] = sorted(q_info['options'][letter] for letter in letters)
+    if not combos:
+        return 0
+    if len(combos) >= len(candidates):
+        logger.warning(f"⚠️ 本次遍历的 {len(candidates)} 个候选组合提交后都未刷新，可能是界面太慢，不保存这些排除记录。")
+        record_stat("eliminated_discarded", len(combos))
+        return 0
+    entry = {"options": sorted(q_info['options'].values()), "answer": [], "eliminated": list(combos.values())}
+    index_variant(q_text, entry)
+    merge_variant_into_bank(solved_questions, q_text, entry)
+    append_solution_journal(q_text, entry)
+    publish_learned_answer(q_text, entry)
+    record_stat("eliminated_recorded", len(combos))
+    logger.info(f"本次遍历中 {len(combos)} 个组合提交后未刷新 (共尝试 {len(candidates)} 个)，确认为错误组合并保存。")
+    return len(combos)
+
+def skip_eliminated_combos(q_info, candidates):
+    """
+    从候选组合 (选项字母列表) 中去掉已记录为错误的组合 (已确认的，以及当前题目中提交后未刷新的)。
+    候选组合全部被排除时，说明某次"提交后题目未刷新"可能是误判 (例如界面响应太慢)，此时忽略排除记录重新遍历。
+
+    Returns:
+        list: 需要尝试的候选组合，保持原来的顺序。
+    """
+    eliminated = lookup_eliminated(q_info)
+    if not eliminated:
+        return candidates
+    remaining = [combo for combo in candidates
+                 if combo_key(q_info['options'][letter] for letter in combo) not in eliminated]
+    if not remaining:
+        logger.warning("⚠️ 所有候选组合都已被记录为错误，排除记录可能有误判，本次忽略排除记录重新遍历。")
+        return candidates
+    skipped = len(candidates) - len(remaining)
+    if skipped:
+        logger.info(f"⏭️ 跳过 {skipped} 个已记录为错误的组合。")
+        record_stat("eliminated_skipped", skipped)
+    return remaining
+
+def qa_bank_has_question(q_norm):
+    """题库中是否存在该规范化问题文本 (不论选项集)。"""
+    return q_norm in qa_bank_questions or (qa_bank_store is not None and qa_bank_store.has_question(q_norm))
+
+def load_qa_bank(backend=None):
+    """
+    在脚本启动时加载题库，回放中断运行的解题日志，并建立规范化索引。
+    JSON 后端把 QA_BANK_FILE 全部读入全局变量 qa_bank；SQLITE 后端只连接数据库，查询时按需读取；
+    SERVER 后端连接题库服务 (由服务端回放日志)，连接失败时按 JSON 后端加载。
+
+    Args:
+        backend (str, optional): 使用的后端，默认为 QA_BANK_BACKEND。
+    """
+    global qa_bank, qa_bank_store
     if not USE_QA_BANK:
         logger.info("配置为不使用题库，跳过加载。")
         return
-    
-    if os.path.exists(QA_BANK_FILE):
+    backend = backend or QA_BANK_BACKEND
+
+    if backend == 'SERVER':
+        qa_bank_store = connect_qa_bank_server()
+        if qa_bank_store is not None:
+            # 题库主体留在服务中，本地索引只保存推送来的和本次运行学到的答案
+            qa_bank = {}
+            build_qa_bank_index()
+            answer_prior.clear()
+            answer_prior.update(qa_bank_store.answer_prior())
+            logger.info(f"✅ 已连接题库服务 {QA_BANK_SERVER_ADDRESS[0]}:{QA_BANK_SERVER_ADDRESS[1]}，共享其题库并接收新答案推送。")
+            return
+
+    if backend == 'SQLITE':
+        # SQLite 模式下 qa_bank 只保存回放的日志等少量内存数据，题库主体留在数据库中
+        qa_bank = {}
+        if os.path.exists(QA_BANK_DB_FILE):
+            qa_bank_store = SQLiteQABank(QA_BANK_DB_FILE)
+            logger.info(f"✅ 已连接SQLite题库 '{QA_BANK_DB_FILE}'，共 {qa_bank_store.count_variants()} 个变种 (按需查询)。")
+        else:
+            logger.warning(f"⚠️ SQLite题库 '{QA_BANK_DB_FILE}' 不存在，将仅使用遍历模式答题。")
+    elif os.path.exists(QA_BANK_FILE):
         try:
             with open(QA_BANK_FILE, 'r', encoding='utf-8') as f:
                 qa_bank = json.load(f)
@@ -613,22 +3003,137 @@ def load_qa_bank():
     else:
         logger.warning(f"⚠️ 题库文件 '{QA_BANK_FILE}' 不存在，将仅使用遍历模式答题。")
         qa_bank = {}
+    if REPLAY_SOLUTION_JOURNALS:
+        replay_solution_journals(QA_BANK_DB_FILE if backend == 'SQLITE' else QA_BANK_FILE)
+    build_qa_bank_index()
+    answer_prior.clear()
+    answer_prior.update(qa_bank_store.answer_prior() if qa_bank_store is not None else build_answer_prior(qa_bank))
+    logger.info(f"题库索引已建立，内存中共 {len(qa_bank_index)} 个 (问题, 选项集) 变种。")
+
+def record_stat(name, value=1):
+    """累加一项性能统计，同时计入当前会话的当前题目和整个运行。"""
+    current_session().question_stats[name] += value
+    run_stats[name] += value
+
+def log_stats(title, stats):
+    """以 key=value 的形式将一组性能统计输出到日志。"""
+    if not stats:
+        return
+    summary = ", ".join(f"{name}={value:.3f}" if isinstance(value, float) and not value.is_integer() else f"{name}={int(value)}"
+                        for name, value in sorted(stats.items()))
+    logger.info(f"📊 {title}: {summary}")
 
-def wait_for_next_question(current_q_text):
+@timed_span("post_submit_wait")
+def wait_for_next_question(current_q_text, letters=None):
     """
     在提交答案后，等待并检查题目是否已经刷新。
+    自适应模式下以指数退避的间隔轮询，检测到新题目立即返回；超过 POST_SUBMIT_SAME_QUESTION_TIMEOUT
+    (至少 FIXED_POST_SUBMIT_DELAY 秒) 仍是同一道题即快速判定为答错，最多等到 POST_SUBMIT_WAIT_DEADLINE。
+    未刷新只是超时，这次提交会被记为未确认，之后由 late_advanced_answer 检查题目是否只是刷新得慢。
 
     Args:
         current_q_text (str): 当前问题的文本，用于对比。
+        letters (list, optional): 这次提交的选项字母，未刷新时记入会话的 unconfirmed_submit。
 
     Returns:
         bool: 如果题目已刷新，返回True；否则返回False。
     """
-    logger.info(f"等待 {FIXED_POST_SUBMIT_DELAY} 秒后检查题目是否刷新...")
-    time.sleep(FIXED_POST_SUBMIT_DELAY)
+    session = current_session()
+    previous, session.unconfirmed_submit = session.unconfirmed_submit, None
+    start_time = time.time()
+    if not ADAPTIVE_POST_SUBMIT_WAIT:
+        logger.info(f"等待 {FIXED_POST_SUBMIT_DELAY} 秒后检查题目是否刷新...")
+        session_wait(FIXED_POST_SUBMIT_DELAY, force_yield=True)
+        new_q_info = get_clipboard_data_robust()
+        # 如果能获取到新题目信息，并且题目文本与之前不同，则认为刷新成功
+        advanced = bool(new_q_info and new_q_info.get('q_text') != current_q_text)
+        polls = 1
+    else:
+        deadline = start_time + POST_SUBMIT_WAIT_DEADLINE
+        fast_fail = (None if POST_SUBMIT_SAME_QUESTION_TIMEOUT is None
+                     else max(POST_SUBMIT_SAME_QUESTION_TIMEOUT, FIXED_POST_SUBMIT_DELAY, session.slow_advance_timeout))
+        interval = POST_SUBMIT_FIRST_POLL_DELAY
+        advanced = False
+        polls = 0
+        while True:
+            session_wait(max(0.0, min(interval, deadline - time.time())), force_yield=True)
+            new_q_info = get_clipboard_data_robust()
+            polls += 1
+            elapsed = time.time() - start_time
+            if new_q_info and new_q_info.get('q_text') != current_q_text:
+                advanced = True
+                break
+            # 页面仍停留在同一道题，开启快速失败且超过快速失败时间即判定答错
+            if new_q_info and fast_fail is not None and elapsed >= fast_fail:
+                break
+            if time.time() >= deadline:
+                break
+            interval = min(interval * POST_SUBMIT_BACKOFF_FACTOR, POST_SUBMIT_MAX_POLL_INTERVAL)
+
+    wait_seconds = time.time() - start_time
+    if not advanced and letters is not None:
+        session.unconfirmed_submit = {"q_text": current_q_text, "letters": list(letters), "time": start_time}
+    elif advanced and previous and previous["q_text"] == current_q_text and previous["letters"] != list(letters or []):
+        # 上一次提交超时后还没确认答错，题目就在这一次提交后刷新了。按本会话观察到的刷新时间，
+        # 上一次提交也可能只是刷新得慢时 (还没有观察到刷新时间时保守地认为可能)，无法确定哪一次答对
+        since_previous = time.time() - previous["time"]
+        if since_previous <= POST_SUBMIT_WAIT_DEADLINE and (
+                not session.advance_latency or since_previous <= session.advance_latency + POST_SUBMIT_MAX_POLL_INTERVAL):
+            session.ambiguous_advance = {"q_text": current_q_text, "letters": [previous["letters"], list(letters or [])]}
+    elif advanced:
+        session.advance_latency = max(session.advance_latency, wait_seconds)
+    record_event("submit_result", advanced=advanced, wait=round(wait_seconds, 4), polls=polls)
+    record_stat("post_submit_waits")
+    record_stat("post_submit_wait_seconds", wait_seconds)
+    record_stat("post_submit_polls", polls)
+    logger.info(f"提交后等待 {wait_seconds:.2f} 秒 (轮询 {polls} 次)，题目{'已刷新' if advanced else '未刷新'}。")
+    return advanced
+
+def note_slow_advance(seconds):
+    """题目在提交 seconds 秒后才刷新 (晚于快速失败时间)：本会话之后的快速失败时间至少等这么久 (不超过 POST_SUBMIT_WAIT_DEADLINE)。"""
+    session = current_session()
+    session.advance_latency = max(session.advance_latency, seconds)
+    timeout = min(POST_SUBMIT_WAIT_DEADLINE, seconds + POST_SUBMIT_FIRST_POLL_DELAY)
+    if timeout > session.slow_advance_timeout:
+        session.slow_advance_timeout = timeout
+        logger.info(f"界面刷新较慢，本会话的快速失败时间调整为 {timeout:.2f} 秒。")
+
+def take_ambiguous_advance(q_info):
+    """
+    返回并清除当前题目的"无法确定哪一次提交答对"记录 (见 wait_for_next_question)。
+
+    Returns:
+        list or None: [上一次提交的字母, 这一次提交的字母]，没有记录时返回None。
+    """
+    session = current_session()
+    ambiguous, session.ambiguous_advance = session.ambiguous_advance, None
+    if ambiguous and ambiguous["q_text"] == q_info['q_text']:
+        return ambiguous["letters"]
+    return None
+
+def late_advanced_answer(q_info):
+    """
+    慢刷新检查：上一次提交因超时被当作答错，但题目之后才刷新 (界面较慢) 时，上一次提交的组合其实是正确答案。
+    在尝试下一个组合前 (以及遍历结束时) 调用，只在有未确认的提交时读取一次剪贴板；
+    读到的选中状态会被记住，接下来点击前不需要再读。
+
+    Returns:
+        list or None: 题目已经刷新时返回上一次提交的选项文本列表，否则返回None。
+    """
+    session = current_session()
+    pending = session.unconfirmed_submit
+    if not pending or pending["q_text"] != q_info['q_text']:
+        return None
     new_q_info = get_clipboard_data_robust()
-    # 如果能获取到新题目信息，并且题目文本与之前不同，则认为刷新成功
-    return new_q_info and new_q_info.get('q_text') != current_q_text
+    if not new_q_info or new_q_info.get('q_text') == q_info['q_text']:
+        return None
+    session.unconfirmed_submit = None
+    letters = pending["letters"]
+    forget_rejected_combo(q_info, letters)
+    note_slow_advance(time.time() - pending["time"])
+    record_stat("late_advances")
+    logger.warning(f"⏱️ 组合 {letters} 提交后题目刷新较慢，超时后才刷新，它是正确答案。")
+    return [q_info['options'][letter] for letter in letters]
 
 def write_solution_map_to_file():
     """在脚本结束时，将本次运行解出的所有题目和答案写入一个JSON文件。"""
@@ -648,7 +3153,8 @@ def write_solution_map_to_file():
 
 # ============================ 【核心升级】带验证的解答函数 ============================
 
-def verify_and_click(options_to_select, options_pos, max_retries=2):
+@timed_span("click")
+def verify_and_click(options_to_select, options_pos, q_text, max_retries=2):
     """
     【高可靠性点击函数】点击指定选项后，通过读取剪贴板HTML来验证是否真的选中成功。
     如果验证失败，会进行重试。这是确保多选题正确选择的关键。
@@ -656,6 +3162,7 @@ def verify_and_click(options_to_select, options_pos, max_retries=2):
     Args:
         options_to_select (list): 期望被选中的选项列表，例如 ['A', 'C']。
         options_pos (dict): 各选项的屏幕坐标字典。
+        q_text (str): 当前题目的问题文本，用于确认已知的选中状态属于这道题。
         max_retries (int, optional): 最大重试次数。 Defaults to 2.
 
     Returns:
@@ -663,9 +3170,10 @@ def verify_and_click(options_to_select, options_pos, max_retries=2):
     """
     # 如果环境不支持HTML验证，则退化为直接点击，并假定成功。
     if not IS_WINDOWS:
+        view = capture_settle_view() if USE_SETTLE_DETECTION else None
         for opt in options_to_select:
             click_at_region_pos(options_pos.get(opt))
-            time.sleep(POST_TOUCH_DELAY)
+            view = wait_until_settled(POST_TOUCH_DELAY, view)
         return True
 
     expected_selection = set(options_to_select)
@@ -673,13 +3181,22 @@ def verify_and_click(options_to_select, options_pos, max_retries=2):
     for attempt in range(max_retries):
         logger.info(f"  -> 第 {attempt+1}/{max_retries} 次尝试点击并验证: {options_to_select}")
         
-        # 1. 先获取当前的选中状态
-        current_data = get_clipboard_data_robust()
-        if not current_data:
-            logger.warning("  -> 点击前无法获取剪贴板数据，将直接执行点击。")
-            current_selection = set()
+        # 1. 先获取当前的选中状态 (上次读取剪贴板后没有点击/滚动过时直接使用已知状态)
+        current_selection = known_selection_state(q_text)
+        if current_selection is not None:
+            record_stat("selection_reads_skipped")
+            logger.info(f"  -> 使用已知的选中状态 {sorted(current_selection) or '无'}，跳过点击前的剪贴板读取。")
         else:
-            current_selection = set(current_data.get('selected_options', []))
+            current_data = get_clipboard_data_robust()
+            if not current_data:
+                logger.warning("  -> 点击前无法获取剪贴板数据，将直接执行点击。")
+                current_selection = set()
+            elif current_data.get('q_text') != q_text:
+                # 题目已经换了 (上一次提交刷新得慢)，不能在新题目上点击
+                logger.warning("  -> 点击前发现题目已经刷新，停止点击。")
+                return False
+            else:
+                current_selection = set(current_data.get('selected_options', []))
         
         # 2. 智能计算需要点击的选项
         #    - to_select: 期望选中但当前未选中的 (需要点击)
@@ -687,14 +3204,18 @@ def verify_and_click(options_to_select, options_pos, max_retries=2):
         to_select = expected_selection - current_selection
         to_deselect = current_selection - expected_selection
         
-        # 先取消多余的，再选中需要的
+        # 先取消多余的，再选中需要的 (每次点击后等待界面稳定，最多 POST_TOUCH_DELAY 秒)
+        view = before_clicks = capture_settle_view() if USE_SETTLE_DETECTION else None
         for opt in (list(to_deselect) + list(to_select)):
             click_at_region_pos(options_pos.get(opt))
-            time.sleep(POST_TOUCH_DELAY)
+            view = wait_until_settled(POST_TOUCH_DELAY, view)
         
         # 3. 验证结果
-        time.sleep(DELAY_BEFORE_VERIFY_CLICK) # 等待UI反应
+        wait_until_settled(DELAY_BEFORE_VERIFY_CLICK, before_clicks) # 等待UI反应
         verified_data = get_clipboard_data_robust()
+        if verified_data and verified_data.get('q_text') != q_text:
+            logger.warning("  -> 验证时发现题目已经刷新，停止点击。")
+            return False
         actual_selection = set(verified_data.get('selected_options', [])) if verified_data else set()
 
         if actual_selection == expected_selection:
@@ -702,6 +3223,8 @@ def verify_and_click(options_to_select, options_pos, max_retries=2):
             return True
         else:
             logger.warning(f"  -> ❌ 验证失败。期望选中: {sorted(list(expected_selection))}, 实际选中: {sorted(list(actual_selection))}")
+            # 验证失败可能是界面响应慢，读到的状态不一定可靠，下次尝试前重新读取
+            invalidate_selection_state()
     
     logger.error(f"  -> ❌ 经过 {max_retries} 次尝试后，仍无法正确选中选项 {options_to_select}。")
     return False
@@ -709,8 +3232,8 @@ def verify_and_click(options_to_select, options_pos, max_retries=2):
 def solve_with_qa_bank(q_info, options_pos, submit_pos):
     """
     使用已加载的题库尝试解答问题。
-    它会先匹配问题文本，如果匹配成功，再匹配当前屏幕上的选项集合是否与题库中记录的一致。
-    这种方式可以处理同一问题有不同选项顺序或内容变体的情况。
+    以 (规范化问题文本, 规范化选项集合) 为键在题库索引中直接查找答案，
+    可以处理同一问题有不同选项顺序、内容变体，以及标点/空白差异的情况。
 
     Args:
         q_info (dict): 当前题目的信息。
@@ -722,52 +3245,46 @@ def solve_with_qa_bank(q_info, options_pos, submit_pos):
     """
     q_text = q_info['q_text']
     
-    # 1. 检查题库中是否存在该问题文本
-    if q_text not in qa_bank:
-        logger.info(f"题库中未找到题目: '{q_text[:30]}...'")
+    # 1. 用规范化的 (问题, 选项集) 直接查找索引
+    key, known_answer_texts = lookup_qa_answer(q_text, q_info['options'].values())
+    if known_answer_texts is None and USE_IMAGE_OPTION_PHASH and hash_image_options(q_info, options_pos):
+        # 图片选项的文件名没有命中，用刚计算的感知哈希再查一次
+        key, known_answer_texts = lookup_qa_answer(q_text, q_info['options'].values())
+    if known_answer_texts is None:
+        if qa_bank_has_question(key[0]):
+            logger.info(f"题库中虽有同名问题，但选项集不匹配。这是一个新变种，将使用遍历模式解答。")
+        else:
+            logger.info(f"题库中未找到题目: '{q_text[:30]}...'")
         return 'FALLBACK'
 
-    # 2. 获取当前屏幕上的选项内容集合，用于匹配
-    current_options_set = set(q_info['options'].values())
+    logger.info(f"✅ 在题库中找到题目和完全匹配的选项集，预设答案: {known_answer_texts}")
+
+    # 2. 将答案文本反向映射回选项字母 (A, B, C, D)，同样按规范化的选项键匹配
+    letters_to_click = map_answers_to_letters(q_info, known_answer_texts)
     
-    # 3. 遍历该问题的所有已知答案变种 (variants)
-    for variant in qa_bank[q_text]:
-        known_options_set = set(variant['options'])
-        
-        # 4. 如果当前选项集合与题库中某个变种的选项集合完全匹配
-        if current_options_set == known_options_set:
-            correct_answer_texts = variant['answer']
-            logger.info(f"✅ 在题库中找到题目和完全匹配的选项集，预设答案: {correct_answer_texts}")
-
-            # 将答案文本反向映射回选项字母 (A, B, C, D)
-            options_text_to_letter = {v: k for k, v in q_info['options'].items()}
-            letters_to_click = [options_text_to_letter[ans] for ans in correct_answer_texts if ans in options_text_to_letter]
-            
-            if not letters_to_click or len(letters_to_click) != len(correct_answer_texts):
-                logger.error("严重错误：题库答案与当前选项无法完全对应，这不应该发生。")
-                return 'FALLBACK'
-
-            logger.info(f"--- [题库模式] 尝试解答，点击选项: {letters_to_click} ---")
-            # 使用带验证的点击函数
-            if verify_and_click(letters_to_click, options_pos):
-                click_at_region_pos(submit_pos)
-                if wait_for_next_question(q_text):
-                    logger.info(f"🎉 [题库模式] 解答成功！")
-                    return correct_answer_texts # 返回正确答案
-                else:
-                    logger.warning(f"[题库模式] 提交后题目未刷新，题库答案可能已失效或错误。")
-            
-            # 如果题库答案错误，则回退到遍历模式
-            logger.error(f"[题库模式] 解答失败。将回退到遍历模式。")
-            return 'FALLBACK'
+    if not letters_to_click or len(letters_to_click) != len(known_answer_texts):
+        logger.error("严重错误：题库答案与当前选项无法完全对应，这不应该发生。")
+        return 'FALLBACK'
+    # 返回当前屏幕上的选项文本，保证写入 solution_map 的答案与选项一致
+    correct_answer_texts = [q_info['options'][letter] for letter in letters_to_click]
+
+    logger.info(f"--- [题库模式] 尝试解答，点击选项: {letters_to_click} ---")
+    # 使用带验证的点击函数
+    if verify_and_click(letters_to_click, options_pos, q_text):
+        click_at_region_pos(submit_pos)
+        if wait_for_next_question(q_text, letters_to_click):
+            logger.info(f"🎉 [题库模式] 解答成功！")
+            return correct_answer_texts # 返回正确答案
+        else:
+            logger.warning(f"[题库模式] 提交后题目未刷新，题库答案可能已失效或错误。")
     
-    # 遍历完所有变种，没有找到匹配的选项集
-    logger.info(f"题库中虽有同名问题，但选项集不匹配。这是一个新变种，将使用遍历模式解答。")
+    # 如果题库答案错误，则回退到遍历模式
+    logger.error(f"[题库模式] 解答失败。将回退到遍历模式。")
     return 'FALLBACK'
 
 def solve_single_choice(q_info, options_pos, submit_pos):
     """
-    【遍历模式】解答单选题。依次尝试每个选项，直到成功。
+    【遍历模式】解答单选题。依次尝试每个选项，直到成功。以前 (本次运行的其他尝试或以往运行) 已确认错误的选项会被跳过。
 
     Args:
         q_info (dict): 当前题目信息。
@@ -778,24 +3295,59 @@ def solve_single_choice(q_info, options_pos, submit_pos):
         list or None: 成功则返回包含正确答案文本的列表，失败则返回None。
     """
     logger.info(f"--- [遍历模式] 开始解答单选题: {q_info['q_num']} ---")
-    # 按字母顺序尝试
-    for option_name in sorted(options_pos.keys()):
+    # 按字母顺序尝试，跳过以前已确认错误的选项
+    candidates = skip_eliminated_combos(q_info, [[letter] for letter in sorted(options_pos.keys())])
+    begin_elimination_attempt()
+    for option_name, in candidates:
+        late_answer = late_advanced_answer(q_info)
+        if late_answer:
+            return late_answer
         logger.info(f"尝试单选项 [{option_name}]...")
         # 使用带验证的点击
-        if verify_and_click([option_name], options_pos):
+        if verify_and_click([option_name], options_pos, q_info['q_text']):
             click_at_region_pos(submit_pos)
-            if wait_for_next_question(q_info['q_text']):
+            if wait_for_next_question(q_info['q_text'], [option_name]):
                 correct_answer_text = q_info['options'][option_name]
                 logger.info(f"🎉 [遍历模式] 单选题 [{q_info['q_num']}] 的正确答案是: [{correct_answer_text}]")
                 return [correct_answer_text] # 以列表形式返回
             else:
                 logger.info(f"选项 [{option_name}] 错误，继续...")
+                record_eliminated_combo(q_info, [option_name])
+    late_answer = late_advanced_answer(q_info)
+    if late_answer:
+        return late_answer
+    finish_elimination_attempt(q_info, candidates)
     logger.error(f"单选题 {q_info['q_text']} 在所有尝试后仍未解决。")
     return None
 
+def multi_choice_candidates(q_info, option_letters):
+    """
+    多选题遍历时依次尝试的组合 (至少2个选项)：按 MULTI_CHOICE_SEARCH_ORDER 排序，并去掉以前已确认错误的组合。
+    tools/replay_run.py 回放录制的运行时也用它评估遍历顺序。
+
+    Args:
+        q_info (dict): 当前题目信息。
+        option_letters (list): 可见选项字母 (已排序)。
+
+    Returns:
+        list: 选项字母列表的列表，按尝试顺序排列。
+    """
+    # ranked 中保存了每个组合的先验概率
+    ranked = rank_multi_choice_combinations(q_info, option_letters, answer_prior)
+    if MULTI_CHOICE_SEARCH_ORDER == 'PRIOR':
+        lexicographic_probs = [p for _, p in sorted(ranked, key=lambda item: (len(item[0]), item[0]))]
+        logger.info(f"按先验排序尝试组合，预计提交次数: {expected_submits([p for _, p in ranked]):.2f} "
+                    f"(字典序为 {expected_submits(lexicographic_probs):.2f})")
+        candidates = [combo for combo, _ in ranked]
+    else:
+        candidates = [combo for combo, _ in sorted(ranked, key=lambda item: (len(item[0]), item[0]))]
+    return skip_eliminated_combos(q_info, candidates)
+
 def solve_multiple_choice(q_info, options_pos, submit_pos):
     """
-    【遍历模式】解答多选题。从2个选项的组合开始，依次尝试所有可能的组合。
+    【遍历模式】解答多选题。依次尝试所有至少包含2个选项的组合。
+    MULTI_CHOICE_SEARCH_ORDER = 'PRIOR' 时按题库先验从最可能到最不可能的顺序尝试，否则按字典序。
+    以前已确认错误的组合会被跳过，每个错误的组合都会被记录下来 (见 finish_elimination_attempt)。
 
     Args:
         q_info (dict): 当前题目信息。
@@ -806,40 +3358,49 @@ def solve_multiple_choice(q_info, options_pos, submit_pos):
         list or None: 成功则返回包含所有正确答案文本的列表，失败则返回None。
     """
     logger.info(f"--- [遍历模式] 开始解答多选题: {q_info['q_num']} ---")
-    option_letters = sorted(options_pos.keys())
-    # 多选题至少选2个，最多全选
-    start_size = 2 if len(option_letters) > 1 else 1
+    candidates = multi_choice_candidates(q_info, sorted(options_pos.keys()))
+    begin_elimination_attempt()
     
-    for i in range(start_size, len(option_letters) + 1):
-        # 生成所有长度为 i 的组合
-        for combo in combinations(option_letters, i):
-            current_combo = list(combo)
-            logger.info(f"尝试多选组合: {current_combo}")
-            
-            if verify_and_click(current_combo, options_pos):
-                click_at_region_pos(submit_pos)
-                if wait_for_next_question(q_info['q_text']):
-                    correct_answer_texts = [q_info['options'][letter] for letter in current_combo]
-                    logger.info(f"🎉 [遍历模式] 多选题 [{q_info['q_num']}] 的正确答案是: {correct_answer_texts}")
-                    return correct_answer_texts
-                else:
-                    logger.info(f"组合 {current_combo} 错误，继续...")
+    for current_combo in candidates:
+        late_answer = late_advanced_answer(q_info)
+        if late_answer:
+            return late_answer
+        logger.info(f"尝试多选组合: {current_combo}")
+        
+        if verify_and_click(current_combo, options_pos, q_info['q_text']):
+            click_at_region_pos(submit_pos)
+            if wait_for_next_question(q_info['q_text'], current_combo):
+                correct_answer_texts = [q_info['options'][letter] for letter in current_combo]
+                logger.info(f"🎉 [遍历模式] 多选题 [{q_info['q_num']}] 的正确答案是: {correct_answer_texts}")
+                return correct_answer_texts
+            else:
+                logger.info(f"组合 {current_combo} 错误，继续...")
+                record_eliminated_combo(q_info, current_combo)
     
+    late_answer = late_advanced_answer(q_info)
+    if late_answer:
+        return late_answer
+    finish_elimination_attempt(q_info, candidates)
     logger.error(f"多选题 {q_info['q_text']} 在所有组合尝试后仍未解决。")
     return None
 
 # ============================ 主循环 (已集成重试机制) ============================
 def main_loop():
-    """脚本的主执行循环，集成了题目解答的重试机制。"""
+    """脚本的主执行循环，集成了题目解答的重试机制。多窗口运行时每个会话线程各自运行一个主循环。"""
     last_question_text = "初始化占位符"
+    session = current_session()
     
     while True:
         logger.info("\n" + "="*20 + " 新一轮检测循环 " + "="*20)
+        # 流水线模式：后台线程匹配截图的同时，主线程读取剪贴板
+        prefetch = start_target_prefetch() if PIPELINE_CAPTURE_WITH_CLIPBOARD else None
+        clipboard_start = time.perf_counter()
         q_info = get_clipboard_data_robust()
+        prefetched = join_target_prefetch(prefetch, time.perf_counter() - clipboard_start) if prefetch else None
         
         if not q_info or not q_info.get('q_text'):
             logger.error(f"无法获取或解析当前题目信息，脚本可能卡住或已结束。等待{RETRY_DELAY_ON_ERROR}秒后重试..."); 
-            time.sleep(RETRY_DELAY_ON_ERROR)
+            session_wait(RETRY_DELAY_ON_ERROR)
             continue
         
         current_q_text = q_info['q_text']
@@ -847,30 +3408,55 @@ def main_loop():
         # 只有当题目文本发生变化时，才开始新一轮的解答
         if current_q_text != last_question_text:
             logger.info(f"检测到新题目: {q_info['q_num']} - {current_q_text}")
+            session.question_stats.clear()
+            set_span_question(q_info['q_num'])
+            if prefetched:
+                record_stat("pipeline_saved_seconds", prefetched["saved_seconds"])
+                record_stat("pipeline_wait_seconds", prefetched["wait_seconds"])
             
             # 检查是否到达预设的停止题号
             if STOP_AT_QUESTION_NUM and q_info.get('q_num') == STOP_AT_QUESTION_NUM:
                 logger.info(f"已到达预设的停止题号: {STOP_AT_QUESTION_NUM}。脚本将正常停止。")
-                capture_region(filename=os.path.join(SCREENSHOT_RUN_DIR, f"{q_info['q_num']}_stop_screenshot.png"))
+                capture_region(filename=os.path.join(session.screenshot_dir, f"{q_info['q_num']}_stop_screenshot.png"), important=True)
                 break
 
             correct_answer = None
             # ======================= 新增：重试循环 =======================
             for attempt in range(MAX_SOLVE_ATTEMPTS):
+                # 上一次尝试的最后一次提交可能只是刷新得慢
+                correct_answer = late_advanced_answer(q_info)
+                if correct_answer:
+                    break
                 logger.info(f"--- 开始第 {attempt + 1}/{MAX_SOLVE_ATTEMPTS} 次尝试解答 [{q_info['q_num']}] ---")
 
-                # 寻找提交按钮和可用选项
-                submit_pos, _ = find_submit_button_with_scroll(q_info['q_num'], SCREENSHOT_RUN_DIR)
+                submit_pos = options_pos = None
+                # 第一次尝试优先使用流水线预取的匹配结果
+                if attempt == 0 and prefetched and prefetched["submit_pos"] and prefetched["options_pos"]:
+                    submit_pos, options_pos = prefetched["submit_pos"], prefetched["options_pos"]
+                    if len(options_pos) != len(q_info['options']):
+                        # 预取时按上一道题的选项数量推算，数量不符时在同一帧上按这道题的数量重新查找
+                        options_pos = find_available_options(prefetched["frame"], len(q_info['options']))
+                        if not options_pos:
+                            submit_pos = None  # 按原流程重新截图查找
+                    save_screenshot(prefetched["frame"],
+                                    os.path.join(session.screenshot_dir, f"{_safe_q_num(q_info['q_num'])}_1_find_submit.png"))
+                    record_stat("pipeline_hits")
+
                 if not submit_pos:
-                    logger.error(f"在题目 {q_info['q_num']} 找不到[提交按钮]，此次尝试失败。");
-                    time.sleep(RETRY_DELAY_BETWEEN_ATTEMPTS)
-                    continue # 继续下一次重试
-                
-                options_pos = find_available_options()
-                if not options_pos:
-                    logger.error(f"在题目 {q_info['q_num']} 找不到任何选项，此次尝试失败。");
-                    time.sleep(RETRY_DELAY_BETWEEN_ATTEMPTS)
-                    continue # 继续下一次重试
+                    # 寻找提交按钮和可用选项
+                    submit_pos, _ = find_submit_button_with_scroll(q_info['q_num'], session.screenshot_dir)
+                    if not submit_pos:
+                        logger.error(f"在题目 {q_info['q_num']} 找不到[提交按钮]，此次尝试失败。");
+                        session_wait(RETRY_DELAY_BETWEEN_ATTEMPTS)
+                        continue # 继续下一次重试
+
+                    options_pos = find_available_options(option_count=len(q_info['options']))
+                    if not options_pos:
+                        logger.error(f"在题目 {q_info['q_num']} 找不到任何选项，此次尝试失败。");
+                        capture_region(filename=os.path.join(session.screenshot_dir, f"{_safe_q_num(q_info['q_num'])}_no_options.png"),
+                                       important=True)
+                        session_wait(RETRY_DELAY_BETWEEN_ATTEMPTS)
+                        continue # 继续下一次重试
                 
                 # 开始解题
                 use_fallback = False
@@ -895,50 +3481,128 @@ def main_loop():
                     break
                 else:
                     logger.warning(f"第 {attempt + 1} 次尝试解答失败。将在 {RETRY_DELAY_BETWEEN_ATTEMPTS} 秒后重试...")
-                    time.sleep(RETRY_DELAY_BETWEEN_ATTEMPTS)
+                    session_wait(RETRY_DELAY_BETWEEN_ATTEMPTS)
             # ======================= 重试循环结束 =======================
 
             # 在所有重试结束后，检查最终是否成功
-            if correct_answer:
+            ambiguous_letters = take_ambiguous_advance(q_info) if correct_answer else None
+            if ambiguous_letters:
+                # 题目已经刷新，但可能是上一次提交刷新得慢，答案无法确定，不写入题库
+                logger.warning(f"⚠️ 题目在提交 {ambiguous_letters[1]} 后刷新，但上一次提交的 {ambiguous_letters[0]} 还未确认答错，"
+                               f"无法确定正确答案，本题答案不保存。")
+                record_stat("ambiguous_advances")
+                log_stats(f"[{q_info['q_num']}] 本题统计", session.question_stats)
+                last_question_text = current_q_text
+            elif correct_answer:
                 # ------ 【核心记录逻辑】 ------
                 q_text = q_info['q_text']
                 current_options_sorted = sorted(list(q_info['options'].values()))
-                new_entry = {"options": current_options_sorted, "answer": correct_answer}
-                if q_text not in solved_questions:
-                    solved_questions[q_text] = []
+                # 同时记录答案所在的选项字母，供多选题先验统计各位置的正确率
+                answer_letters = sorted(letter for letter, text in q_info['options'].items() if text in correct_answer)
+                new_entry = {"options": current_options_sorted, "answer": correct_answer, "answer_letters": answer_letters}
+                # 遍历中记录过排除组合、但还没有答案的变种也需要写入答案
                 is_existing_variant = any(
-                    entry["options"] == current_options_sorted for entry in solved_questions[q_text]
+                    entry["options"] == current_options_sorted and entry["answer"] for entry in solved_questions.get(q_text, [])
                 )
                 if not is_existing_variant:
-                    solved_questions[q_text].append(new_entry)
+                    merge_variant_into_bank(solved_questions, q_text, new_entry)
+                    # 立即写入解题日志，防止脚本被强制结束时丢失答案
+                    append_solution_journal(q_text, new_entry)
+                    # 使用题库服务时同时提交给服务，其他脚本立即可用
+                    publish_learned_answer(q_text, new_entry)
+                # 同步更新题库索引，本次运行中再次遇到同一变种时可直接命中
+                add_to_qa_bank_index(q_text, current_options_sorted, correct_answer)
+                record_event("solved", q_info={k: q_info[k] for k in ("q_num", "q_type", "q_text", "options")},
+                             answer=correct_answer, answer_letters=answer_letters)
                 # ------ 【记录逻辑结束】 ------
 
+                log_stats(f"[{q_info['q_num']}] 本题统计", session.question_stats)
                 # 更新上一题文本，防止重复解答
                 last_question_text = current_q_text
             else:
                 # 如果所有重试都失败了，才终止脚本
                 logger.critical(f"题目 {q_info['q_num']} 在 {MAX_SOLVE_ATTEMPTS} 次尝试后仍未能成功解答，脚本终止！")
+                capture_region(filename=os.path.join(session.screenshot_dir, f"{_safe_q_num(q_info['q_num'])}_unsolved.png"),
+                               important=True)
                 break
         else:
             logger.info(f"题目未变({q_info.get('q_num', '未知')})，等待{POLLING_INTERVAL_NO_CHANGE}秒..."); 
-            time.sleep(POLLING_INTERVAL_NO_CHANGE)
+            session_wait(POLLING_INTERVAL_NO_CHANGE)
+
+# ============================ 多窗口运行 ============================
+def _run_session(session):
+    """会话线程：拿到控制权后激活窗口、校验选项，然后运行主循环。"""
+    use_session(session)
+    os.makedirs(session.screenshot_dir, exist_ok=True)
+    try:
+        _scheduler.acquire(session)
+        if initialize_and_activate() and validate_all_options_visible():
+            main_loop()
+    except SessionAborted:
+        logger.warning(f"会话 {session.name} 已随调度器中止。")
+    except pyautogui.FailSafeException:
+        logger.critical(f"Fail-Safe触发！会话 {session.name} 中鼠标移动到了屏幕左上角，所有会话将停止。")
+        _scheduler.abort()
+    except Exception:
+        logger.exception(f"会话 {session.name} 运行过程中发生未处理的异常，该会话已停止。")
+    finally:
+        _scheduler.leave(session)
+        logger.info(f"会话 {session.name} 已结束。")
+
+def run_sessions(regions):
+    """
+    多窗口运行：为每个区域创建一个会话线程，由 InputScheduler 轮流分配鼠标和键盘的控制权，直到所有会话结束。
+    各会话的截图保存在 SCREENSHOT_RUN_DIR 下以会话名命名的子目录中，解题日志和答案映射文件仍由所有会话共用。
+
+    Args:
+        regions (list): 各窗口的投屏区域。
+
+    Returns:
+        list: 运行结束的 SolverSession 列表。
+    """
+    global _scheduler
+    sessions = [SolverSession(f"S{i + 1}", tuple(region), os.path.join(SCREENSHOT_RUN_DIR, f"S{i + 1}"))
+                for i, region in enumerate(regions)]
+    # 多个会话的日志交替出现，在每行日志中加上线程名 (session-S1 等) 以便区分
+    set_log_text_format('%(asctime)s - %(levelname)s - [%(threadName)s] %(message)s')
+    logger.info(f"多窗口运行: {len(sessions)} 个会话 " + ", ".join(f"{s.name}={s.region}" for s in sessions))
+
+    _scheduler = InputScheduler()
+    threads = [threading.Thread(target=_run_session, args=(session,), name=f"session-{session.name}")
+               for session in sessions]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        _scheduler = None
+    return sessions
 
 # ============================ 程序入口 ============================
 if __name__ == "__main__":
+    # 0. 配置日志、创建运行目录并加载模板
+    if not setup_runtime():
+        exit()
+
     try:
         # 1. 加载题库（如果启用）
         load_qa_bank()
 
-        # 2. 初始化并激活窗口
-        if not initialize_and_activate():
-            exit()
+        if SESSION_REGIONS:
+            # 多窗口：每个窗口各自激活、预检并运行主循环
+            run_sessions(SESSION_REGIONS)
+        else:
+            # 2. 初始化并激活窗口
+            if not initialize_and_activate():
+                exit()
 
-        # 3. 运行环境预检
-        if not validate_all_options_visible():
-            exit()
-        
-        # 4. 进入主循环
-        main_loop()
+            # 3. 运行环境预检
+            if not validate_all_options_visible():
+                exit()
+
+            # 4. 进入主循环
+            main_loop()
 
     except pyautogui.FailSafeException:
         # pyautogui的紧急停止机制：将鼠标快速移动到屏幕左上角
@@ -949,4 +3613,9 @@ if __name__ == "__main__":
     finally:
         # 无论脚本是正常结束还是异常中断，都尝试保存已解出的答案
         write_solution_map_to_file()
-        logger.info("脚本执行结束。")
\ No newline at end of file
+        log_stats("本次运行统计", run_stats)
+        close_span_log()
+        stop_run_recording()
+        close_screenshot_writer()
+        logger.info("脚本执行结束。")
+        close_logging()
\ No newline at end of file
@@ -0,0 +1,109 @@
+# tests/conftest.py
+"""
+测试公共夹具。所有测试都在 Linux 上运行：桌面操作由 tools/sim_quiz_backend.py 的模拟答题后端代替。
+
+- solver:     主脚本模块，题库索引、运行目录和会话状态都替换为本测试独有的，测试结束后恢复。
+- sim_solver: 在 solver 的基础上接入模拟答题后端，可以直接驱动 main_loop。
+- run_main_loop: 用题库生成合成题目，在模拟答题后端上完整运行一次 main_loop。
+"""
+import os
+import sys
+import json
+import logging
+from collections import defaultdict
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOLS_DIR = os.path.join(REPO_ROOT, "tools")
+for path in (REPO_ROOT, TOOLS_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import auto_solver_refactored as _solver
+
+
+@pytest.fixture
+def solver(monkeypatch, tmp_path):
+    """返回主脚本模块，全局题库状态为空，运行目录/日志目录/缓存目录都在临时目录中。"""
+    monkeypatch.setattr(_solver, "qa_bank", {})
+    monkeypatch.setattr(_solver, "qa_bank_index", {})
+    monkeypatch.setattr(_solver, "qa_bank_questions", set())
+    monkeypatch.setattr(_solver, "qa_bank_eliminated", {})
+    monkeypatch.setattr(_solver, "qa_bank_store", None)
+    monkeypatch.setattr(_solver, "answer_prior", {})
+    monkeypatch.setattr(_solver, "solved_questions", {})
+    monkeypatch.setattr(_solver, "run_stats", defaultdict(float))
+    run_dir = tmp_path / "screenshots" / "run"
+    run_dir.mkdir(parents=True)
+    monkeypatch.setattr(_solver, "SCREENSHOT_BASE_DIR", str(tmp_path / "screenshots"))
+    monkeypatch.setattr(_solver, "SCREENSHOT_RUN_DIR", str(run_dir))
+    monkeypatch.setattr(_solver, "LOG_DIR", str(tmp_path / "logs"))
+    monkeypatch.setattr(_solver, "template_match_scale", None)
+    monkeypatch.setattr(_solver._session_local, "session", _solver.SolverSession("test"), raising=False)
+    return _solver
+
+
+@pytest.fixture
+def sim_solver(solver, monkeypatch):
+    """
+    接入模拟答题后端的主脚本模块。调用返回的函数并传入 SimQuizServer，即完成 setup_runtime 和题库加载。
+    load_solver_with_fake_desktop 修改的模块属性和假模块都会在测试结束后恢复。
+    """
+    from sim_quiz_backend import load_solver_with_fake_desktop
+
+    # 先以当前值登记一遍，测试结束时 monkeypatch 会把它们恢复为这些值
+    for name in ("IS_WINDOWS", "time", "SCREEN_REGION", "STOP_AT_QUESTION_NUM", "SPANS_FILE_PATH"):
+        monkeypatch.setattr(solver, name, getattr(solver, name))
+    for module in ("pyautogui", "win32clipboard"):
+        monkeypatch.setitem(sys.modules, module, sys.modules.get(module))
+        # 主脚本的延迟导入代理在第一次使用后会缓存模块，换成新的代理才会用上本测试的假模块
+        monkeypatch.setattr(solver, module, solver._LazyModule(module))
+    log_level = solver.logger.level
+    monkeypatch.chdir(REPO_ROOT)  # 模板目录和题库文件都是相对项目根目录的路径
+
+    def start(server):
+        load_solver_with_fake_desktop(server)
+        solver.SPANS_FILE_PATH = os.path.join(solver.LOG_DIR, "spans.jsonl")
+        if not solver.setup_runtime():
+            pytest.fail("选项模板加载失败")
+        solver.logger.setLevel(logging.WARNING)
+        solver.load_qa_bank()
+        return solver
+
+    yield start
+    solver.logger.setLevel(log_level)
+    solver.close_span_log()
+    solver.close_screenshot_writer()
+    solver.close_logging()
+    for handler in solver.logger.handlers[:]:
+        solver.logger.removeHandler(handler)
+        handler.close()
+    for handler in solver._log_handlers:
+        handler.close()
+
+
+@pytest.fixture
+def run_main_loop(sim_solver):
+    """
+    返回 run(num_questions, unknown_ratio, seed, long_page_ratio, **server_kwargs)：
+    生成题目 (末尾加终止哨兵)，运行 main_loop，返回 (solver, server, 题目列表(不含哨兵), 解题日志记录)。
+    需要修改的配置请在调用前用 monkeypatch 设置。
+    """
+    from sim_quiz_backend import SimClock, SimQuizServer, build_questions_from_bank, make_stop_question
+
+    with open(os.path.join(REPO_ROOT, "master_qa_bank.json"), 'r', encoding='utf-8') as f:
+        bank = json.load(f)
+
+    def run(num_questions, unknown_ratio=0.5, seed=1, long_page_ratio=0.2, **server_kwargs):
+        questions = build_questions_from_bank(bank, num_questions, unknown_ratio, long_page_ratio, seed)
+        questions.append(make_stop_question(num_questions + 1))
+        server = SimQuizServer(questions, SimClock(), **server_kwargs)
+        solver = sim_solver(server)
+        solver.STOP_AT_QUESTION_NUM = questions[-1]['q_num']
+        solver.main_loop()
+        journal_path = os.path.join(solver.SCREENSHOT_RUN_DIR, solver.SOLUTION_JOURNAL_FILENAME)
+        journal = solver.read_solution_journal(journal_path) if os.path.exists(journal_path) else []
+        return solver, server, questions[:-1], journal
+
+    return run
@@ -0,0 +1,138 @@
+# tests/test_elimination.py
+"""提交后题目未刷新的组合：当前题目内先跳过；遍历结束仍未解出时才保存，所有候选组合都未刷新的那次遍历不保存。"""
+import os
+
+from sim_quiz_backend import SimClock, SimQuizServer
+
+QUESTION = {
+    "q_num": "第1题", "q_type": "单选", "q_text": "第一题", "options": {"A": "甲", "B": "乙", "C": "丙"},
+    "answer": {"C"}, "long_page": False,
+}
+
+
+def make_q_info(q_text="下列哪些做法正确？", options=None):
+    return {"q_text": q_text, "options": options or {"A": "甲", "B": "乙", "C": "丙", "D": "丁"}}
+
+
+def journal_records(solver):
+    path = os.path.join(solver.SCREENSHOT_RUN_DIR, solver.SOLUTION_JOURNAL_FILENAME)
+    return solver.read_solution_journal(path) if os.path.exists(path) else []
+
+
+def reject(solver, q_info, candidates, rejected):
+    solver.begin_elimination_attempt()
+    for letters in rejected:
+        solver.record_eliminated_combo(q_info, letters)
+    return solver.finish_elimination_attempt(q_info, candidates)
+
+
+def test_rejection_is_only_used_for_current_question_until_attempt_ends(solver):
+    q_info = make_q_info()
+    solver.begin_elimination_attempt()
+    solver.record_eliminated_combo(q_info, ["A", "B"])
+
+    assert solver.skip_eliminated_combos(q_info, [["A", "B"], ["A", "C"]]) == [["A", "C"]]
+    assert journal_records(solver) == []
+    assert solver.qa_bank_eliminated == {}
+    assert solver.solved_questions == {}
+
+
+def test_attempt_with_untried_candidates_is_persisted_once(solver):
+    q_info = make_q_info()
+    assert reject(solver, q_info, [["A", "B"], ["A", "C"], ["C", "D"]], [["A", "B"], ["B", "A"]]) == 1
+
+    assert journal_records(solver) == [
+        (q_info['q_text'], {"options": ["丁", "丙", "乙", "甲"], "answer": [], "eliminated": [["乙", "甲"]]}),
+    ]
+    key = solver.make_qa_key(q_info['q_text'], q_info['options'].values())
+    assert solver.qa_bank_eliminated[key] == {solver.combo_key(["甲", "乙"])}
+    assert solver.solved_questions[q_info['q_text']][0]["eliminated"] == [["乙", "甲"]]
+
+
+def test_attempt_where_every_candidate_was_rejected_is_not_persisted(solver):
+    q_info = make_q_info()
+    candidates = [["A"], ["B"]]
+    assert reject(solver, q_info, candidates, candidates) == 0
+
+    assert journal_records(solver) == []
+    assert solver.qa_bank_eliminated == {}
+    # 重试时也不会因为这些记录跳过任何组合
+    assert solver.skip_eliminated_combos(q_info, candidates) == candidates
+    # 重试时又全部未刷新，同样不保存
+    assert reject(solver, q_info, candidates, candidates) == 0
+    assert journal_records(solver) == []
+
+
+def test_late_advanced_combo_is_not_persisted(solver):
+    q_info = make_q_info()
+    solver.begin_elimination_attempt()
+    solver.record_eliminated_combo(q_info, ["A"])
+    solver.record_eliminated_combo(q_info, ["B"])
+    solver.forget_rejected_combo(q_info, ["B"])
+
+    assert solver.finish_elimination_attempt(q_info, [["A"], ["B"], ["C"]]) == 1
+    assert journal_records(solver)[0][1]["eliminated"] == [["甲"]]
+
+
+def test_rejections_match_by_option_text_not_letter(solver):
+    q_info = make_q_info()
+    shuffled = make_q_info(options={"A": "丙", "B": "甲", "C": "丁", "D": "乙"})
+    solver.begin_elimination_attempt()
+    solver.record_eliminated_combo(q_info, ["A", "B"])  # 甲 + 乙
+    assert solver.skip_eliminated_combos(shuffled, [["B", "D"], ["A", "C"]]) == [["A", "C"]]  # 同样是 甲 + 乙
+
+
+def test_pending_rejections_reset_on_next_question(solver):
+    q_info = make_q_info()
+    solver.record_eliminated_combo(q_info, ["A", "B"])
+    assert solver.skip_eliminated_combos(make_q_info("另一道题"), [["A", "B"]]) == [["A", "B"]]
+    assert solver.skip_eliminated_combos(q_info, [["A", "B"], ["C"]]) == [["A", "B"], ["C"]]
+
+
+def test_pending_rejections_are_per_session(solver):
+    q_info = make_q_info()
+    solver.record_eliminated_combo(q_info, ["A", "B"])
+
+    solver.use_session(solver.SolverSession("other"))
+    assert solver.skip_eliminated_combos(q_info, [["A", "B"], ["C", "D"]]) == [["A", "B"], ["C", "D"]]
+    assert solver.finish_elimination_attempt(q_info, [["A", "B"], ["C", "D"]]) == 0
+
+
+def test_persisted_elimination_is_skipped_after_replay(solver):
+    q_info = make_q_info()
+    reject(solver, q_info, [["A", "B"], ["A", "C"], ["C", "D"]], [["A", "B"]])
+
+    # 以后的运行：从日志重建索引，新会话中直接跳过已确认的错误组合
+    solver.qa_bank_eliminated.clear()
+    solver.use_session(solver.SolverSession("next run"))
+    for q_text, variant in journal_records(solver):
+        solver.index_variant(q_text, variant)
+    assert solver.skip_eliminated_combos(q_info, [["A", "B"], ["A", "C"]]) == [["A", "C"]]
+
+
+def solve_on_sim(sim_solver, advance_latency, options_pos=None):
+    server = SimQuizServer([QUESTION], SimClock(), advance_latency=advance_latency)
+    solver = sim_solver(server)
+    q_info = solver.get_clipboard_data_robust()
+    frame = server.render_frame()
+    positions = solver.find_available_options(frame, option_count=3)
+    positions.update(options_pos or {})
+    return solver, server, solver.solve_single_choice(q_info, positions, solver.match_template(solver.TEMPLATE_SUBMIT, frame))
+
+
+def test_unresponsive_page_leaves_no_eliminations(sim_solver):
+    # 页面一直不刷新：每个选项提交后都被判为错误，但这次遍历的记录不会保存
+    solver, server, answer = solve_on_sim(sim_solver, advance_latency=1000.0)
+
+    assert answer is None
+    assert server.stats["submits"] == 3
+    assert journal_records(solver) == []
+    assert solver.qa_bank_eliminated == {}
+
+
+def test_rejections_are_saved_when_not_every_candidate_was_rejected(sim_solver):
+    # 正确选项 C 的位置识别错了，点击无法验证，它没有被提交
+    solver, server, answer = solve_on_sim(sim_solver, advance_latency=0.3, options_pos={"C": (5, 5)})
+
+    assert answer is None
+    assert journal_records(solver) == [("第一题", {"options": ["丙", "乙", "甲"], "answer": [], "eliminated": [["甲"], ["乙"]]})]
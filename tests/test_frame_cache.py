@@ -0,0 +1,50 @@
+# tests/test_frame_cache.py
+"""截图帧缓存：屏幕没有变化时多次查找共用同一帧，点击/滚动之后或超过 FRAME_CACHE_TTL 后重新截图。"""
+from sim_quiz_backend import SimClock, SimQuizServer
+
+QUESTION = {
+    "q_num": "第1题", "q_type": "单选", "q_text": "题目", "options": {"A": "甲", "B": "乙"},
+    "answer": {"A"}, "long_page": False,
+}
+
+
+def test_capture_reuses_frame_until_click(sim_solver):
+    server = SimQuizServer([QUESTION], SimClock())
+    solver = sim_solver(server)
+
+    first = solver.capture_region()
+    assert solver.capture_region() is first
+    assert server.stats["screenshots"] == 1
+    assert solver.run_stats["captures_avoided"] == 1
+
+    solver.click_at_region_pos((10, 10))
+    assert solver.capture_region() is not first
+    assert server.stats["screenshots"] == 2
+
+
+def test_cached_frame_expires_after_ttl(sim_solver):
+    server = SimQuizServer([QUESTION], SimClock())
+    solver = sim_solver(server)
+
+    first = solver.capture_region()
+    solver.time.sleep(solver.FRAME_CACHE_TTL + 0.1)
+    assert solver.capture_region() is not first
+    assert server.stats["screenshots"] == 2
+
+
+def test_frame_cache_disabled_captures_every_time(sim_solver, monkeypatch):
+    server = SimQuizServer([QUESTION], SimClock())
+    solver = sim_solver(server)
+    monkeypatch.setattr(solver, "USE_FRAME_CACHE", False)
+
+    for _ in range(3):
+        solver.capture_region()
+    assert server.stats["screenshots"] == 3
+    assert solver.run_stats["captures_avoided"] == 0
+
+
+def test_main_loop_shares_frames_between_lookups(run_main_loop):
+    solver, server, questions, _ = run_main_loop(8, unknown_ratio=0.5, long_page_ratio=0.5)
+
+    assert server.index == len(questions)
+    assert solver.run_stats["captures_avoided"] > 0
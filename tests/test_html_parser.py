@@ -0,0 +1,60 @@
+# tests/test_html_parser.py
+"""快速流式HTML解析器：与 BeautifulSoup 解析结果一致，并能从模拟后端的剪贴板HTML中读出题目、选项和选中状态。"""
+import pytest
+
+from sim_quiz_backend import SimClock, SimQuizServer
+from bench_html_parser import build_synthetic_corpus, check_parity
+
+
+def make_server(questions):
+    return SimQuizServer(questions, SimClock())
+
+
+def test_fast_parser_matches_bs4_on_synthetic_corpus(solver):
+    pytest.importorskip("bs4")
+    corpus = build_synthetic_corpus(60, seed=3)
+    assert check_parity(corpus) == []
+
+
+def test_fast_parser_matches_bs4_on_edge_cases(solver):
+    pytest.importorskip("bs4")
+    fragments = [
+        # 缺少题目文本
+        '<div class="ts_title_count"><i>第1题</i><em>单选</em></div><div class="options-wrapper"><ul>'
+        '<li class="option-item">A.甲</li></ul></div>',
+        # 选项文本中有实体和多余空白，题目文本中有嵌套标签
+        '<div class="ts_title_count"><i>第2题</i><em>多选</em></div>'
+        '<div class="ts_title_text">以下 <b>哪些</b> 是&amp;正确的？</div>'
+        '<div class="options-wrapper"><ul><li class="option-item active"><span>A.</span>  甲 &lt;乙&gt; </li>'
+        '<li class="option-item"><span>B.</span>丙</li></ul></div>',
+        # 被截断的片段
+        '<div class="ts_title_count"><i>第3题</i><em>单选</em></div><div class="ts_title_text">截断',
+    ]
+    for html in fragments:
+        assert solver._parse_html_data_fast(html) == solver._parse_html_data_bs4(html)
+
+
+def test_fast_parser_reads_question_options_and_selection(solver):
+    question = {
+        "q_num": "第7题", "q_type": "多选", "q_text": "下列哪些行为是安全的？",
+        "options": {"A": "开启二次验证", "B": "共享密码", "C": "定期修改密码"},
+        "answer": {"A", "C"}, "long_page": False,
+    }
+    server = make_server([question])
+    server.selected = {"A", "C"}
+    parsed = solver._parse_html_data_fast(server.render_html())
+    assert parsed['q_num'] == "第7题"
+    assert parsed['q_text'] == question['q_text']
+    assert parsed['options'] == question['options']
+    assert sorted(parsed['selected_options']) == ["A", "C"]
+
+
+def test_fast_parser_keeps_image_option_source(solver):
+    url = "https://example.com/option_b.png"
+    question = {
+        "q_num": "第1题", "q_type": "单选", "q_text": "选出正确的图形",
+        "options": {"A": "正方形", "B": url}, "answer": {"B"}, "long_page": False,
+    }
+    parsed = solver._parse_html_data_fast(make_server([question]).render_html())
+    assert parsed['options']['B'] == url
+    assert parsed['selected_options'] == []
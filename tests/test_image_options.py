@@ -0,0 +1,87 @@
+# tests/test_image_options.py
+"""图片选项：按URL中的文件名 (或屏幕截图的感知哈希) 识别，CDN域名、防缓存参数和签名变化后仍能命中题库。"""
+import numpy as np
+import pytest
+
+from sim_quiz_backend import SimClock, SimQuizServer, make_stop_question
+
+OLD_URLS = ["https://cdn-1.example.com/img/Task93_a.png?t=1", "https://cdn-1.example.com/img/Task93_b.png?t=1"]
+NEW_URLS = ["//cdn-2.example.com/static/task93_a.png?t=2&sign=xx", "https://cdn-2.example.com/static/task93_b.png#v2"]
+
+
+def test_canonical_key_ignores_host_query_and_case(solver):
+    assert solver.canonical_image_key(OLD_URLS[0]) == solver.canonical_image_key(NEW_URLS[0]) == "img:task93_a.png"
+    assert solver.normalize_option(NEW_URLS[1]) == "img:task93_b.png"
+    assert solver.normalize_option("文字选项 ") == "文字选项"
+
+
+def test_image_question_is_answered_in_one_submit(sim_solver):
+    questions = [
+        {"q_num": "第1题", "q_type": "单选", "q_text": "选出正确的图形",
+         "options": {"A": NEW_URLS[0], "B": NEW_URLS[1]}, "answer": {"B"}, "long_page": False},
+        make_stop_question(2),
+    ]
+    server = SimQuizServer(questions, SimClock())
+    solver = sim_solver(server)
+    solver.qa_bank["选出正确的图形"] = [{"options": OLD_URLS, "answer": [OLD_URLS[1]]}]
+    solver.build_qa_bank_index()
+    solver.STOP_AT_QUESTION_NUM = "第2题"
+
+    solver.main_loop()
+    assert server.index == 1
+    assert server.stats["submits"] == 1
+
+
+@pytest.fixture
+def phash(solver, tmp_path, monkeypatch):
+    monkeypatch.setattr(solver, "USE_IMAGE_OPTION_PHASH", True)
+    monkeypatch.setattr(solver, "IMAGE_OPTION_KEY_CACHE_FILE", str(tmp_path / "image_option_keys.json"))
+    monkeypatch.setattr(solver, "image_option_keys", {})
+    return solver
+
+
+def draw_options(solver, pictures):
+    """在选项字母图标右侧画出图片选项，返回 (截图, 选项坐标)。"""
+    frame = np.full((400, 500, 3), 255, dtype=np.uint8)
+    options_pos = {}
+    for i, (letter, picture) in enumerate(pictures.items()):
+        x, y = 40, 100 + i * 150
+        left, top, right, bottom = solver.IMAGE_OPTION_CROP_BOX
+        frame[y + top:y + bottom, x + left:x + right] = picture
+        options_pos[letter] = (x, y)
+    return frame, options_pos
+
+
+def picture(seed):
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 255, size=(5, 15, 3), dtype=np.uint8)
+    return np.kron(small, np.ones((20, 20, 1), dtype=np.uint8))
+
+
+def test_renamed_image_is_matched_by_perceptual_hash(phash):
+    solver = phash
+    frame, options_pos = draw_options(solver, {"A": picture(1), "B": picture(2)})
+    old = {"q_text": "选出正确的图形", "options": {"A": OLD_URLS[0], "B": OLD_URLS[1]}, "selected_options": []}
+    assert solver.hash_image_options(old, options_pos, frame) == 2
+    solver.qa_bank["选出正确的图形"] = [{"options": OLD_URLS, "answer": [OLD_URLS[1]]}]
+    solver.build_qa_bank_index()
+
+    # 文件名也换了，而且两张图片的位置互换
+    renamed = ["https://cdn-3.example.com/x/0001.png", "https://cdn-3.example.com/x/0002.png"]
+    frame, options_pos = draw_options(solver, {"A": picture(2), "B": picture(1)})
+    new = {"q_text": "选出正确的图形", "options": {"A": renamed[0], "B": renamed[1]}, "selected_options": []}
+    assert solver.lookup_qa_answer(new['q_text'], list(new['options'].values()))[1] is None
+    assert solver.hash_image_options(new, options_pos, frame) == 2
+
+    answer = solver.lookup_qa_answer(new['q_text'], list(new['options'].values()))[1]
+    assert answer == [OLD_URLS[1]]
+    assert solver.map_answers_to_letters(new, answer) == ["A"]
+
+
+def test_blank_crop_records_no_hash(phash):
+    solver = phash
+    frame, options_pos = draw_options(solver, {"A": picture(1), "B": picture(2)})
+    frame[:] = 255
+    q_info = {"q_text": "题目", "options": {"A": OLD_URLS[0], "B": OLD_URLS[1]}, "selected_options": []}
+    assert solver.hash_image_options(q_info, options_pos, frame) == 0
+    assert solver.image_option_keys == {}
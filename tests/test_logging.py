@@ -0,0 +1,103 @@
+# tests/test_logging.py
+"""日志输出：后台线程写日志时关闭前写完队列；JSON 格式每行一条；控制台级别和各模块级别分别生效。"""
+import json
+import logging
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def log_solver(solver, monkeypatch):
+    """日志处理器、后台线程和日志文件路径都是本测试独有的，测试结束时关闭并恢复。"""
+    monkeypatch.setattr(solver.logger, "handlers", [])
+    monkeypatch.setattr(solver, "_log_handlers", [])
+    monkeypatch.setattr(solver, "_log_listener", None)
+    monkeypatch.setattr(solver, "LOG_FILE_PATH", solver.LOG_FILE_PATH)
+    monkeypatch.setattr(solver, "LOG_LEVELS", dict(solver.LOG_LEVELS))
+    yield solver
+    solver.close_logging()
+    for handler in solver._log_handlers:
+        handler.close()
+
+
+def read_log(solver):
+    with open(solver.LOG_FILE_PATH, 'r', encoding='utf-8') as f:
+        return f.read().splitlines()
+
+
+def test_async_logging_writes_everything_before_close(log_solver, monkeypatch):
+    solver = log_solver
+    monkeypatch.setattr(solver, "LOG_ASYNC", True)
+    solver.setup_logging()
+    assert [type(h) for h in solver.logger.handlers] == [solver._LogQueueHandler]
+
+    for i in range(200):
+        solver.logger.info(f"第{i}条 ✅")
+    try:
+        raise ValueError("坏数据")
+    except ValueError:
+        solver.logger.exception("解析失败")
+    solver.close_logging()
+
+    lines = read_log(solver)
+    assert [line.split(" - ")[-1] for line in lines[:200]] == [f"第{i}条 ✅" for i in range(200)]
+    # 文本格式的异常堆栈仍然紧跟在消息之后
+    assert lines[200].endswith(" - ERROR - 解析失败") and lines[201] == "Traceback (most recent call last):"
+    assert lines[-1] == "ValueError: 坏数据"
+
+
+def test_json_format_keeps_calling_thread_and_exception(log_solver, monkeypatch):
+    solver = log_solver
+    monkeypatch.setattr(solver, "LOG_ASYNC", True)
+    monkeypatch.setattr(solver, "LOG_FORMAT", 'JSON')
+    solver.setup_logging()
+    assert solver.LOG_FILE_PATH.endswith(".jsonl")
+
+    def answer_thread():
+        try:
+            raise ValueError("坏数据")
+        except ValueError:
+            solver.logger.exception("解析失败")
+
+    thread = threading.Thread(target=answer_thread, name="session_1")
+    thread.start()
+    thread.join()
+    solver.logger.warning("⚠️ 警告")
+    solver.close_logging()
+
+    records = [json.loads(line) for line in read_log(solver)]
+    assert [(r["level"], r["thread"], r["msg"]) for r in records] == [
+        ("ERROR", "session_1", "解析失败"), ("WARNING", threading.current_thread().name, "⚠️ 警告")]
+    assert "ValueError: 坏数据" in records[0]["exc"]
+    assert "exc" not in records[1]
+
+
+@pytest.mark.parametrize("log_async", [True, False])
+def test_console_level_does_not_affect_file(log_solver, monkeypatch, capsys, log_async):
+    solver = log_solver
+    monkeypatch.setattr(solver, "LOG_ASYNC", log_async)
+    monkeypatch.setattr(solver, "LOG_CONSOLE_LEVEL", 'WARNING')
+    solver.setup_logging()
+
+    solver.logger.info("普通信息")
+    solver.logger.warning("需要注意")
+    solver.close_logging()
+
+    console = capsys.readouterr().err
+    assert "需要注意" in console and "普通信息" not in console
+    assert [line.split(" - ")[-1] for line in read_log(solver)] == ["普通信息", "需要注意"]
+
+
+def test_module_levels_are_applied(log_solver, monkeypatch):
+    solver = log_solver
+    noisy = logging.getLogger("noisy_library")
+    monkeypatch.setattr(noisy, "level", logging.NOTSET)
+    solver.LOG_LEVELS["noisy_library"] = "ERROR"
+    solver.setup_logging()
+
+    assert noisy.level == logging.ERROR
+    # 第三方库导入时重设了自己的级别，再次应用后恢复
+    noisy.setLevel(logging.DEBUG)
+    solver.apply_log_levels()
+    assert noisy.level == logging.ERROR
@@ -0,0 +1,27 @@
+# tests/test_main_loop_sim.py
+"""用模拟答题后端驱动完整的 main_loop：题库题、新题和需要滚动的长页面都能答完，学到的答案写入解题日志。"""
+
+
+def correct_answer_texts(question):
+    return sorted(question['options'][letter] for letter in question['answer'])
+
+
+def test_main_loop_solves_known_and_new_questions(run_main_loop):
+    solver, server, questions, journal = run_main_loop(8, unknown_ratio=0.5, long_page_ratio=0.5)
+
+    assert server.index == len(questions)
+    assert server.stats["correct_submits"] == len(questions)
+    assert any(q['long_page'] for q in questions) and server.stats["scrolls"] > 0
+    learned = {q_text: sorted(variant['answer']) for q_text, variant in journal if variant['answer']}
+    new_questions = [q for q in questions if "模拟新题" in q['q_text']]
+    assert new_questions
+    for question in new_questions:
+        assert learned[question['q_text']] == correct_answer_texts(question)
+
+
+def test_main_loop_stops_at_sentinel_question(run_main_loop):
+    solver, server, questions, _ = run_main_loop(3, unknown_ratio=0.0)
+
+    # 终止哨兵题目不会被作答
+    assert server.index == len(questions)
+    assert server.stats["correct_submits"] == len(questions)
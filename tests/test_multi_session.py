@@ -0,0 +1,56 @@
+# tests/test_multi_session.py
+"""多窗口会话：截图的灰度缓存不在会话之间共享，界面稳定检测每次等待最多让出一次控制权。"""
+import numpy as np
+
+from sim_quiz_backend import SimClock, SimQuizServer
+
+QUESTION = {
+    "q_num": "第1题", "q_type": "单选", "q_text": "题目", "options": {"A": "甲", "B": "乙"},
+    "answer": {"A"}, "long_page": False,
+}
+
+
+class CountingScheduler:
+    """只记录让出控制权的次数，不真正切换会话。"""
+
+    def __init__(self, solver):
+        self.solver = solver
+        self.waits = []
+
+    def wait(self, session, seconds):
+        self.waits.append(seconds)
+        self.solver.time.sleep(seconds)
+
+
+def test_gray_frame_cache_is_per_session(solver):
+    first = np.full((4, 4, 3), 10, dtype=np.uint8)
+    second = np.full((4, 4, 3), 200, dtype=np.uint8)
+    gray_first = solver._to_gray(first)
+    assert solver._to_gray(first) is gray_first
+
+    solver.use_session(solver.SolverSession("other"))
+    assert int(solver._to_gray(second)[0, 0]) == 200
+    solver.use_session(solver.SolverSession("third"))
+    assert int(solver._to_gray(first)[0, 0]) == 10
+
+
+def test_settle_wait_yields_once(sim_solver, monkeypatch):
+    server = SimQuizServer([QUESTION], SimClock())
+    solver = sim_solver(server)
+    scheduler = CountingScheduler(solver)
+    monkeypatch.setattr(solver, "_scheduler", scheduler)
+
+    # 画面一直不变，等满上限，期间轮询约 10 次
+    solver.wait_until_settled(1.0, solver.capture_settle_view())
+    assert scheduler.waits == [solver.SETTLE_POLL_INTERVAL]
+    assert solver.run_stats["settle_timeouts"] == 1
+
+
+def test_short_settle_wait_keeps_control(sim_solver, monkeypatch):
+    server = SimQuizServer([QUESTION], SimClock())
+    solver = sim_solver(server)
+    scheduler = CountingScheduler(solver)
+    monkeypatch.setattr(solver, "_scheduler", scheduler)
+
+    solver.wait_until_settled(solver.SESSION_MIN_YIELD_SECONDS / 2, solver.capture_settle_view())
+    assert scheduler.waits == []
@@ -0,0 +1,85 @@
+# tests/test_option_layout.py
+"""选项布局：用一次完整匹配校准后按布局推算选项坐标，只做一次确认匹配；页面滚动后重新对齐，确认失败时回退到完整匹配并重新校准。"""
+from sim_quiz_backend import SimClock, SimQuizServer
+
+THREE = {
+    "q_num": "第1题", "q_type": "多选", "q_text": "第一题", "options": {"A": "甲", "B": "乙", "C": "丙"},
+    "answer": {"A", "C"}, "long_page": False,
+}
+FOUR = {
+    "q_num": "第2题", "q_type": "单选", "q_text": "第二题", "options": {"A": "甲", "B": "乙", "C": "丙", "D": "丁"},
+    "answer": {"D"}, "long_page": True,
+}
+
+
+def assert_on_rows(available, server):
+    rows, _, _ = server._layout(server.current)
+    assert sorted(available) == sorted(rows)
+    for letter, (x, y) in available.items():
+        x1, y1, x2, y2 = rows[letter]
+        assert x1 <= x <= x2 and y1 <= y + server.scroll_offset <= y2
+
+
+def calibrated(sim_solver, questions):
+    server = SimQuizServer(questions, SimClock())
+    solver = sim_solver(server)
+    assert_on_rows(solver.find_available_options(option_count=len(server.current['options'])), server)
+    assert solver.run_stats["layout_calibrations"] == 1
+    return solver, server
+
+
+def test_calibrated_layout_needs_one_confirmation_match(sim_solver):
+    solver, server = calibrated(sim_solver, [THREE])
+    full = solver.find_available_options()
+
+    available = solver.find_available_options(option_count=3)
+    assert solver.run_stats["layout_hits"] == 1
+    assert_on_rows(available, server)
+    for letter, (x, y) in available.items():
+        assert abs(x - full[letter][0]) <= solver.OPTION_LAYOUT_TOLERANCE
+        assert abs(y - full[letter][1]) <= solver.OPTION_LAYOUT_TOLERANCE
+
+
+def test_scrolled_page_and_new_option_count_are_realigned(sim_solver):
+    solver, server = calibrated(sim_solver, [THREE, FOUR])
+    server.selected = set(THREE['answer'])
+    server._submit(server.current)
+    solver.time.sleep(1.0)
+    server.scroll(120)
+
+    available = solver.find_available_options(option_count=4)
+    assert solver.run_stats["layout_realigned"] == 1 and solver.run_stats["layout_misses"] == 0
+    assert_on_rows(available, server)
+    assert solver.current_session().option_layout["offsets"][4] == available['A'][1]
+
+
+def test_wrong_layout_confirmation_triggers_recalibration(sim_solver):
+    solver, server = calibrated(sim_solver, [THREE])
+    layout = solver.current_session().option_layout
+    pitch = layout["pitch"]
+    layout["pitch"] = pitch + 3 * solver.OPTION_LAYOUT_TOLERANCE  # 例如窗口缩放后行间距变了
+
+    available = solver.find_available_options(option_count=3)
+    assert solver.run_stats["layout_misses"] == 1 and solver.run_stats["layout_hits"] == 0
+    assert_on_rows(available, server)
+    # 完整匹配的结果重新校准了布局，之后又能只做一次确认
+    assert solver.run_stats["layout_calibrations"] == 2
+    assert abs(layout["pitch"] - pitch) < 1
+    solver.find_available_options(option_count=3)
+    assert solver.run_stats["layout_hits"] == 1
+
+
+def test_only_evenly_spaced_runs_from_a_are_calibrated(solver):
+    assert not solver.calibrate_option_layout({"A": (50, 100), "C": (50, 300)})
+    assert not solver.calibrate_option_layout({"A": (50, 100), "B": (50, 200), "C": (50, 400)})
+    assert not solver.calibrate_option_layout({"A": (50, 100), "B": (90, 200)})
+    assert solver.current_session().option_layout["pitch"] is None
+    assert solver.calibrate_option_layout({"A": (50, 100), "B": (51, 200), "C": (50, 300)})
+    assert solver.current_session().option_layout["pitch"] == 100
+
+
+def test_main_loop_uses_the_layout(run_main_loop):
+    solver, server, questions, _ = run_main_loop(6, unknown_ratio=0.5, seed=6, long_page_ratio=0.5)
+
+    assert server.index == len(questions)
+    assert solver.run_stats["layout_hits"] + solver.run_stats["layout_realigned"] > 0
@@ -0,0 +1,61 @@
+# tests/test_parse_cache.py
+"""剪贴板解析缓存：HTML内容完全相同时复用解析结果，页面有任何变化都重新解析。"""
+from collections import OrderedDict
+
+import pytest
+
+from sim_quiz_backend import SimClock, SimQuizServer
+
+QUESTION = {
+    "q_num": "第1题", "q_type": "多选", "q_text": "题目", "options": {"A": "甲", "B": "乙", "C": "丙"},
+    "answer": {"A", "C"}, "long_page": False,
+}
+
+
+@pytest.fixture
+def cached_solver(sim_solver, monkeypatch):
+    def start(server):
+        solver = sim_solver(server)
+        monkeypatch.setattr(solver, "_parse_cache", OrderedDict())
+        return solver
+    return start
+
+
+def test_unchanged_page_is_parsed_once(cached_solver):
+    server = SimQuizServer([QUESTION], SimClock())
+    solver = cached_solver(server)
+
+    first = solver.get_clipboard_data_robust()
+    second = solver.get_clipboard_data_robust()
+    assert first == second
+    assert solver.run_stats["parse_cache_misses"] == 1
+    assert solver.run_stats["parse_cache_hits"] == 1
+
+    # 返回的是副本，调用方修改结果不会污染缓存
+    second['options']['A'] = "改动"
+    second['selected_options'].append("B")
+    assert solver.get_clipboard_data_robust() == first
+
+
+def test_selection_change_is_parsed_again(cached_solver):
+    server = SimQuizServer([QUESTION], SimClock())
+    solver = cached_solver(server)
+
+    assert solver.get_clipboard_data_robust()['selected_options'] == []
+    server.selected = {"B"}
+    assert solver.get_clipboard_data_robust()['selected_options'] == ["B"]
+    assert solver.run_stats["parse_cache_misses"] == 2
+    assert solver.run_stats["parse_cache_hits"] == 0
+
+
+def test_cache_keeps_only_recent_fragments(cached_solver, monkeypatch):
+    server = SimQuizServer([QUESTION], SimClock())
+    solver = cached_solver(server)
+    monkeypatch.setattr(solver, "CLIPBOARD_PARSE_CACHE_SIZE", 2)
+
+    for selected in ({"A"}, {"B"}, {"C"}, {"A"}):
+        server.selected = selected
+        solver.get_clipboard_data_robust()
+    # 最早的 {"A"} 已被淘汰，需要重新解析
+    assert len(solver._parse_cache) == 2
+    assert solver.run_stats["parse_cache_misses"] == 4
@@ -0,0 +1,57 @@
+# tests/test_pipeline_prefetch.py
+"""截图/匹配流水线：后台线程截图并匹配提交按钮和选项的同时，主线程读取剪贴板，第一次尝试直接使用预取结果。"""
+from concurrent.futures import Future
+
+from sim_quiz_backend import SimClock, SimQuizServer
+
+QUESTION = {
+    "q_num": "第1题", "q_type": "单选", "q_text": "题目", "options": {"A": "甲", "B": "乙", "C": "丙"},
+    "answer": {"B"}, "long_page": False,
+}
+
+
+def test_prefetch_matches_targets_while_clipboard_is_read(sim_solver):
+    server = SimQuizServer([QUESTION], SimClock())
+    solver = sim_solver(server)
+
+    future = solver.start_target_prefetch()
+    q_info = solver.get_clipboard_data_robust()
+    prefetched = solver.join_target_prefetch(future, clipboard_seconds=0.05)
+
+    assert q_info['q_text'] == "题目"
+    assert prefetched["submit_pos"] == solver.match_template(solver.TEMPLATE_SUBMIT, prefetched["frame"])
+    assert sorted(prefetched["options_pos"]) == ["A", "B", "C"]
+    assert prefetched["saved_seconds"] == min(prefetched["match_seconds"], 0.05)
+
+
+def test_long_page_prefetch_leaves_search_to_main_thread(sim_solver):
+    server = SimQuizServer([dict(QUESTION, long_page=True)], SimClock())
+    solver = sim_solver(server)
+
+    prefetched = solver.join_target_prefetch(solver.start_target_prefetch(), 0.0)
+    # 提交按钮需要滚动才能看到，这一帧上的选项位置也用不上
+    assert prefetched["submit_pos"] is None
+    assert prefetched["options_pos"] == {}
+
+
+def test_failed_prefetch_falls_back_to_sequential_search(solver):
+    future = Future()
+    future.set_exception(RuntimeError("截图失败"))
+    assert solver.join_target_prefetch(future, 0.1) is None
+
+
+def test_main_loop_uses_prefetched_targets(run_main_loop):
+    solver, server, questions, _ = run_main_loop(8, unknown_ratio=0.5, long_page_ratio=0.25)
+
+    assert server.index == len(questions)
+    assert server.stats["correct_submits"] == len(questions)
+    assert 0 < solver.run_stats["pipeline_hits"] <= len(questions)
+    assert solver.run_stats["pipeline_saved_seconds"] > 0
+
+
+def test_main_loop_without_pipeline(run_main_loop, solver, monkeypatch):
+    monkeypatch.setattr(solver, "PIPELINE_CAPTURE_WITH_CLIPBOARD", False)
+    _, server, questions, _ = run_main_loop(4, unknown_ratio=0.5)
+
+    assert server.index == len(questions)
+    assert solver.run_stats["pipeline_hits"] == 0
@@ -0,0 +1,99 @@
+# tests/test_post_submit_wait.py
+"""提交后的自适应等待：题目刷新立即返回，超时快速失败，慢刷新的正确答案之后仍会被认出来。"""
+import pytest
+
+from sim_quiz_backend import SimClock, SimQuizServer
+
+
+def make_server(advance_latency=0.3):
+    questions = [
+        {"q_num": "第1题", "q_type": "单选", "q_text": "第一题", "options": {"A": "甲", "B": "乙"},
+         "answer": {"B"}, "long_page": False},
+        {"q_num": "第2题", "q_type": "单选", "q_text": "第二题", "options": {"A": "丙", "B": "丁"},
+         "answer": {"A"}, "long_page": False},
+    ]
+    return SimQuizServer(questions, SimClock(), advance_latency=advance_latency)
+
+
+def submit(server, letters):
+    server.selected = set(letters)
+    server._submit(server.current)
+
+
+def test_returns_as_soon_as_question_advances(sim_solver):
+    server = make_server(advance_latency=0.3)
+    solver = sim_solver(server)
+    submit(server, ["B"])
+    start = server.clock.now()
+
+    assert solver.wait_for_next_question("第一题", ["B"]) is True
+    assert server.clock.now() - start < solver.FIXED_POST_SUBMIT_DELAY
+    assert solver.current_session().unconfirmed_submit is None
+
+
+def test_wrong_answer_fails_fast_and_is_left_unconfirmed(sim_solver):
+    server = make_server()
+    solver = sim_solver(server)
+    submit(server, ["A"])
+    start = server.clock.now()
+
+    assert solver.wait_for_next_question("第一题", ["A"]) is False
+    elapsed = server.clock.now() - start
+    assert solver.FIXED_POST_SUBMIT_DELAY <= elapsed < solver.POST_SUBMIT_WAIT_DEADLINE
+    unconfirmed = solver.current_session().unconfirmed_submit
+    assert (unconfirmed["q_text"], unconfirmed["letters"]) == ("第一题", ["A"])
+
+
+def test_fast_fail_is_never_shorter_than_fixed_delay(sim_solver, monkeypatch):
+    server = make_server()
+    solver = sim_solver(server)
+    monkeypatch.setattr(solver, "POST_SUBMIT_SAME_QUESTION_TIMEOUT", 0.2)
+    start = server.clock.now()
+
+    assert solver.wait_for_next_question("第一题") is False
+    assert server.clock.now() - start >= solver.FIXED_POST_SUBMIT_DELAY
+
+
+def test_late_advance_turns_timed_out_submit_into_answer(sim_solver):
+    server = make_server(advance_latency=1.5)
+    solver = sim_solver(server)
+    q_info = solver.get_clipboard_data_robust()
+    submit(server, ["B"])
+    assert solver.wait_for_next_question("第一题", ["B"]) is False
+    solver.record_eliminated_combo(q_info, ["B"])
+
+    solver.time.sleep(1.0)  # 页面随后才切换到下一题
+    assert solver.late_advanced_answer(q_info) == ["乙"]
+    assert solver.lookup_eliminated(q_info) == set()
+    assert solver.late_advanced_answer(q_info) is None
+    # 之后的快速失败时间会等到至少这么久
+    assert solver.current_session().slow_advance_timeout > solver.FIXED_POST_SUBMIT_DELAY
+
+
+def test_advance_after_unconfirmed_submit_is_ambiguous(sim_solver):
+    server = make_server(advance_latency=1.5)
+    solver = sim_solver(server)
+    q_info = solver.get_clipboard_data_robust()
+    submit(server, ["B"])
+    assert solver.wait_for_next_question("第一题", ["B"]) is False
+
+    # 下一个组合提交后题目刷新了，但刷新的可能是上一次的正确提交
+    assert solver.wait_for_next_question("第一题", ["A"]) is True
+    assert solver.take_ambiguous_advance(q_info) == [["B"], ["A"]]
+    assert solver.take_ambiguous_advance(q_info) is None
+
+
+@pytest.mark.parametrize("advance_latency", [1.5, 2.5])
+def test_slow_page_is_solved_without_eliminating_correct_answer(run_main_loop, advance_latency):
+    # 答对后页面比快速失败时间更晚才切换
+    solver, server, questions, journal = run_main_loop(6, unknown_ratio=1.0, seed=2,
+                                                       advance_latency=advance_latency, ui_latency=0.1)
+
+    assert server.index == len(questions)
+    assert solver.run_stats["late_advances"] + solver.run_stats["ambiguous_advances"] > 0
+    answers = {q['q_text']: sorted(q['options'][letter] for letter in q['answer']) for q in questions}
+    for q_text, variant in journal:
+        if variant['answer']:
+            assert sorted(variant['answer']) == answers[q_text]
+        for combo in variant.get('eliminated', []):
+            assert sorted(combo) != answers[q_text]
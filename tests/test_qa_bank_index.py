@@ -0,0 +1,48 @@
+# tests/test_qa_bank_index.py
+"""题库索引：按 (规范化问题, 规范化选项集) 查找，与选项顺序、全角/半角标点和空白无关。"""
+
+
+def load_bank(solver, bank):
+    solver.qa_bank.update(bank)
+    solver.build_qa_bank_index()
+
+
+def test_lookup_ignores_option_order_punctuation_and_whitespace(solver):
+    load_bank(solver, {"以下哪个是正确的，请选择": [{"options": ["选项 一", "选项二（甲）"], "answer": ["选项二（甲）"]}]})
+
+    key, answer = solver.lookup_qa_answer("以下哪个是正确的,请选择 ", ["选项二(甲)", "选项一"])
+    assert answer == ["选项二（甲）"]
+    assert key == solver.make_qa_key("以下哪个是正确的，请选择", ["选项 一", "选项二（甲）"])
+
+
+def test_new_variant_of_known_question_is_a_miss(solver):
+    load_bank(solver, {"问题": [{"options": ["甲", "乙"], "answer": ["甲"]}]})
+
+    key, answer = solver.lookup_qa_answer("问题", ["甲", "丙"])
+    assert answer is None
+    assert solver.qa_bank_has_question(key[0])
+    assert not solver.qa_bank_has_question(solver.normalize_text("另一个问题"))
+
+
+def test_each_variant_keeps_its_own_answer(solver):
+    load_bank(solver, {"问题": [
+        {"options": ["甲", "乙"], "answer": ["甲"]},
+        {"options": ["甲", "丙"], "answer": ["丙"]},
+    ]})
+
+    assert solver.lookup_qa_answer("问题", ["乙", "甲"])[1] == ["甲"]
+    assert solver.lookup_qa_answer("问题", ["丙", "甲"])[1] == ["丙"]
+
+
+def test_answers_map_back_to_current_letters(solver):
+    q_info = {"q_text": "问题", "options": {"A": "乙 ", "B": "甲", "C": "丙"}}
+    assert solver.map_answers_to_letters(q_info, ["甲", "乙"]) == ["B", "A"]
+    assert solver.map_answers_to_letters(q_info, ["丁"]) == []
+
+
+def test_bank_questions_are_answered_on_first_submit(run_main_loop):
+    # 模拟后端打乱了每道题的选项顺序
+    solver, server, questions, _ = run_main_loop(10, unknown_ratio=0.0)
+
+    assert server.index == len(questions)
+    assert server.stats["submits"] == len(questions)
@@ -0,0 +1,118 @@
+# tests/test_qa_bank_server.py
+"""题库服务：并发学习时推送给订阅者的每条消息都完整；单个请求出错不会断开连接；断开后在查询结束时回退到本地题库。"""
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+import qa_bank_server
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def bank_server(solver, tmp_path):
+    """在本进程中启动题库服务 (自动分配端口)，服务使用 solver 模块中的空题库。"""
+    writer = qa_bank_server.JournalWriter(str(tmp_path / "server" / "solution_journal.jsonl"), 0.05, 100)
+    server = qa_bank_server.BankServer(("127.0.0.1", 0), writer)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    writer.close()
+    thread.join()
+
+
+def connect(solver, server, **kwargs):
+    return solver.QABankClient(server.server_address[:2], timeout=5.0, **kwargs)
+
+
+def test_concurrent_learns_reach_subscriber_intact(solver, bank_server):
+    received = []
+    done = threading.Event()
+    total = 4 * 25
+
+    def on_learned(q_text, entry):
+        received.append((q_text, entry))
+        if len(received) == total:
+            done.set()
+
+    subscriber = connect(solver, bank_server, on_learned=on_learned)
+    subscriber.subscribe()
+    # 大消息在写入时会被拆成多次发送，没有按连接加锁时不同线程的推送会交错
+    filler = "长" * 20000
+
+    def learn_many(k):
+        client = connect(solver, bank_server)
+        for i in range(total // 4):
+            assert client.learn(f"题{k}-{i}", {"options": [filler, "乙"], "answer": ["乙"]})
+        client.close()
+
+    while not bank_server.subscribers:
+        time.sleep(0.01)
+    threads = [threading.Thread(target=learn_many, args=(k,)) for k in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert done.wait(10)
+    assert sorted(q for q, _ in received) == sorted(f"题{k}-{i}" for k in range(4) for i in range(total // 4))
+    assert all(entry["options"] == sorted([filler, "乙"]) for _, entry in received)
+    assert bank_server.stats["pushes"] == total
+    subscriber.close()
+
+
+def test_failed_request_keeps_connection(solver, bank_server):
+    disconnected = threading.Event()
+    client = connect(solver, bank_server, on_disconnect=disconnected.set)
+
+    assert client.request({"op": "option_count", "field": "不存在的字段", "text": "甲"}) is None
+    assert client.connected and not disconnected.is_set()
+    assert client.learn("服务题", {"options": ["丙", "丁"], "answer": ["丁"]})
+    assert client.lookup(solver.make_qa_key("服务题", ["丁", "丙"])) == ["丁"]
+    client.close()
+
+
+def start_server_process(tmp_path):
+    """在子进程中启动题库为空的题库服务 (与客户端不共享模块全局变量)，返回 (进程, 端口)。"""
+    empty_bank = tmp_path / "server_bank.json"
+    empty_bank.write_text("{}", encoding='utf-8')
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(REPO_ROOT, "tools", "qa_bank_server.py"), "--port", "0", "--no-replay",
+         "--bank", str(empty_bank), "--journal-dir", str(tmp_path / "server")],
+        cwd=str(tmp_path), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        env=dict(os.environ, PYTHONIOENCODING="utf-8"),
+    )
+    for line in proc.stdout:
+        match = re.search(r"监听 .*:(\d+)$", line.strip())
+        if match:
+            return proc, int(match.group(1))
+    raise RuntimeError("题库服务启动失败。")
+
+
+def test_lost_server_falls_back_after_lookup(solver, tmp_path, monkeypatch):
+    bank_path = tmp_path / "bank.json"
+    bank_path.write_text(json.dumps({"本地题": [{"options": ["甲", "乙"], "answer": ["乙"]}]}, ensure_ascii=False),
+                         encoding='utf-8')
+    monkeypatch.setattr(solver, "QA_BANK_FILE", str(bank_path))
+    proc, port = start_server_process(tmp_path)
+    try:
+        monkeypatch.setattr(solver, "QA_BANK_SERVER_ADDRESS", ("127.0.0.1", port))
+        monkeypatch.setattr(solver, "QA_BANK_BACKEND", 'SERVER')
+        solver.load_qa_bank()
+        assert isinstance(solver.qa_bank_store, solver.QABankClient)
+        assert solver.lookup_qa_answer("本地题", ["甲", "乙"])[1] is None  # 服务的题库是空的
+    finally:
+        proc.kill()
+        proc.wait()
+
+    # 服务在两次查询之间退出：这次查询中途断开，查询结束前回退到本地题库并用它作答
+    assert solver.lookup_qa_answer("本地题", ["乙", "甲"])[1] == ["乙"]
+    assert solver.qa_bank_store is None
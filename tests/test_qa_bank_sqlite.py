@@ -0,0 +1,79 @@
+# tests/test_qa_bank_sqlite.py
+"""SQLite 题库后端：查询结果 (答案、排除组合、题目是否存在、多选题遍历顺序) 与 JSON 后端完全一致。"""
+import json
+import os
+import random
+
+import pytest
+
+from conftest import REPO_ROOT
+
+
+def build_bank():
+    with open(os.path.join(REPO_ROOT, "master_qa_bank.json"), 'r', encoding='utf-8') as f:
+        bank = json.load(f)
+    bank["多选题"] = [
+        {"options": ["甲", "乙", "丙", "丁"], "answer": ["甲", "丙"], "answer_letters": ["A", "C"]},
+        {"options": ["甲", "乙", "丙", "戊"], "answer": [], "eliminated": [["乙"], ["甲", "乙"]]},
+    ]
+    return bank
+
+
+def queries(bank, seed=0):
+    """每个变种按打乱后的选项顺序查询一次，再加上一个不存在的变种。"""
+    rng = random.Random(seed)
+    for q_text, variants in bank.items():
+        for variant in variants:
+            options = list(variant['options'])
+            rng.shuffle(options)
+            yield q_text, options
+        yield q_text, ["不存在的选项"]
+
+
+def snapshot(solver, bank):
+    result = []
+    for q_text, options in queries(bank):
+        key, answer = solver.lookup_qa_answer(q_text, options)
+        q_info = {"q_text": q_text, "options": dict(zip("ABCDEFGH", options))}
+        ranked = solver.rank_multi_choice_combinations(q_info, list(q_info['options'])[:4], solver.answer_prior)
+        result.append((answer, sorted(solver.lookup_eliminated(q_info)), solver.qa_bank_has_question(key[0]),
+                       [combo for combo, _ in ranked]))
+    return result
+
+
+@pytest.fixture
+def bank_files(solver, tmp_path, monkeypatch):
+    bank = build_bank()
+    json_path, db_path = str(tmp_path / "bank.json"), str(tmp_path / "bank.db")
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(bank, f, ensure_ascii=False)
+    store = solver.SQLiteQABank(db_path)
+    store.import_json(bank)
+    store.close()
+    monkeypatch.setattr(solver, "QA_BANK_FILE", json_path)
+    monkeypatch.setattr(solver, "QA_BANK_DB_FILE", db_path)
+    yield bank
+    if solver.qa_bank_store is not None:
+        solver.qa_bank_store.close()
+
+
+def test_sqlite_backend_matches_json_backend(solver, bank_files):
+    solver.load_qa_bank('JSON')
+    from_json = snapshot(solver, bank_files)
+
+    solver.load_qa_bank('SQLITE')
+    assert isinstance(solver.qa_bank_store, solver.SQLiteQABank)
+    assert solver.qa_bank == {}
+    assert snapshot(solver, bank_files) == from_json
+    # 确实查到了答案和排除组合，而不是两边都为空
+    assert any(answer for answer, *_ in from_json)
+    assert any(eliminated for _, eliminated, *_ in from_json)
+
+
+def test_main_loop_answers_from_sqlite_backend(solver, bank_files, run_main_loop, monkeypatch):
+    monkeypatch.setattr(solver, "QA_BANK_BACKEND", 'SQLITE')
+
+    _, server, questions, _ = run_main_loop(6, unknown_ratio=0.0)
+    assert isinstance(solver.qa_bank_store, solver.SQLiteQABank)
+    assert server.index == len(questions)
+    assert server.stats["submits"] == len(questions)
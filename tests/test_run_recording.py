@@ -0,0 +1,58 @@
+# tests/test_run_recording.py
+"""运行录制与回放：模拟运行录制的归档交给 tools/replay_run.py 重新解析、重新匹配、重新估算提交次数，结果与录制时一致。"""
+import gzip
+import os
+
+import pytest
+
+import replay_run
+
+
+@pytest.fixture
+def recorded_run(run_main_loop, monkeypatch):
+    """录制一次模拟运行，返回 (solver, server, 题目列表, 归档中的事件)。"""
+    import auto_solver_refactored
+    monkeypatch.setattr(auto_solver_refactored, "RECORD_RUN", True)
+    try:
+        solver, server, questions, _ = run_main_loop(3, unknown_ratio=0.5, seed=4, long_page_ratio=0.5)
+        path = solver._run_recorder.path
+    finally:
+        auto_solver_refactored.stop_run_recording()
+    return solver, server, questions, replay_run.load_events(path)
+
+
+def test_recording_covers_the_run_and_survives_truncation(recorded_run):
+    solver, server, questions, events = recorded_run
+    summary = replay_run.summarize_run("run", events)
+
+    assert summary["solved"] == len(questions)
+    assert summary["submits"] == server.stats["submits"]
+    assert summary["clipboard_reads"] == server.stats["clipboard_copies"]
+    assert next(e for e in events if e['kind'] == 'config')["region"] == list(server.region)
+
+    # 运行被强制结束：压缩流和最后一行都不完整，之前的完整事件都能读出
+    with open(os.path.join(solver.SCREENSHOT_RUN_DIR, solver.RUN_RECORDING_FILENAME), 'rb') as f:
+        data = gzip.decompress(f.read())
+    cut = data.rindex(b"\n", 0, len(data) - 1) + 20
+    truncated = os.path.join(solver.SCREENSHOT_RUN_DIR, "truncated.jsonl.gz")
+    with open(truncated, 'wb') as f:
+        f.write(gzip.compress(data[:cut])[:-8])
+    assert replay_run.load_events(truncated) == events[:-1]
+
+
+def test_replay_reproduces_parsing_matching_and_submits(recorded_run):
+    solver, server, questions, events = recorded_run
+
+    parsed = replay_run.replay_parser(events)
+    assert parsed["fragments"] > 0 and parsed["mismatches"] == []
+
+    matched = replay_run.replay_matches(events, replay_run.FrameStore(events), tolerance=3.0)
+    assert matched["matches"] > 0 and matched["skipped"] == 0 and matched["mismatches"] == []
+
+    # 与录制时相同的题库状态：只有题库中的题目，本次运行学到的答案由回放逐题加入
+    solver.qa_bank_index.clear()
+    solver.load_qa_bank()
+    decisions = replay_run.replay_decisions(events)
+    assert [row["q"] for row in decisions] == [q['q_num'] for q in questions]
+    assert all(row["replayed"] == row["recorded"] for row in decisions)
+
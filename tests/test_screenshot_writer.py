@@ -0,0 +1,121 @@
+# tests/test_screenshot_writer.py
+"""截图保存：按 SCREENSHOT_POLICY 决定保存哪些截图，后台线程缩放/编码/写盘，每个目录只保留最新的若干张，队列满时丢弃。"""
+import glob
+import os
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def writer_solver(solver, monkeypatch):
+    """截图计数和后台写入器都是本测试独有的，测试结束时写完并关闭。"""
+    monkeypatch.setitem(solver._screenshot_counter, "count", 0)
+    monkeypatch.setattr(solver, "_screenshot_writer", None)
+    yield solver
+    solver.close_screenshot_writer()
+
+
+def image(value=0):
+    return np.full((40, 60, 3), value, dtype=np.uint8)
+
+
+def saved_files(solver):
+    return sorted(os.path.basename(p) for p in glob.glob(os.path.join(solver.SCREENSHOT_RUN_DIR, "*.[pj]*g")))
+
+
+def save_all(solver, count, important=False):
+    return [solver.save_screenshot(image(i), os.path.join(solver.SCREENSHOT_RUN_DIR, f"shot_{i}.png"), important=important)
+            for i in range(count)]
+
+
+@pytest.mark.parametrize("policy, expected", [
+    ('ALWAYS', ["shot_0.png", "shot_1.png", "shot_2.png", "shot_3.png", "shot_4.png"]),
+    ('EVERY_N', ["shot_0.png", "shot_3.png"]),
+    ('ON_FAILURE', []),
+    ('NEVER', []),
+])
+def test_policy_decides_which_screenshots_are_saved(writer_solver, monkeypatch, policy, expected):
+    solver = writer_solver
+    monkeypatch.setattr(solver, "SCREENSHOT_POLICY", policy)
+    monkeypatch.setattr(solver, "SCREENSHOT_EVERY_N", 3)
+    save_all(solver, 5)
+    solver.close_screenshot_writer()
+
+    assert saved_files(solver) == expected
+    assert solver.run_stats["screenshots_skipped"] == 5 - len(expected)
+
+
+@pytest.mark.parametrize("policy", ['EVERY_N', 'ON_FAILURE'])
+def test_important_screenshots_are_always_saved(writer_solver, monkeypatch, policy):
+    solver = writer_solver
+    monkeypatch.setattr(solver, "SCREENSHOT_POLICY", policy)
+    monkeypatch.setattr(solver, "SCREENSHOT_EVERY_N", 3)
+    save_all(solver, 3, important=True)
+    solver.close_screenshot_writer()
+
+    assert saved_files(solver) == ["shot_0.png", "shot_1.png", "shot_2.png"]
+
+
+def test_scale_and_format_are_applied(writer_solver, monkeypatch):
+    solver = writer_solver
+    monkeypatch.setattr(solver, "SCREENSHOT_SCALE", 0.5)
+    monkeypatch.setattr(solver, "SCREENSHOT_FORMAT", '.jpg')
+    path = solver.save_screenshot(image(), os.path.join(solver.SCREENSHOT_RUN_DIR, "第1题_1_find_submit.png"))
+    solver.close_screenshot_writer()
+
+    assert path.endswith("第1题_1_find_submit.jpg")
+    with open(path, 'rb') as f:
+        written = cv2.imdecode(np.frombuffer(f.read(), dtype=np.uint8), cv2.IMREAD_COLOR)
+    assert written.shape == (20, 30, 3)
+
+
+def test_only_newest_screenshots_are_kept(writer_solver, monkeypatch):
+    solver = writer_solver
+    monkeypatch.setattr(solver, "SCREENSHOT_MAX_FILES_PER_RUN", 2)
+    save_all(solver, 5)
+    solver.close_screenshot_writer()
+
+    assert saved_files(solver) == ["shot_3.png", "shot_4.png"]
+    assert solver.run_stats["screenshots_written"] == 5
+    assert solver.run_stats["screenshots_pruned"] == 3
+
+
+def test_full_queue_drops_instead_of_blocking(writer_solver, monkeypatch):
+    solver = writer_solver
+    release = threading.Event()
+    writing = threading.Event()
+    write = solver.ScreenshotWriter._write
+
+    def slow_write(self, path, img):
+        writing.set()
+        release.wait()
+        write(self, path, img)
+
+    monkeypatch.setattr(solver.ScreenshotWriter, "_write", slow_write)
+    monkeypatch.setattr(solver, "SCREENSHOT_QUEUE_SIZE", 1)
+    paths = [solver.save_screenshot(image(), os.path.join(solver.SCREENSHOT_RUN_DIR, "first.png"))]
+    assert writing.wait(5)  # 后台线程正在写第一张，队列只能再放一张
+    paths += [solver.save_screenshot(image(), os.path.join(solver.SCREENSHOT_RUN_DIR, name))
+              for name in ("second.png", "third.png")]
+    release.set()
+    solver.close_screenshot_writer()
+
+    assert paths[1:] == [os.path.join(solver.SCREENSHOT_RUN_DIR, "second.png"), None]
+    assert solver.run_stats["screenshots_dropped"] == 1
+    assert saved_files(solver) == ["first.png", "second.png"]
+
+
+def test_main_loop_saves_only_failure_screenshots(run_main_loop, monkeypatch):
+    import auto_solver_refactored
+    monkeypatch.setattr(auto_solver_refactored, "SCREENSHOT_POLICY", 'ON_FAILURE')
+    monkeypatch.setitem(auto_solver_refactored._screenshot_counter, "count", 0)
+    solver, server, questions, _ = run_main_loop(4, unknown_ratio=0.5, long_page_ratio=0.5)
+    solver.close_screenshot_writer()
+
+    assert server.index == len(questions)
+    assert solver.run_stats["screenshots_skipped"] > 0
+    # 所有题目都顺利解出，只有遇到终止哨兵时的截图被保存
+    assert saved_files(solver) == [f"第{len(questions) + 1}题_stop_screenshot.png"]
@@ -0,0 +1,36 @@
+# tests/test_search_order.py
+"""多选题遍历顺序：按题库先验排序组合，离线评估时留出整道题，避免其他变种泄露答案。"""
+import report_search_order
+
+
+def multi_variant(options, answer):
+    return {"options": sorted(options), "answer": sorted(answer)}
+
+
+BANK = {
+    "题目一": [multi_variant(["甲", "乙", "丙", "丁"], ["甲", "乙"]),
+            multi_variant(["甲", "乙", "丙", "戊"], ["甲", "乙"])],
+    "题目二": [multi_variant(["子", "丑", "寅", "卯"], ["子", "丑", "寅"])],
+}
+
+
+def test_prior_ranks_frequent_answer_size_first(solver):
+    prior = solver.build_answer_prior({"题目": [multi_variant(["甲", "乙", "丙", "丁"], ["甲", "乙"])] * 5})
+    q_info = {"q_text": "新题", "options": {"A": "子", "B": "丑", "C": "寅", "D": "卯"}}
+    ranked = solver.rank_multi_choice_combinations(q_info, list("ABCD"), prior)
+    assert len(ranked[0][0]) == 2
+
+
+def test_leave_one_out_drops_every_variant_of_the_question(solver, monkeypatch):
+    seen = []
+    build_answer_prior = solver.build_answer_prior
+
+    def record_rest(rest):
+        seen.append(set(rest))
+        return build_answer_prior(rest)
+
+    monkeypatch.setattr(solver, "build_answer_prior", record_rest)
+    results = report_search_order.evaluate(BANK, shuffles=1, seed=0)
+
+    assert len(results) == 3
+    assert seen == [{"题目二"}, {"题目二"}, {"题目一"}]
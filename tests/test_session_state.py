@@ -0,0 +1,59 @@
+# tests/test_session_state.py
+"""已知的选中状态：只对读到它的那道题、那个会话有效；点击后失效，有效时 verify_and_click 跳过点击前的剪贴板读取。"""
+from sim_quiz_backend import SimClock, SimQuizServer
+
+QUESTION = {
+    "q_num": "第1题", "q_type": "多选", "q_text": "第一题", "options": {"A": "甲", "B": "乙", "C": "丙"},
+    "answer": {"A", "C"}, "long_page": False,
+}
+
+
+def test_known_selection_state_is_tied_to_question(solver):
+    solver.remember_selection_state({"q_text": "第一题", "selected_options": ["B"]})
+    assert solver.known_selection_state("第一题") == {"B"}
+    assert solver.known_selection_state("第二题") is None
+
+    solver.invalidate_selection_state()
+    assert solver.known_selection_state("第一题") is None
+
+
+def test_known_selection_state_is_per_session(solver):
+    solver.remember_selection_state({"q_text": "第一题", "selected_options": ["A"]})
+    solver.use_session(solver.SolverSession("other"))
+    assert solver.known_selection_state("第一题") is None
+
+
+def test_verify_and_click_skips_pre_click_read_when_state_is_known(sim_solver):
+    server = SimQuizServer([QUESTION], SimClock())
+    solver = sim_solver(server)
+    options_pos = solver.find_available_options(option_count=3)
+    solver.get_clipboard_data_robust()
+    copies = server.stats["clipboard_copies"]
+
+    assert solver.verify_and_click(["A"], options_pos, "第一题")
+    # 只有点击后的验证读取
+    assert server.stats["clipboard_copies"] == copies + 1
+    assert solver.run_stats["selection_reads_skipped"] == 1
+
+    # 验证读取的结果又成为已知状态：换选项时先取消 A 再选中 C
+    assert solver.verify_and_click(["C"], options_pos, "第一题")
+    assert server.selected == {"C"}
+    assert server.stats["clipboard_copies"] == copies + 2
+    assert solver.run_stats["selection_reads_skipped"] == 2
+
+
+def test_state_from_another_question_is_not_reused(sim_solver):
+    server = SimQuizServer([QUESTION], SimClock())
+    solver = sim_solver(server)
+    options_pos = solver.find_available_options(option_count=3)
+    solver.remember_selection_state({"q_text": "上一题", "selected_options": []})
+
+    assert solver.verify_and_click(["B"], options_pos, "第一题")
+    assert solver.run_stats["selection_reads_skipped"] == 0
+
+
+def test_main_loop_skips_reads_during_traversal(run_main_loop):
+    solver, server, questions, _ = run_main_loop(6, unknown_ratio=1.0, seed=3)
+
+    assert server.index == len(questions)
+    assert solver.run_stats["selection_reads_skipped"] > 0
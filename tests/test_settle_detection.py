@@ -0,0 +1,63 @@
+# tests/test_settle_detection.py
+"""操作后的稳定检测：画面变化并稳定后立即返回，画面一直不变时等满上限，关闭检测时与固定延时相同。"""
+import pytest
+
+from sim_quiz_backend import SimClock, SimQuizServer
+
+QUESTION = {
+    "q_num": "第1题", "q_type": "多选", "q_text": "第一题", "options": {"A": "甲", "B": "乙", "C": "丙"},
+    "answer": {"A", "C"}, "long_page": False,
+}
+
+
+def start(sim_solver, ui_latency):
+    server = SimQuizServer([QUESTION], SimClock(), ui_latency=ui_latency)
+    solver = sim_solver(server)
+    return solver, server, solver.find_available_options(option_count=3)
+
+
+@pytest.mark.parametrize("ui_latency", [0.0, 0.35])
+def test_returns_soon_after_the_page_changes_and_settles(sim_solver, ui_latency):
+    solver, server, options_pos = start(sim_solver, ui_latency)
+    before = solver.capture_settle_view()
+    solver.click_at_region_pos(options_pos["B"])
+    start_time = server.clock.now()
+
+    view = solver.wait_until_settled(2.0, before)
+    elapsed = server.clock.now() - start_time
+    assert server.selected == {"B"}
+    # 变化出现后再等 SETTLE_STABLE_FRAMES 个轮询间隔 (每个间隔还包括截图的时间)
+    assert ui_latency <= elapsed < ui_latency + (solver.SETTLE_STABLE_FRAMES + 2) * solver.SETTLE_POLL_INTERVAL
+    assert not solver.settle_views_differ(view, solver.capture_settle_view())
+    assert solver.run_stats["settle_timeouts"] == 0
+    assert solver.run_stats["settle_saved_seconds"] > 1.0
+
+
+def test_unchanged_page_waits_for_the_full_delay(sim_solver):
+    solver, server, _ = start(sim_solver, 0.0)
+    start_time = server.clock.now()
+
+    solver.wait_until_settled(1.0, solver.capture_settle_view())
+    assert server.clock.now() - start_time >= 1.0
+    assert solver.run_stats["settle_timeouts"] == 1
+
+
+def test_disabled_detection_is_a_fixed_delay(sim_solver, monkeypatch):
+    solver, server, options_pos = start(sim_solver, 0.0)
+    monkeypatch.setattr(solver, "USE_SETTLE_DETECTION", False)
+    solver.click_at_region_pos(options_pos["A"])
+    screenshots = server.stats["screenshots"]
+    start_time = server.clock.now()
+
+    assert solver.wait_until_settled(1.0) is None
+    assert server.clock.now() - start_time == pytest.approx(1.0, abs=0.01)
+    assert server.stats["screenshots"] == screenshots
+    assert solver.run_stats["settle_waits"] == 0
+
+
+def test_main_loop_saves_time_with_slow_ui(run_main_loop):
+    solver, server, questions, _ = run_main_loop(4, unknown_ratio=0.5, seed=5, long_page_ratio=0.5, ui_latency=0.2)
+
+    assert server.index == len(questions)
+    assert solver.run_stats["settle_waits"] > 0
+    assert solver.run_stats["settle_saved_seconds"] > 0
@@ -0,0 +1,187 @@
+# tests/test_solution_journal.py
+"""解题日志的写入/读取，启动时回放尚未合并进主题库的日志，以及 merge_tool 按时间顺序把日志和 solution_map.json 合并为主题库。"""
+import json
+import os
+import time
+
+import pytest
+
+import merge_tool
+
+
+def journal_path(solver):
+    return os.path.join(solver.SCREENSHOT_RUN_DIR, solver.SOLUTION_JOURNAL_FILENAME)
+
+
+def write_journal(path, records, tail=""):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.write(tail)
+
+
+def set_mtime(path, timestamp):
+    os.utime(path, (timestamp, timestamp))
+
+
+def stamp(timestamp):
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))
+
+
+@pytest.fixture
+def replay(solver, tmp_path):
+    """在临时目录中回放日志：主题库 (修改时间可调) 放在 tmp_path 下。"""
+    bank_path = str(tmp_path / "master_qa_bank.json")
+    with open(bank_path, 'w', encoding='utf-8') as f:
+        json.dump({}, f)
+
+    def run():
+        solver.replay_solution_journals(bank_path)
+        solver.build_qa_bank_index()
+        return solver
+    run.bank_path = bank_path
+    return run
+
+
+@pytest.fixture
+def merge_dir(tmp_path, monkeypatch):
+    """在临时目录中运行 merge_tool (它使用相对当前目录的 screenshots/ 和输出文件)。"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def run_merge(**kwargs):
+    merge_tool.merge_qa_banks(max_workers=1, **kwargs)
+    with open(merge_tool.OUTPUT_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def old_run_journal(solver, run_dir="20260101_000000"):
+    return os.path.join(solver.SCREENSHOT_BASE_DIR, run_dir, solver.SOLUTION_JOURNAL_FILENAME)
+
+
+def test_journal_round_trip_skips_truncated_line(solver):
+    solver.append_solution_journal("问题一", {"options": ["甲", "乙"], "answer": ["甲"], "answer_letters": ["A"]})
+    solver.append_solution_journal("问题二", {"options": ["丙", "丁"], "answer": [], "eliminated": [["丙"]]})
+    with open(journal_path(solver), 'a', encoding='utf-8') as f:
+        f.write('{"q_text": "被中断的', )  # 强制中断时最后一行只写了一半
+
+    entries = solver.read_solution_journal(journal_path(solver))
+    assert entries == [
+        ("问题一", {"options": ["甲", "乙"], "answer": ["甲"], "answer_letters": ["A"]}),
+        ("问题二", {"options": ["丙", "丁"], "answer": [], "eliminated": [["丙"]]}),
+    ]
+
+
+def test_interrupted_run_is_replayed_into_index(solver, replay):
+    set_mtime(replay.bank_path, time.time() - 3600)
+    write_journal(old_run_journal(solver), [{"q_text": "问题一", "options": ["甲", "乙"], "answer": ["乙"]}])
+
+    replay()
+    assert solver.lookup_qa_answer("问题一", ["乙", "甲"])[1] == ["乙"]
+
+
+def test_journal_older_than_bank_is_not_replayed(solver, replay):
+    # 主题库是在这次运行之后合并生成的，已经包含了 (可能被更新的运行覆盖过的) 这些答案
+    path = old_run_journal(solver)
+    write_journal(path, [{"q_text": "问题一", "options": ["甲", "乙"], "answer": ["乙"]}])
+    set_mtime(path, time.time() - 3600)
+
+    replay()
+    assert solver.qa_bank == {}
+
+
+def test_journal_in_merge_manifest_is_not_replayed(solver, replay):
+    set_mtime(replay.bank_path, time.time() - 3600)
+    path = old_run_journal(solver)
+    write_journal(path, [{"q_text": "问题一", "options": ["甲", "乙"], "answer": ["乙"]}])
+    stat = os.stat(path)
+    with open(os.path.join(solver.SCREENSHOT_BASE_DIR, solver.MERGE_MANIFEST_FILENAME), 'w', encoding='utf-8') as f:
+        json.dump({path: {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": "-"}}, f)
+
+    replay()
+    assert solver.qa_bank == {}
+
+
+def test_only_records_newer_than_bank_are_replayed(solver, replay):
+    # 题库服务的日志一直在追加：合并之前写入的部分已经在主题库中
+    now = time.time()
+    set_mtime(replay.bank_path, now - 1800)
+    write_journal(old_run_journal(solver, "20260101_000000_bank_server"), [
+        {"q_text": "问题一", "options": ["甲", "乙"], "answer": ["甲"], "time": stamp(now - 3600)},
+        {"q_text": "问题二", "options": ["丙", "丁"], "answer": ["丁"], "time": stamp(now - 60)},
+    ])
+
+    replay()
+    assert list(solver.qa_bank) == ["问题二"]
+
+
+def test_merge_tool_reads_journal_with_solver_reader(solver, tmp_path):
+    path = str(tmp_path / "solution_journal.jsonl")
+    write_journal(path, [
+        {"q_text": "问题一", "options": ["甲", "乙"], "answer": ["甲"]},
+        {"options": ["缺少问题文本"], "answer": ["缺少问题文本"]},
+        {"q_text": "问题二", "options": ["丙", "丁"], "answer": [], "eliminated": [["丙"]]},
+    ], tail="not json\n")
+
+    qa = merge_tool.load_journal_as_qa(path)
+    assert qa == {
+        "问题一": [{"options": ["甲", "乙"], "answer": ["甲"]}],
+        "问题二": [{"options": ["丙", "丁"], "answer": [], "eliminated": [["丙"]]}],
+    }
+
+
+def test_merge_prefers_newer_runs(merge_dir):
+    write_journal("screenshots/20260101_000000/solution_journal.jsonl",
+                  [{"q_text": "问题一", "options": ["甲", "乙"], "answer": ["甲"]}])
+    write_journal("screenshots/20260102_000000/solution_journal.jsonl",
+                  [{"q_text": "问题一", "options": ["乙", "甲"], "answer": ["乙"]}])
+    assert run_merge() == {"问题一": [{"options": ["乙", "甲"], "answer": ["乙"]}]}
+
+
+def test_incremental_merge_rebuilds_when_old_file_changes(merge_dir):
+    write_journal("screenshots/20260101_000000/solution_journal.jsonl",
+                  [{"q_text": "问题一", "options": ["甲", "乙"], "answer": ["甲"]}])
+    write_journal("screenshots/20260102_000000/solution_journal.jsonl",
+                  [{"q_text": "问题一", "options": ["甲", "乙"], "answer": ["乙"]}])
+    run_merge()
+
+    # 旧的运行目录后来又追加了内容，直接合并到现有主题库会用旧答案覆盖新答案
+    write_journal("screenshots/20260101_000000/solution_journal.jsonl", [
+        {"q_text": "问题一", "options": ["甲", "乙"], "answer": ["甲"]},
+        {"q_text": "问题二", "options": ["丙"], "answer": ["丙"]},
+    ])
+    bank = run_merge()
+    assert bank["问题一"] == [{"options": ["甲", "乙"], "answer": ["乙"]}]
+    assert bank["问题二"] == [{"options": ["丙"], "answer": ["丙"]}]
+
+
+def test_incremental_merge_rebuilds_for_earlier_new_file(merge_dir):
+    write_journal("screenshots/20260102_000000/solution_journal.jsonl",
+                  [{"q_text": "问题一", "options": ["甲", "乙"], "answer": ["乙"]}])
+    run_merge()
+
+    # 后来才拷贝进来的、更早的运行目录
+    write_journal("screenshots/20260101_000000/solution_journal.jsonl",
+                  [{"q_text": "问题一", "options": ["甲", "乙"], "answer": ["甲"]}])
+    assert run_merge()["问题一"] == [{"options": ["甲", "乙"], "answer": ["乙"]}]
+
+
+def test_incremental_merge_adds_newer_file_on_top(merge_dir):
+    write_journal("screenshots/20260101_000000/solution_journal.jsonl",
+                  [{"q_text": "问题一", "options": ["甲", "乙"], "answer": ["甲"]}])
+    run_merge()
+    # 清单和它记录的文件一起放在 screenshots/ 下，当前目录只多出主题库
+    assert sorted(os.listdir(merge_dir)) == ["master_qa_bank.json", "screenshots"]
+    with open(os.path.join("screenshots", "merge_manifest.json"), 'r', encoding='utf-8') as f:
+        assert list(json.load(f)) == [os.path.join("screenshots", "20260101_000000", "solution_journal.jsonl")]
+
+    os.makedirs("screenshots/20260102_000000")
+    with open("screenshots/20260102_000000/solution_map.json", 'w', encoding='utf-8') as f:
+        json.dump({"问题二": [{"options": ["丙", "丁"], "answer": ["丁"]}]}, f, ensure_ascii=False)
+    bank = run_merge()
+    assert bank == {
+        "问题一": [{"options": ["甲", "乙"], "answer": ["甲"]}],
+        "问题二": [{"options": ["丙", "丁"], "answer": ["丁"]}],
+    }
@@ -0,0 +1,62 @@
+# tests/test_template_matcher.py
+"""
+内置多尺度匹配器与 airtest Template.match_in 的一致性：在原始比例的截图上找到的选项和提交按钮相同。
+
+单个模板的相似度并不总是一致：airtest 的模板匹配低于阈值时还会回退到 SIFT/BRISK 特征点匹配，
+因此默认仍使用 airtest (USE_TEMPLATE_CACHE = False)。
+"""
+import logging
+
+import pytest
+
+from sim_quiz_backend import SimClock, SimQuizServer
+
+QUESTIONS = [
+    {"q_num": "第1题", "q_type": "单选", "q_text": "两个选项", "options": {"A": "甲", "B": "乙"},
+     "answer": {"A"}, "long_page": False},
+    {"q_num": "第2题", "q_type": "多选", "q_text": "四个选项", "options": {"A": "甲", "B": "乙", "C": "丙", "D": "丁"},
+     "answer": {"B", "D"}, "long_page": False},
+]
+
+
+def find_targets(solver, frame):
+    return solver.find_available_options(frame), solver.match_template(solver.TEMPLATE_SUBMIT, frame)
+
+
+def assert_near(pos, expected):
+    assert pos is not None
+    assert abs(pos[0] - expected[0]) <= 1 and abs(pos[1] - expected[1]) <= 1
+
+
+@pytest.fixture
+def frames(sim_solver, monkeypatch):
+    server = SimQuizServer(QUESTIONS, SimClock())
+    solver = sim_solver(server)
+    # 只比较匹配器本身
+    monkeypatch.setattr(solver, "USE_TEMPLATE_ROI_CACHE", False)
+    monkeypatch.setattr(solver, "USE_OPTION_LAYOUT", False)
+    logging.getLogger("airtest").setLevel(logging.WARNING)
+    result = []
+    for index in range(len(QUESTIONS)):
+        server.index = index
+        result.append(server.render_frame())
+    return solver, result
+
+
+def test_old_matcher_is_the_default(solver):
+    assert solver.USE_TEMPLATE_CACHE is False
+
+
+def test_multiscale_matcher_finds_same_targets_as_airtest(frames, monkeypatch):
+    solver, screens = frames
+    for frame, question in zip(screens, QUESTIONS):
+        monkeypatch.setattr(solver, "USE_TEMPLATE_CACHE", False)
+        expected_options, expected_submit = find_targets(solver, frame)
+        monkeypatch.setattr(solver, "USE_TEMPLATE_CACHE", True)
+        options, submit = find_targets(solver, frame)
+
+        assert sorted(expected_options) == sorted(options) == sorted(question['options'])
+        for letter, pos in expected_options.items():
+            assert_near(options[letter], pos)
+        assert_near(submit, expected_submit)
+    assert solver.template_match_scale == 1.0
@@ -0,0 +1,58 @@
+# tests/test_template_roi_cache.py
+"""模板区域缓存：记住上一次的匹配位置，下次先在附近的小窗口内匹配，目标移动后回退到全图匹配并更新位置。"""
+from sim_quiz_backend import SimClock, SimQuizServer
+
+QUESTION = {
+    "q_num": "第1题", "q_type": "单选", "q_text": "题目", "options": {"A": "甲", "B": "乙"},
+    "answer": {"A"}, "long_page": False,
+}
+LONG_QUESTION = dict(QUESTION, long_page=True)  # 提交按钮需要滚动才能看到
+
+
+def submit_center(server):
+    _, (x1, y1, x2, y2), _ = server._layout(server.current)
+    return (x1 + x2) / 2, (y1 + y2) / 2 - server.scroll_offset
+
+
+def assert_near(pos, expected, tolerance=3):
+    assert pos is not None
+    assert abs(pos[0] - expected[0]) <= tolerance and abs(pos[1] - expected[1]) <= tolerance
+
+
+def test_second_match_uses_cached_window(sim_solver):
+    server = SimQuizServer([QUESTION], SimClock())
+    solver = sim_solver(server)
+    frame = server.render_frame()
+
+    first = solver.match_template(solver.TEMPLATE_SUBMIT, frame)
+    assert_near(first, submit_center(server))
+    assert solver.run_stats["roi_cache_hits"] == 0
+
+    second = solver.match_template(solver.TEMPLATE_SUBMIT, server.render_frame())
+    assert_near(second, first, tolerance=1)
+    assert solver.run_stats["roi_cache_hits"] == 1
+
+
+def test_moved_target_falls_back_to_full_search(sim_solver):
+    server = SimQuizServer([LONG_QUESTION], SimClock())
+    solver = sim_solver(server)
+    server.scroll(600)
+    solver.match_template(solver.TEMPLATE_SUBMIT, server.render_frame())
+
+    misses = solver.run_stats["roi_cache_misses"]
+
+    server.scroll(-150)  # 提交按钮向下移动到小窗口之外
+    moved = solver.match_template(solver.TEMPLATE_SUBMIT, server.render_frame())
+    assert_near(moved, submit_center(server))
+    assert solver.run_stats["roi_cache_misses"] == misses + 1
+    assert solver.run_stats["roi_cache_hits"] == 0
+    assert solver.current_session().template_roi_cache[solver.TEMPLATE_SUBMIT.filename] == moved
+
+
+def test_roi_cache_disabled_always_searches_full_frame(sim_solver, monkeypatch):
+    server = SimQuizServer([QUESTION], SimClock())
+    solver = sim_solver(server)
+    monkeypatch.setattr(solver, "USE_TEMPLATE_ROI_CACHE", False)
+    for _ in range(2):
+        assert_near(solver.match_template(solver.TEMPLATE_SUBMIT, server.render_frame()), submit_center(server))
+    assert solver.run_stats["roi_cache_hits"] == solver.run_stats["roi_cache_misses"] == 0
@@ -0,0 +1,122 @@
+# tools/bench_html_parser.py
+"""
+HTML题目解析器的一致性检查与性能基准测试。
+
+对一组剪贴板HTML片段，分别用快速流式解析器和 BeautifulSoup 解析：
+1. 一致性检查：两者结果必须完全相同，否则列出差异并以非零状态码退出。
+2. 性能对比：报告每个片段的平均解析耗时和加速比。
+
+语料来源：
+- 命令行传入的文件/通配符 (默认 logs/failed_parse_*.html，即主脚本保存的解析失败片段)
+- 由模拟答题后端根据题库生成的合成片段 (--synthetic N)
+
+用法 (在项目根目录下运行)：
+    python tools/bench_html_parser.py
+    python tools/bench_html_parser.py "captures/*.html" --synthetic 200 --repeat 50
+"""
+import os
+import sys
+import glob
+import json
+import time
+import random
+import argparse
+
+from sim_quiz_backend import REPO_ROOT, SimClock, SimQuizServer, build_questions_from_bank
+
+sys.path.insert(0, REPO_ROOT)
+import auto_solver_refactored as solver
+
+
+def load_corpus_files(patterns):
+    """按通配符读取HTML片段文件。"""
+    corpus = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                corpus.append((path, f.read()))
+    return corpus
+
+
+def build_synthetic_corpus(count, seed=0):
+    """用模拟答题后端生成带随机选中状态的HTML片段，并包裹在类似真实剪贴板的页面结构中。"""
+    with open(os.path.join(REPO_ROOT, "master_qa_bank.json"), 'r', encoding='utf-8') as f:
+        bank = json.load(f)
+    rng = random.Random(seed)
+    questions = build_questions_from_bank(bank, count, unknown_ratio=0.0, long_page_ratio=0.0, seed=seed)
+    server = SimQuizServer(questions, SimClock())
+    corpus = []
+    for i, question in enumerate(questions):
+        server.index = i
+        server.selected = {letter for letter in question['options'] if rng.random() < 0.3}
+        html = (
+            '<div class="page"><div class="header"><span>腾讯游戏安全中心</span></div>'
+            + server.render_html()
+            + '<div class="footer"><button class="btn-submit">提交</button></div></div>'
+            + '<!--EndFragment--></body></html>'
+        )
+        corpus.append((f"synthetic#{i + 1}", html))
+    return corpus
+
+
+def check_parity(corpus):
+    """返回两个解析器结果不一致的片段列表。"""
+    mismatches = []
+    for name, html in corpus:
+        fast = solver._parse_html_data_fast(html)
+        reference = solver._parse_html_data_bs4(html)
+        if fast != reference:
+            mismatches.append((name, fast, reference))
+    return mismatches
+
+
+def time_parser(parse_func, corpus, repeat):
+    """返回解析整个语料一遍的平均耗时(秒)。"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for _, html in corpus:
+            parse_func(html)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTML题目解析器一致性检查与性能基准测试")
+    parser.add_argument("patterns", nargs="*", default=[os.path.join("logs", "failed_parse_*.html")],
+                        help="HTML片段文件的通配符")
+    parser.add_argument("--synthetic", type=int, default=100, help="额外生成的合成片段数量")
+    parser.add_argument("--repeat", type=int, default=20, help="计时重复次数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    if not solver.HAS_BS4:
+        print("错误：未安装 beautifulsoup4，无法进行一致性对比。请运行 'pip install beautifulsoup4'。")
+        sys.exit(2)
+
+    corpus = load_corpus_files(args.patterns) + build_synthetic_corpus(args.synthetic, args.seed)
+    print("=============================================")
+    print("==     HTML题目解析器 一致性/性能测试      ==")
+    print("=============================================")
+    print(f"语料: {len(corpus)} 个片段")
+
+    mismatches = check_parity(corpus)
+    if mismatches:
+        print(f"\n❌ 一致性检查失败：{len(mismatches)} 个片段结果不同")
+        for name, fast, reference in mismatches[:10]:
+            print(f"  - {name}\n      快速解析器: {fast}\n      BeautifulSoup: {reference}")
+    else:
+        print("\n✅ 一致性检查通过：所有片段的解析结果完全相同。")
+
+    fast_seconds = time_parser(solver._parse_html_data_fast, corpus, args.repeat)
+    bs4_seconds = time_parser(solver._parse_html_data_bs4, corpus, args.repeat)
+    per_fragment = max(len(corpus), 1)
+    print(f"\n快速解析器:    {fast_seconds / per_fragment * 1e6:8.1f} µs/片段")
+    print(f"BeautifulSoup: {bs4_seconds / per_fragment * 1e6:8.1f} µs/片段")
+    if fast_seconds:
+        print(f"加速比: {bs4_seconds / fast_seconds:.1f}x")
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
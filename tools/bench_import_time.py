@@ -0,0 +1,122 @@
+# tools/bench_import_time.py
+"""
+主脚本导入耗时基准测试 (基于 python -X importtime)。
+
+在一个空的临时目录中启动新的 Python 进程执行 `import auto_solver_refactored`，然后：
+- 解析 -X importtime 的输出，报告主脚本的累计导入耗时以及最慢的若干个模块
+- 检查 pyautogui / airtest / numpy / cv2 / bs4 等重量级依赖没有在导入时被加载
+- 检查导入没有在当前目录下创建 logs/、screenshots/、templates/ 等文件夹
+
+超过耗时预算或发现上述问题时以非零状态码退出，可用于防止启动速度回退。
+
+用法 (在项目根目录下运行)：
+    python tools/bench_import_time.py
+    python tools/bench_import_time.py --repeat 10 --budget-ms 50 --top 15
+"""
+import os
+import sys
+import argparse
+import tempfile
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULE_NAME = "auto_solver_refactored"
+# 这些模块应当延迟到第一次使用时才导入
+HEAVY_MODULES = ["pyautogui", "pyperclip", "airtest", "numpy", "cv2", "bs4", "win32clipboard", "PIL"]
+
+
+def run_import(cwd):
+    """
+    在新进程中导入主脚本。
+
+    Returns:
+        tuple: (模块耗时列表 [(累计微秒, 自身微秒, 模块名)], 已加载的重量级模块列表)
+    """
+    code = (
+        f"import sys; import {MODULE_NAME}; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=cwd, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"导入 {MODULE_NAME} 失败:\n{proc.stderr[-2000:]}")
+
+    timings = []
+    for line in proc.stderr.splitlines():
+        # 格式: "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            timings.append((int(cumulative_us), int(self_us), name.rstrip()))
+        except ValueError:
+            continue
+    heavy = [m for m in proc.stdout.strip().split(",") if m]
+    return timings, heavy
+
+
+def module_subtree(timings, module_name):
+    """
+    返回由 module_name 触发导入的模块 (包括它自己)。
+    -X importtime 先输出子模块再输出父模块，子模块的名字缩进更深。
+    """
+    for index, (_, _, name) in enumerate(timings):
+        if name.strip() == module_name:
+            break
+    else:
+        raise RuntimeError(f"-X importtime 输出中没有找到 {module_name}")
+    level = len(name) - len(name.lstrip())
+    subtree = [timings[index]]
+    for entry in reversed(timings[:index]):
+        if len(entry[2]) - len(entry[2].lstrip()) <= level:
+            break
+        subtree.append(entry)
+    return subtree
+
+
+def main():
+    parser = argparse.ArgumentParser(description="主脚本导入耗时基准测试")
+    parser.add_argument("--repeat", type=int, default=5, help="重复导入次数 (取最小值，减少磁盘缓存等噪声)")
+    parser.add_argument("--top", type=int, default=10, help="列出累计耗时最长的模块数量")
+    parser.add_argument("--budget-ms", type=float, default=100.0, help="主脚本累计导入耗时预算 (毫秒)")
+    args = parser.parse_args()
+
+    best = None
+    with tempfile.TemporaryDirectory(prefix="bench_import_") as temp_dir:
+        for _ in range(max(args.repeat, 1)):
+            timings, heavy = run_import(temp_dir)
+            timings = module_subtree(timings, MODULE_NAME)
+            total_us = timings[0][0]
+            if best is None or total_us < best[0]:
+                best = (total_us, timings, heavy)
+        created = sorted(os.listdir(temp_dir))
+
+    total_us, timings, heavy = best
+    print("=============================================")
+    print("==          主脚本导入耗时基准测试          ==")
+    print("=============================================")
+    print(f"{MODULE_NAME} 累计导入耗时: {total_us / 1000:.1f} ms (最好的一次 / 共 {args.repeat} 次，预算 {args.budget_ms:.0f} ms)")
+    print(f"\n由主脚本触发、累计耗时最长的 {args.top} 个模块:")
+    print(f"{'累计(ms)':>10} {'自身(ms)':>10}  模块")
+    for cumulative_us, self_us, name in sorted(timings, reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>10.2f} {self_us / 1000:>10.2f}  {name}")
+
+    problems = []
+    if total_us / 1000 > args.budget_ms:
+        problems.append(f"导入耗时 {total_us / 1000:.1f} ms 超过预算 {args.budget_ms:.0f} ms")
+    if heavy:
+        problems.append(f"导入时加载了重量级依赖: {', '.join(heavy)}")
+    if created:
+        problems.append(f"导入时在当前目录创建了文件: {', '.join(created)}")
+
+    if problems:
+        print("\n❌ 检查失败：")
+        for problem in problems:
+            print(f"  - {problem}")
+        sys.exit(1)
+    print("\n✅ 检查通过：导入时没有加载重量级依赖，也没有创建任何文件。")
+
+
+if __name__ == "__main__":
+    main()
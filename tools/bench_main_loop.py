@@ -0,0 +1,174 @@
+# tools/bench_main_loop.py
+"""
+main_loop 端到端吞吐基准测试 (基于本地模拟答题后端，可在Linux上运行)。
+
+它使用 sim_quiz_backend 生成 N 道合成题目，驱动主脚本的 main_loop 完整答完，然后报告：
+- 每题耗时 (真实计算耗时 / 含 sleep 的模拟耗时)
+- 每题剪贴板往返次数、模板匹配次数、提交次数
+- 每分钟答题数
+
+用法 (在项目根目录下运行)：
+    python tools/bench_main_loop.py -n 50
+    python tools/bench_main_loop.py -n 50 --unknown-ratio 0.5 --json bench.json
+    python tools/bench_main_loop.py -n 20 --record      # 同时录制本次运行，可用 tools/replay_run.py 回放
+    python tools/bench_main_loop.py -n 50 --screenshots ON_FAILURE
+    python tools/bench_main_loop.py -n 50 --fixed-delays   # 关闭界面稳定检测，与固定延时对比
+"""
+import os
+import json
+import time
+import logging
+import argparse
+import tempfile
+
+from sim_quiz_backend import (
+    REPO_ROOT, SimClock, SimQuizServer,
+    build_questions_from_bank, make_stop_question, load_solver_with_fake_desktop,
+)
+
+
+def run_benchmark(num_questions, unknown_ratio, long_page_ratio, advance_latency, seed, verbose=False, record=False,
+                  screenshot_policy=None, ui_latency=0.0, fixed_delays=False):
+    """运行一次基准测试并返回统计结果字典。"""
+    os.chdir(REPO_ROOT)
+    with open(os.path.join(REPO_ROOT, "master_qa_bank.json"), 'r', encoding='utf-8') as f:
+        bank = json.load(f)
+
+    questions = build_questions_from_bank(bank, num_questions, unknown_ratio, long_page_ratio, seed)
+    questions.append(make_stop_question(num_questions + 1))
+    clock = SimClock()
+    server = SimQuizServer(questions, clock, advance_latency=advance_latency, ui_latency=ui_latency)
+    solver = load_solver_with_fake_desktop(server)
+
+    if not verbose:
+        solver.logger.setLevel(logging.WARNING)
+    run_dir = tempfile.mkdtemp(prefix="bench_main_loop_")
+    solver.SCREENSHOT_RUN_DIR = run_dir
+    solver.LOG_DIR = run_dir
+    solver.STOP_AT_QUESTION_NUM = questions[-1]['q_num']
+    solver.RECORD_RUN = record
+    solver.USE_SETTLE_DETECTION = not fixed_delays
+    if screenshot_policy:
+        solver.SCREENSHOT_POLICY = screenshot_policy
+    if not solver.setup_runtime():
+        raise RuntimeError("选项模板加载失败，无法运行基准测试。")
+    # airtest 在 setup_runtime() 中才被导入，其自带的DEBUG日志会刷屏并拖慢匹配，统一调到WARNING
+    logging.getLogger("airtest").setLevel(logging.WARNING)
+
+    # 统计模板匹配次数 (区域缓存的小窗口匹配和全图匹配各算一次)
+    template_matches = {"count": 0}
+    original_match_once = solver._match_once
+
+    def counting_match_once(template, screen_img, strict=False):
+        template_matches["count"] += 1
+        return original_match_once(template, screen_img, strict)
+
+    solver._match_once = counting_match_once
+
+    solver.load_qa_bank()
+    wall_start = time.perf_counter()
+    sim_start = clock.now()
+    try:
+        solver.main_loop()
+    finally:
+        solver._match_once = original_match_once
+        solver.close_span_log()
+        solver.close_screenshot_writer()
+        recording = solver._run_recorder.path if solver._run_recorder else None
+        solver.stop_run_recording()
+    wall_elapsed = time.perf_counter() - wall_start
+    sim_elapsed = clock.now() - sim_start
+
+    solved = server.index
+    per_q = max(solved, 1)
+    return {
+        "questions": num_questions,
+        "solved": solved,
+        "wall_seconds": wall_elapsed,
+        "sim_seconds": sim_elapsed,
+        "wall_seconds_per_question": wall_elapsed / per_q,
+        "sim_seconds_per_question": sim_elapsed / per_q,
+        "questions_per_minute": 60.0 * solved / sim_elapsed if sim_elapsed else 0.0,
+        "clipboard_round_trips_per_question": server.stats["clipboard_copies"] / per_q,
+        "template_matches_per_question": template_matches["count"] / per_q,
+        "submits_per_question": server.stats["submits"] / per_q,
+        "screenshots_per_question": server.stats["screenshots"] / per_q,
+        "post_submit_wait_seconds_per_question": solver.run_stats["post_submit_wait_seconds"] / per_q,
+        "raw": dict(server.stats, template_matches=template_matches["count"]),
+        "solver_stats": dict(solver.run_stats),
+        "spans_file": solver.SPANS_FILE_PATH if solver.RECORD_TIMING_SPANS else None,
+        "recording": recording,
+    }
+
+
+def print_report(result):
+    print("=============================================")
+    print("==      main_loop 端到端吞吐基准测试       ==")
+    print("=============================================")
+    print(f"题目数: {result['questions']}  (成功解答 {result['solved']})")
+    print(f"总耗时: 真实 {result['wall_seconds']:.2f}s / 模拟 {result['sim_seconds']:.2f}s")
+    print(f"每题耗时 (真实计算):   {result['wall_seconds_per_question']:.3f}s")
+    print(f"每题耗时 (含sleep模拟): {result['sim_seconds_per_question']:.3f}s")
+    print(f"每分钟答题数 (模拟):    {result['questions_per_minute']:.1f}")
+    print(f"每题剪贴板往返: {result['clipboard_round_trips_per_question']:.2f}")
+    print(f"每题模板匹配:   {result['template_matches_per_question']:.2f}")
+    print(f"每题截图:       {result['screenshots_per_question']:.2f}")
+    print(f"每题提交:       {result['submits_per_question']:.2f}")
+    print(f"每题提交后等待: {result['post_submit_wait_seconds_per_question']:.3f}s")
+    stats = result['solver_stats']
+    per_q = max(result['solved'], 1)
+    if stats.get('late_advances') or stats.get('ambiguous_advances'):
+        print(f"慢刷新: 超时后确认答对 {int(stats.get('late_advances', 0))} 次 / 无法确定答案 {int(stats.get('ambiguous_advances', 0))} 次")
+    if stats.get('settle_waits'):
+        print(f"界面稳定检测: {int(stats['settle_waits'])} 次等待 (其中 {int(stats.get('settle_timeouts', 0))} 次等满上限)，"
+              f"比固定延时每题节省 {stats.get('settle_saved_seconds', 0) / per_q:.3f}s，每题额外截图 {stats.get('settle_captures', 0) / per_q:.1f} 张")
+    lookups = stats.get('roi_cache_hits', 0) + stats.get('roi_cache_misses', 0)
+    if lookups:
+        print(f"模板区域缓存命中率: {stats.get('roi_cache_hits', 0) / lookups:.1%} ({int(lookups)} 次查找)")
+    print(f"每题复用截图帧:  {stats.get('captures_avoided', 0) / per_q:.2f}")
+    layout_lookups = sum(stats.get(k, 0) for k in ('layout_hits', 'layout_realigned', 'layout_misses'))
+    if layout_lookups:
+        print(f"选项布局: 直接确认 {int(stats.get('layout_hits', 0))} / 重新对齐 {int(stats.get('layout_realigned', 0))}"
+              f" / 回退完整匹配 {int(stats.get('layout_misses', 0))} (校准 {int(stats.get('layout_calibrations', 0))} 次)")
+    print(f"保存截图: 写入 {int(stats.get('screenshots_written', 0))} / 按策略跳过 {int(stats.get('screenshots_skipped', 0))}"
+          f" / 队列满丢弃 {int(stats.get('screenshots_dropped', 0))} / 超出保留数删除 {int(stats.get('screenshots_pruned', 0))}")
+    if stats.get('selection_reads_skipped'):
+        print(f"每题跳过的点击前剪贴板读取: {stats['selection_reads_skipped'] / per_q:.2f}")
+    if 'pipeline_saved_seconds' in stats:
+        print(f"每题流水线节省:  {stats['pipeline_saved_seconds'] / per_q:.3f}s (估算，等待后台匹配 {stats.get('pipeline_wait_seconds', 0) / per_q:.3f}s)")
+    parses = stats.get('parse_cache_hits', 0) + stats.get('parse_cache_misses', 0)
+    if parses:
+        print(f"解析缓存命中率: {stats.get('parse_cache_hits', 0) / parses:.1%} ({int(parses)} 次解析请求)")
+    if result.get('spans_file'):
+        print(f"阶段计时: {result['spans_file']} (可用 tools/report_spans.py 汇总)")
+    if result.get('recording'):
+        print(f"运行录制: {result['recording']} (可用 tools/replay_run.py 回放)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="main_loop 端到端吞吐基准测试")
+    parser.add_argument("-n", "--num-questions", type=int, default=30, help="合成题目数量")
+    parser.add_argument("--unknown-ratio", type=float, default=0.25, help="题库中不存在的新题比例")
+    parser.add_argument("--long-page-ratio", type=float, default=0.1, help="需要滚动才能找到提交按钮的题目比例")
+    parser.add_argument("--advance-latency", type=float, default=0.3, help="答对后页面切换的延迟(秒)")
+    parser.add_argument("--ui-latency", type=float, default=0.1, help="点击选项、滚动后界面作出反应的延迟(秒)")
+    parser.add_argument("--fixed-delays", action="store_true", help="关闭界面稳定检测 (USE_SETTLE_DETECTION)，使用固定延时")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--json", help="将结果以JSON格式写入此文件")
+    parser.add_argument("-v", "--verbose", action="store_true", help="输出主脚本的INFO日志")
+    parser.add_argument("--record", action="store_true", help="同时录制本次运行 (RECORD_RUN)")
+    parser.add_argument("--screenshots", choices=["ALWAYS", "ON_FAILURE", "EVERY_N", "NEVER"], help="截图保存策略 (SCREENSHOT_POLICY)")
+    args = parser.parse_args()
+
+    result = run_benchmark(args.num_questions, args.unknown_ratio, args.long_page_ratio,
+                           args.advance_latency, args.seed, verbose=args.verbose, record=args.record,
+                           screenshot_policy=args.screenshots, ui_latency=args.ui_latency, fixed_delays=args.fixed_delays)
+    print_report(result)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=4)
+        print(f"\n结果已写入: {os.path.abspath(args.json)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+# tools/bench_multi_session.py
+"""
+多窗口会话基准测试 (基于本地模拟答题后端，可在Linux上运行)。
+
+并排模拟 N 个答题窗口，用主脚本的 run_sessions() 同时驱动它们答完各自的题目，然后报告：
+- 总吞吐 (所有窗口合计的每分钟答题数) 与每个窗口的答题情况
+- 会话让出控制权、重新获得焦点的次数
+- 共享题库的效果：一个窗口解出的新题，在其他窗口直接由题库命中的次数
+- 焦点检查：每个窗口收到的 Ctrl+C 是否都来自它自己的会话线程 (否则说明键盘焦点没有切换正确)
+
+所有窗口使用同一批题目 (顺序各不相同)，因此一个窗口遍历解出的新题，其他窗口之后遇到时可以直接命中题库。
+用 --sessions 1 运行可以得到单窗口的对照结果。
+
+用法 (在项目根目录下运行)：
+    python tools/bench_multi_session.py --sessions 3 -n 20
+    python tools/bench_multi_session.py --sessions 1 -n 20
+"""
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import tempfile
+
+from sim_quiz_backend import (
+    REPO_ROOT, PAGE_WIDTH, VIEWPORT_HEIGHT, SimClock, SimQuizServer,
+    build_questions_from_bank, make_stop_question, load_solver_with_fake_desktop,
+)
+
+
+def build_session_questions(bank, num_sessions, num_questions, unknown_ratio, long_page_ratio, seed):
+    """为每个窗口生成同一批题目的不同排列，题号按各自的顺序重新编号。"""
+    base = build_questions_from_bank(bank, num_questions, unknown_ratio, long_page_ratio, seed)
+    per_session = []
+    for k in range(num_sessions):
+        questions = [dict(q) for q in base]
+        random.Random(seed * 1000 + k).shuffle(questions)
+        for i, question in enumerate(questions):
+            question["q_num"] = f"第{i + 1}题"
+        questions.append(make_stop_question(num_questions + 1))
+        per_session.append(questions)
+    return per_session
+
+
+def run_benchmark(num_sessions, num_questions, unknown_ratio, long_page_ratio, advance_latency, seed, verbose=False):
+    """运行一次多窗口基准测试并返回统计结果字典。"""
+    os.chdir(REPO_ROOT)
+    with open(os.path.join(REPO_ROOT, "master_qa_bank.json"), 'r', encoding='utf-8') as f:
+        bank = json.load(f)
+
+    clock = SimClock()
+    servers = [
+        SimQuizServer(questions, clock, advance_latency=advance_latency,
+                      region=(k * PAGE_WIDTH, 0, PAGE_WIDTH, VIEWPORT_HEIGHT))
+        for k, questions in enumerate(build_session_questions(bank, num_sessions, num_questions,
+                                                              unknown_ratio, long_page_ratio, seed))
+    ]
+    solver = load_solver_with_fake_desktop(servers)
+
+    if not verbose:
+        solver.logger.setLevel(logging.WARNING)
+    run_dir = tempfile.mkdtemp(prefix="bench_multi_session_")
+    solver.SCREENSHOT_RUN_DIR = run_dir
+    solver.LOG_DIR = run_dir
+    solver.REPLAY_SOLUTION_JOURNALS = False
+    solver.INITIAL_VALIDATION_DELAY = 0.0
+    solver.STOP_AT_QUESTION_NUM = servers[0].questions[-1]['q_num']
+    if not solver.setup_runtime():
+        raise RuntimeError("选项模板加载失败，无法运行基准测试。")
+    logging.getLogger("airtest").setLevel(logging.WARNING)
+    solver.load_qa_bank()
+
+    # 统计题库命中的来源：启动时题库里没有、由其他窗口在本次运行中解出的题目
+    initial_questions = {solver.normalize_text(q) for q in bank}
+    learned_hits = {"count": 0}
+    original_solve_with_qa_bank = solver.solve_with_qa_bank
+
+    def counting_solve_with_qa_bank(q_info, options_pos, submit_pos):
+        result = original_solve_with_qa_bank(q_info, options_pos, submit_pos)
+        if result != 'FALLBACK' and solver.normalize_text(q_info['q_text']) not in initial_questions:
+            learned_hits["count"] += 1
+        return result
+
+    solver.solve_with_qa_bank = counting_solve_with_qa_bank
+    wall_start = time.perf_counter()
+    sim_start = clock.now()
+    try:
+        solver.run_sessions([server.region for server in servers])
+    finally:
+        solver.solve_with_qa_bank = original_solve_with_qa_bank
+        solver.close_span_log()
+        solver.close_screenshot_writer()
+    wall_elapsed = time.perf_counter() - wall_start
+    sim_elapsed = clock.now() - sim_start
+
+    sessions = []
+    misdirected = 0
+    for k, server in enumerate(servers):
+        own_thread = f"session-S{k + 1}"
+        wrong = sum(count for name, count in server.copy_threads.items() if name != own_thread)
+        misdirected += wrong
+        sessions.append({
+            "session": f"S{k + 1}",
+            "solved": server.index,
+            "submits": server.stats["submits"],
+            "clipboard_copies": server.stats["clipboard_copies"],
+            "misdirected_copies": wrong,
+        })
+    solved = sum(s["solved"] for s in sessions)
+    stats = dict(solver.run_stats)
+    return {
+        "sessions": num_sessions,
+        "questions_per_session": num_questions,
+        "solved": solved,
+        "wall_seconds": wall_elapsed,
+        "sim_seconds": sim_elapsed,
+        "questions_per_minute": 60.0 * solved / sim_elapsed if sim_elapsed else 0.0,
+        "submits_per_question": sum(s["submits"] for s in sessions) / max(solved, 1),
+        "learned_bank_hits": learned_hits["count"],
+        "session_yields": stats.get("session_yields", 0),
+        "focus_clicks": stats.get("session_focus_clicks", 0),
+        "misdirected_copies": misdirected,
+        "per_session": sessions,
+        "solver_stats": stats,
+    }
+
+
+def print_report(result):
+    print("=============================================")
+    print("==         多窗口会话端到端基准测试        ==")
+    print("=============================================")
+    print(f"窗口数: {result['sessions']}  每个窗口 {result['questions_per_session']} 题  (合计成功解答 {result['solved']})")
+    print(f"总耗时: 真实 {result['wall_seconds']:.2f}s / 模拟 {result['sim_seconds']:.2f}s")
+    print(f"合计每分钟答题数 (模拟): {result['questions_per_minute']:.1f}")
+    print(f"每题提交:               {result['submits_per_question']:.2f}")
+    print(f"由其他窗口解出后命中题库: {result['learned_bank_hits']} 题")
+    print(f"让出控制权: {int(result['session_yields'])} 次, 重新获得焦点点击: {int(result['focus_clicks'])} 次")
+    print(f"\n{'会话':<6}{'解答':>6}{'提交':>6}{'剪贴板':>8}{'焦点错误':>10}")
+    for s in result['per_session']:
+        print(f"{s['session']:<6}{s['solved']:>6}{s['submits']:>6}{s['clipboard_copies']:>8}{s['misdirected_copies']:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多窗口会话端到端基准测试")
+    parser.add_argument("--sessions", type=int, default=3, help="模拟的答题窗口数量")
+    parser.add_argument("-n", "--num-questions", type=int, default=20, help="每个窗口的题目数量")
+    parser.add_argument("--unknown-ratio", type=float, default=0.5, help="题库中不存在的新题比例")
+    parser.add_argument("--long-page-ratio", type=float, default=0.1, help="需要滚动才能找到提交按钮的题目比例")
+    parser.add_argument("--advance-latency", type=float, default=0.3, help="答对后页面切换的延迟(秒)")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--json", help="将结果以JSON格式写入此文件")
+    parser.add_argument("-v", "--verbose", action="store_true", help="输出主脚本的INFO日志")
+    args = parser.parse_args()
+
+    result = run_benchmark(args.sessions, args.num_questions, args.unknown_ratio, args.long_page_ratio,
+                           args.advance_latency, args.seed, verbose=args.verbose)
+    print_report(result)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=4)
+        print(f"\n结果已写入: {os.path.abspath(args.json)}")
+
+    expected = result['sessions'] * result['questions_per_session']
+    if result['misdirected_copies'] or result['solved'] < expected:
+        print(f"\n❌ 检查失败：解答 {result['solved']}/{expected} 题，焦点错误 {result['misdirected_copies']} 次。")
+        sys.exit(1)
+    print("\n✅ 检查通过：所有窗口答完全部题目，键盘操作都发给了正确的窗口。")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+# tools/bench_qa_bank_server.py
+"""
+题库服务压力测试：在子进程中启动 tools/qa_bank_server.py，用许多并发客户端同时查询和提交答案。
+
+每个客户端 (主脚本的 QABankClient，各自一条请求连接和一条订阅连接) 在独立线程中：
+- 执行 --lookups 次查询 (一半命中题库，一半是不存在的变种)
+- 提交 --learns 条新答案
+然后报告：
+- 查询/提交的吞吐与 p50/p95/p99 延迟
+- 推送是否送达：每条新答案应推送给提交者以外的所有客户端
+- 学到的答案是否都被批量写入了服务的解题日志，以及写盘批次数
+- 回退检查：服务停止后，客户端请求失败并回调 on_disconnect
+
+用法 (在项目根目录下运行)：
+    python tools/bench_qa_bank_server.py
+    python tools/bench_qa_bank_server.py --clients 64 --lookups 500 --learns 20
+"""
+import os
+import re
+import sys
+import json
+import math
+import time
+import random
+import logging
+import argparse
+import tempfile
+import threading
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+import auto_solver_refactored as solver
+
+
+def percentile(sorted_values, q):
+    """最近秩法百分位数。"""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(q / 100.0 * len(sorted_values))
+    return sorted_values[min(len(sorted_values), max(rank, 1)) - 1]
+
+
+def start_server(bank_path, journal_dir, flush_seconds, flush_count):
+    """在 journal_dir 中启动题库服务子进程，返回 (进程, 端口)。"""
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(REPO_ROOT, "tools", "qa_bank_server.py"), "--port", "0", "--no-replay", "--bank", bank_path,
+         "--journal-dir", journal_dir, "--flush-seconds", str(flush_seconds), "--flush-count", str(flush_count)],
+        cwd=journal_dir, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        env=dict(os.environ, PYTHONIOENCODING="utf-8"),
+    )
+    for line in proc.stdout:
+        match = re.search(r"监听 .*:(\d+)$", line.strip())
+        if match:
+            return proc, int(match.group(1))
+    raise RuntimeError("题库服务启动失败。")
+
+
+def build_queries(bank, count, seed):
+    """随机抽取查询键：一半命中题库，一半是不存在的变种。"""
+    rng = random.Random(seed)
+    items = [(q, v['options']) for q, variants in bank.items() for v in variants]
+    queries = []
+    for i in range(count):
+        q_text, options = rng.choice(items)
+        if i % 2:
+            options = list(options[:-1]) + ["不存在的选项"]
+        queries.append(solver.make_qa_key(q_text, options))
+    return queries
+
+
+def run_client(index, address, queries, learns, barrier, results):
+    pushes = []
+    client = solver.QABankClient(address, timeout=5.0, on_learned=lambda q_text, entry: pushes.append(q_text))
+    client.subscribe()
+    barrier.wait()  # 所有客户端都订阅后再开始，保证每条推送都有完整的接收者
+    lookup_latencies, learn_latencies, hits = [], [], 0
+    for key in queries:
+        start = time.perf_counter()
+        answer = client.lookup(key)
+        lookup_latencies.append(time.perf_counter() - start)
+        hits += answer is not None
+    for k in range(learns):
+        entry = {"options": [f"压测选项{index}-{k}-{j}" for j in range(4)], "answer": [f"压测选项{index}-{k}-0"]}
+        start = time.perf_counter()
+        client.learn(f"压测新题 客户端{index} 第{k}题", entry)
+        learn_latencies.append(time.perf_counter() - start)
+    results[index] = {"client": client, "pushes": pushes, "lookups": lookup_latencies, "learns": learn_latencies, "hits": hits}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="题库服务并发压力测试")
+    parser.add_argument("--clients", type=int, default=32, help="并发客户端数量")
+    parser.add_argument("--lookups", type=int, default=300, help="每个客户端的查询次数")
+    parser.add_argument("--learns", type=int, default=10, help="每个客户端提交的新答案数")
+    parser.add_argument("--flush-seconds", type=float, default=0.5, help="服务批量写盘的最长间隔 (秒)")
+    parser.add_argument("--flush-count", type=int, default=50, help="服务攒够多少条答案时立即写盘")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    # 回退检查会让客户端输出一条"请求失败"的警告，压测时不需要
+    solver.logger.setLevel(logging.ERROR)
+    bank_path = os.path.join(REPO_ROOT, "master_qa_bank.json")
+    with open(bank_path, 'r', encoding='utf-8') as f:
+        bank = json.load(f)
+    # 服务在临时目录中运行 (日志和解题日志都写在这里)，读取仓库中的题库
+    journal_dir = tempfile.mkdtemp(prefix="bench_qa_bank_server_")
+    proc, port = start_server(bank_path, journal_dir, args.flush_seconds, args.flush_count)
+    address = ("127.0.0.1", port)
+    try:
+        probe = solver.QABankClient(address)
+        if not probe.request({"op": "stats"}):
+            raise RuntimeError("题库服务没有应答。")
+
+        results = [None] * args.clients
+        barrier = threading.Barrier(args.clients)
+        threads = [threading.Thread(target=run_client,
+                                    args=(i, address, build_queries(bank, args.lookups, args.seed + i), args.learns, barrier, results))
+                   for i in range(args.clients)]
+        wall_start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - wall_start
+
+        expected_pushes = args.learns * (args.clients - 1)
+        deadline = time.time() + 5.0
+        while time.time() < deadline and any(len(r["pushes"]) < expected_pushes for r in results):
+            time.sleep(0.05)
+        time.sleep(args.flush_seconds * 2)
+        stats = probe.request({"op": "stats"})
+        probe.request({"op": "shutdown"})
+        proc.wait(timeout=10)
+
+        # 服务停止后，客户端请求应失败并回调 on_disconnect
+        disconnected = threading.Event()
+        client = results[0]["client"]
+        client.on_disconnect = disconnected.set
+        fallback_ok = client.lookup(build_queries(bank, 1, 0)[0]) is None and disconnected.is_set()
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+
+    journal_path = os.path.join(journal_dir, solver.SOLUTION_JOURNAL_FILENAME)
+    journal_lines = 0
+    if os.path.exists(journal_path):
+        with open(journal_path, 'r', encoding='utf-8') as f:
+            journal_lines = sum(1 for _ in f)
+
+    lookups = sorted(x for r in results for x in r["lookups"])
+    learns = sorted(x for r in results for x in r["learns"])
+    pushes = [len(r["pushes"]) for r in results]
+    total_learns = args.clients * args.learns
+    print("=============================================")
+    print("==           题库服务并发压力测试          ==")
+    print("=============================================")
+    print(f"客户端: {args.clients}  每个客户端查询 {args.lookups} 次、提交 {args.learns} 条  (题库 {bank_path})")
+    print(f"总耗时: {wall:.2f}s  吞吐: {(len(lookups) + len(learns)) / wall:.0f} 请求/秒")
+    print(f"{'请求':<8}{'次数':>8}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}")
+    for name, values in (("lookup", lookups), ("learn", learns)):
+        print(f"{name:<8}{len(values):>8}{percentile(values, 50) * 1000:>10.2f}{percentile(values, 95) * 1000:>10.2f}"
+              f"{percentile(values, 99) * 1000:>10.2f}")
+    print(f"查询命中: {sum(r['hits'] for r in results)}/{len(lookups)}")
+    print(f"推送: 每个客户端应收到 {expected_pushes} 条，实际最少 {min(pushes)} / 最多 {max(pushes)}")
+    print(f"写盘: {journal_lines}/{total_learns} 条答案写入解题日志，共 {stats['flushes']} 批")
+    print(f"服务停止后客户端回退: {'正常' if fallback_ok else '异常'}")
+
+    problems = []
+    if min(pushes) < expected_pushes:
+        problems.append("部分推送没有送达")
+    if journal_lines != total_learns:
+        problems.append("部分学到的答案没有写入解题日志")
+    if not fallback_ok:
+        problems.append("服务停止后客户端没有回退")
+    if problems:
+        print("\n❌ 检查失败：" + "；".join(problems))
+        sys.exit(1)
+    print("\n✅ 检查通过：推送全部送达，答案全部批量写盘，服务停止后客户端正确回退。")
+
+
+if __name__ == "__main__":
+    main()
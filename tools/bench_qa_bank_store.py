@@ -0,0 +1,120 @@
+# tools/bench_qa_bank_store.py
+"""
+题库存储后端基准测试：JSON (全部读入内存) 与 SQLite (按需查询) 的启动耗时、内存和查询延迟对比。
+
+对每个规模 (默认 1k / 10k / 100k 个变种) 生成合成题库，分别写成 JSON 和 SQLite，然后：
+- 启动：调用主脚本的 load_qa_bank()，记录耗时与 Python 内存峰值 (tracemalloc)
+- 查询：对随机的命中/未命中题目调用 lookup_qa_answer()，记录平均延迟
+
+用法 (在项目根目录下运行)：
+    python tools/bench_qa_bank_store.py
+    python tools/bench_qa_bank_store.py --sizes 1000 10000 --lookups 5000
+"""
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import tempfile
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+import auto_solver_refactored as solver
+
+
+def build_synthetic_bank(num_variants, seed=0):
+    """生成合成题库：每个问题 1~3 个变种，每个变种 4 个选项。"""
+    rng = random.Random(seed)
+    bank = {}
+    count = 0
+    q_index = 0
+    while count < num_variants:
+        q_index += 1
+        q_text = f"合成题目{q_index}：以下哪个说法是正确的？"
+        variants = []
+        for v in range(min(rng.randint(1, 3), num_variants - count)):
+            options = sorted(f"选项{q_index}-{v}-{k}" for k in range(4))
+            answer = rng.sample(options, rng.choice([1, 1, 1, 2, 3]))
+            variants.append({"options": options, "answer": answer})
+            count += 1
+        bank[q_text] = variants
+    return bank
+
+
+def sample_queries(bank, count, seed=0):
+    """随机抽取查询：一半命中题库，一半是不存在的变种。"""
+    rng = random.Random(seed)
+    items = [(q, v['options']) for q, variants in bank.items() for v in variants]
+    queries = []
+    for i in range(count):
+        q_text, options = rng.choice(items)
+        if i % 2:
+            options = options[:3] + ["不存在的选项"]
+        queries.append((q_text, list(reversed(options))))
+    return queries
+
+
+def measure_backend(backend, json_path, db_path, queries):
+    """用指定后端执行 load_qa_bank 和查询，返回 (启动秒数, 内存峰值MB, 每次查询微秒数, 命中数)。"""
+    solver.QA_BANK_BACKEND = backend
+    solver.QA_BANK_FILE = json_path
+    solver.QA_BANK_DB_FILE = db_path
+    solver.qa_bank_store = None
+    # 先释放上一次测试留下的内存索引，避免其回收耗时计入本次启动
+    solver.qa_bank = {}
+    solver.qa_bank_index.clear()
+    solver.qa_bank_questions.clear()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    solver.load_qa_bank()
+    startup = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    hits = sum(1 for q_text, options in queries if solver.lookup_qa_answer(q_text, options)[1] is not None)
+    lookup = (time.perf_counter() - start) / len(queries)
+
+    if solver.qa_bank_store is not None:
+        solver.qa_bank_store.close()
+        solver.qa_bank_store = None
+    return startup, peak / 1e6, lookup * 1e6, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="题库存储后端 (JSON / SQLite) 基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="合成题库的变种数量")
+    parser.add_argument("--lookups", type=int, default=2000, help="每个规模执行的查询次数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    solver.logger.setLevel(logging.WARNING)
+    solver.REPLAY_SOLUTION_JOURNALS = False
+
+    print("=============================================")
+    print("==     题库存储后端 JSON / SQLite 对比      ==")
+    print("=============================================")
+    print(f"{'变种数':>8} {'后端':<7} {'启动(ms)':>10} {'内存峰值(MB)':>13} {'查询(µs)':>10} {'命中':>7}")
+    with tempfile.TemporaryDirectory(prefix="bench_qa_bank_") as temp_dir:
+        for size in args.sizes:
+            bank = build_synthetic_bank(size, args.seed)
+            json_path = os.path.join(temp_dir, f"bank_{size}.json")
+            db_path = os.path.join(temp_dir, f"bank_{size}.db")
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump(bank, f, ensure_ascii=False)
+            store = solver.SQLiteQABank(db_path)
+            store.import_json(bank)
+            store.close()
+            queries = sample_queries(bank, args.lookups, args.seed)
+
+            for backend in ("JSON", "SQLITE"):
+                startup, peak_mb, lookup_us, hits = measure_backend(backend, json_path, db_path, queries)
+                print(f"{size:>8} {backend:<7} {startup * 1000:>10.1f} {peak_mb:>13.1f} {lookup_us:>10.1f} {hits:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# tools/bench_template_matcher.py
+"""
+模板匹配器基准测试：airtest Template.match_in 与内置的预处理缓存 + 多尺度匹配器对比。
+
+用模拟答题后端渲染若干题目截图，再整体缩放到不同比例 (模拟 Windows 缩放/DPI 变化)，
+对每个比例开启一个新的"会话"，像 find_available_options 一样查找 A~D 选项标识，报告：
+- 识别率：找到的选项字母正确、且中心点落在真实图标附近的比例
+- 第一帧耗时 (多尺度匹配器需要在这一帧确定缩放比例) 与后续每帧平均耗时
+
+为了只比较匹配器本身，测试时关闭了模板区域缓存 (USE_TEMPLATE_ROI_CACHE)。
+
+用法 (在项目根目录下运行)：
+    python tools/bench_template_matcher.py
+    python tools/bench_template_matcher.py --scales 0.8 1.0 1.25 1.5 --frames 10
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+
+import cv2
+
+from sim_quiz_backend import (
+    REPO_ROOT, OPTION_ICON_X, OPTION_ROW_HEIGHT, SimClock, SimQuizServer, build_questions_from_bank,
+)
+
+sys.path.insert(0, REPO_ROOT)
+import auto_solver_refactored as solver
+
+
+def build_frames(count, seed=0):
+    """渲染 count 道题目的截图，返回 [(BGR图像, {字母: 图标中心坐标})]。"""
+    with open(os.path.join(REPO_ROOT, "master_qa_bank.json"), 'r', encoding='utf-8') as f:
+        bank = json.load(f)
+    questions = build_questions_from_bank(bank, count, unknown_ratio=0.0, long_page_ratio=0.0, seed=seed)
+    server = SimQuizServer(questions, SimClock())
+    frames = []
+    for i, question in enumerate(questions):
+        server.index = i
+        rows, _, _ = server._layout(question)
+        expected = {}
+        for letter, (_, y1, _, _) in rows.items():
+            ih, iw = server.icons[letter].shape[:2]
+            expected[letter] = (OPTION_ICON_X + iw / 2, y1 + (OPTION_ROW_HEIGHT - ih) // 2 + ih / 2)
+        frames.append((server.render_frame(), expected))
+    return frames
+
+
+def find_options(frame):
+    """与 find_available_options 相同的查找逻辑，但直接使用给定的截图。"""
+    available = {}
+    for name, template_list in sorted(solver.TEMPLATE_OPTIONS.items()):
+        for template in template_list:
+            pos = solver.match_template(template, frame)
+            if pos:
+                available[name] = pos
+                break
+    return available
+
+
+def run_session(frames, scale, use_cache, tolerance):
+    """
+    以新会话在按 scale 缩放后的截图上查找选项。
+
+    Returns:
+        tuple: (识别正确的选项数, 选项总数, 第一帧耗时秒, 后续每帧平均耗时秒, 确定的缩放比例)
+    """
+    solver.USE_TEMPLATE_CACHE = use_cache
+    solver.reset_template_scale()
+    correct = total = 0
+    durations = []
+    for frame, expected in frames:
+        scaled = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+        start = time.perf_counter()
+        found = find_options(scaled)
+        durations.append(time.perf_counter() - start)
+        for letter, (x, y) in expected.items():
+            total += 1
+            pos = found.get(letter)
+            if pos and abs(pos[0] - x * scale) <= tolerance * scale and abs(pos[1] - y * scale) <= tolerance * scale:
+                correct += 1
+    rest = durations[1:] or durations
+    return correct, total, durations[0], sum(rest) / len(rest), solver.template_match_scale
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模板匹配器 (airtest / 多尺度缓存匹配器) 基准测试")
+    parser.add_argument("--scales", type=float, nargs="+", default=[0.75, 1.0, 1.25, 1.5], help="截图整体缩放比例")
+    parser.add_argument("--frames", type=int, default=6, help="每个比例使用的截图数量")
+    parser.add_argument("--tolerance", type=float, default=8.0, help="判定坐标正确的最大偏差 (原始像素)")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    os.chdir(REPO_ROOT)
+    solver.logger.setLevel(logging.WARNING)
+    solver.USE_TEMPLATE_ROI_CACHE = False
+    solver.TEMPLATE_OPTIONS = solver.load_option_templates(solver.TEMPLATES_DIR, threshold=solver.SIMILARITY_THRESHOLD_OPTION)
+    # airtest 在加载模板时才被导入，其自带的DEBUG日志会刷屏并拖慢匹配
+    logging.getLogger("airtest").setLevel(logging.WARNING)
+    if not solver.TEMPLATE_OPTIONS:
+        print("错误：选项模板加载失败，请检查 templates/ 目录。")
+        sys.exit(2)
+    frames = build_frames(args.frames, args.seed)
+
+    print("=============================================")
+    print("==     模板匹配器 airtest / 多尺度缓存      ==")
+    print("=============================================")
+    print(f"每个比例 {len(frames)} 帧，截图尺寸 {frames[0][0].shape[1]}x{frames[0][0].shape[0]} (缩放前)")
+    print(f"\n{'比例':>6} {'匹配器':<10} {'识别率':>8} {'第一帧(ms)':>11} {'后续每帧(ms)':>13} {'确定的比例':>10}")
+    for scale in args.scales:
+        for name, use_cache in (("airtest", False), ("multiscale", True)):
+            correct, total, first, per_frame, locked = run_session(frames, scale, use_cache, args.tolerance)
+            locked_text = f"{locked:.3f}" if use_cache and locked is not None else "-"
+            print(f"{scale:>6.2f} {name:<10} {correct / total:>8.1%} {first * 1000:>11.1f} {per_frame * 1000:>13.1f} {locked_text:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,16 @@
 # tools/merge_tool.py
 import os
+import sys
 import json
 import time
+import hashlib
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+from auto_solver_refactored import normalize_option, merge_variant_records, read_solution_journal
 
 # --- 配置 ---
 # 源目录：存放所有按时间戳生成的截图和题库文件夹
@@ -10,9 +19,23 @@ SOURCE_DIRECTORY = "screenshots"
 OUTPUT_FILE = "master_qa_bank.json"
 # 单个题库文件的标准名称
 SOLUTION_MAP_FILENAME = "solution_map.json"
+# 解题日志文件名。异常中断的运行只有日志、没有 solution_map.json，此时改为合并日志。
+SOLUTION_JOURNAL_FILENAME = "solution_journal.jsonl"
+# 增量合并清单：记录已合并文件的路径、大小、修改时间和哈希，下次只加载新增或变化的文件。
+# 与它记录的文件一起放在源目录下 (主脚本启动回放日志时也会读取它，见 MERGE_MANIFEST_FILENAME)
+MANIFEST_FILE = os.path.join(SOURCE_DIRECTORY, "merge_manifest.json")
+# 旧版本写在当前目录下的清单，新位置还没有清单时读取一次
+LEGACY_MANIFEST_FILE = "merge_manifest.json"
+# 并行加载文件的进程数 (None 表示使用CPU核数)
+MAX_WORKERS = None
 # --- 配置结束 ---
 
 
+def variant_options_key(variant):
+    """变种的唯一键：规范化后的选项排序元组，与主脚本查找题库时的选项键一致。"""
+    return tuple(sorted(normalize_option(opt) for opt in variant['options']))
+
+
 def deep_merge_qa(master_qa, new_qa):
     """
     智能地深度合并两个题库。
@@ -26,96 +49,237 @@ def deep_merge_qa(master_qa, new_qa):
             continue
 
         # 如果问题已存在，则需要合并变种列表
-        # 使用一个字典来快速查找和更新变种，键是选项列表的元组形式
-        # 注意：我们假设选项在生成时已经被排序
-        master_variants_map = {tuple(v['options']): v for v in master_qa[q_text]}
+        # 使用一个字典来快速查找和更新变种，键是规范化选项的排序元组
+        # (图片选项只比较文件名，同一张图片换了CDN域名或防缓存参数仍视为同一个变种)
+        master_variants_map = {variant_options_key(v): v for v in master_qa[q_text]}
 
         for variant in new_variants:
-            # 将新变种的选项列表转为元组，作为唯一的键
-            variant_key = tuple(variant['options'])
-            # 新的变种会直接覆盖旧的，实现了“新答案覆盖旧答案”
-            master_variants_map[variant_key] = variant
+            variant_key = variant_options_key(variant)
+            old_variant = master_variants_map.get(variant_key)
+            # 有答案的新变种直接覆盖旧的，实现了“新答案覆盖旧答案”；
+            # 还没有答案的变种只记录了排除的错误组合，与旧记录合并 (规则见 merge_variant_records)
+            master_variants_map[variant_key] = merge_variant_records(old_variant, variant) if old_variant else variant
 
         # 将合并后的变种字典转换回列表
         master_qa[q_text] = list(master_variants_map.values())
 
 
-def merge_qa_banks():
+def load_journal_as_qa(file_path):
+    """
+    将解题日志 (每行一条JSON) 转换为题库格式。
+    使用主脚本回放日志时的同一个读取函数 (read_solution_journal)，被中断写入的不完整行和缺少字段的行都会被跳过。
+    """
+    qa = {}
+    for q_text, variant in read_solution_journal(file_path):
+        deep_merge_qa(qa, {q_text: [variant]})
+    return qa
+
+
+def file_sha256(file_path):
+    """计算文件内容的SHA-256哈希。"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_solution_file(file_path):
+    """
+    加载一个 solution_map.json 或解题日志，并计算其哈希。在子进程中执行。
+
+    Returns:
+        tuple: (文件路径, 哈希, 题库数据或None, 错误信息或None)
+    """
+    try:
+        sha256 = file_sha256(file_path)
+        if file_path.endswith(SOLUTION_JOURNAL_FILENAME):
+            data = load_journal_as_qa(file_path)
+        else:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        return file_path, sha256, data, None
+    except json.JSONDecodeError:
+        return file_path, None, None, "不是有效的JSON格式，已跳过。"
+    except Exception as e:
+        return file_path, None, None, f"处理时发生错误: {e}"
+
+
+def load_solution_files(file_paths, max_workers=MAX_WORKERS):
+    """并行加载多个题库文件，返回 load_solution_file 的结果列表，顺序与 file_paths 相同。"""
+    if len(file_paths) > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(load_solution_file, file_paths))
+    return [load_solution_file(path) for path in file_paths]
+
+
+def load_json_or_default(file_path, default):
+    """读取JSON文件，文件不存在时返回 default。"""
+    if not os.path.exists(file_path):
+        return default
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def atomic_write_json(data, file_path, indent=4):
+    """先写入同目录下的临时文件，再通过重命名原子地替换目标文件，避免写到一半时中断导致文件损坏。"""
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, temp_path = tempfile.mkstemp(prefix=".merge_", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def scan_solution_files():
+    """按时间戳(目录名)顺序查找所有题库文件；只有日志没有 solution_map.json 的目录使用日志。"""
+    files_to_merge = []
+    for root, dirs, files in os.walk(SOURCE_DIRECTORY):
+        # 按时间戳(目录名)排序，确保旧的文件夹先被处理
+        dirs.sort()
+        if SOLUTION_MAP_FILENAME in files:
+            files_to_merge.append(os.path.join(root, SOLUTION_MAP_FILENAME))
+        elif SOLUTION_JOURNAL_FILENAME in files:
+            files_to_merge.append(os.path.join(root, SOLUTION_JOURNAL_FILENAME))
+    return files_to_merge
+
+
+def merge_qa_banks(full_rebuild=False, max_workers=MAX_WORKERS):
     """
     主函数，扫描、加载、合并并保存题库。
+
+    - 增量模式 (默认)：从现有主题库出发，只加载清单中没有记录或内容已变化的文件。
+      如果已合并过的文件内容变化了，或者新文件比已合并的文件更早 (按时间戳目录排序)，
+      直接合并到现有主题库会让旧答案覆盖新答案，此时自动改为完全重建。
+    - 完全重建 (full_rebuild=True)：忽略清单和现有主题库，从空题库开始按时间顺序合并全部文件。
     """
     print("=============================================")
     print("==   智能题库合并工具 (Smart QA Merge)   ==")
     print("=============================================")
     print(f"源目录: {os.path.abspath(SOURCE_DIRECTORY)}")
     print(f"输出文件: {os.path.abspath(OUTPUT_FILE)}")
+    print(f"模式: {'完全重建' if full_rebuild else '增量合并'}")
 
     if not os.path.isdir(SOURCE_DIRECTORY):
         print(f"\n错误：源目录 '{SOURCE_DIRECTORY}' 不存在。请检查路径配置。")
         return
 
-    # 1. 自动扫描并按时间排序查找所有题库文件
-    print(f"\n[步骤 1/3] 正在扫描 '{SOLUTION_MAP_FILENAME}' 文件...")
-    files_to_merge = []
-    for root, dirs, files in os.walk(SOURCE_DIRECTORY):
-        # 按时间戳(目录名)排序，确保旧的文件夹先被处理
-        dirs.sort()
-        if SOLUTION_MAP_FILENAME in files:
-            file_path = os.path.join(root, SOLUTION_MAP_FILENAME)
-            files_to_merge.append(file_path)
-            
-    if not files_to_merge:
-        print("\n未找到任何可合并的题库文件。")
-        return
+    timings = {}
+
+    # 1. 扫描题库文件，并与清单对比找出新增/变化的文件
+    phase_start = time.perf_counter()
+    print(f"\n[步骤 1/4] 正在扫描 '{SOLUTION_MAP_FILENAME}' / '{SOLUTION_JOURNAL_FILENAME}' 文件...")
+    all_files = scan_solution_files()
+    manifest = {} if full_rebuild else load_json_or_default(MANIFEST_FILE, None)
+    if manifest is None:
+        manifest = load_json_or_default(LEGACY_MANIFEST_FILE, {})
+    files_to_load = []
+    file_stats = {}
+    for file_path in all_files:
+        stat = os.stat(file_path)
+        file_stats[file_path] = {"size": stat.st_size, "mtime": stat.st_mtime}
+        record = manifest.get(file_path)
+        if record and record["size"] == stat.st_size and record["mtime"] == stat.st_mtime:
+            continue
+        files_to_load.append(file_path)
+    timings["扫描"] = time.perf_counter() - phase_start
 
-    print(f"\n成功找到 {len(files_to_merge)} 个题库文件，将按时间顺序合并：")
-    for file in files_to_merge:
+    print(f"共找到 {len(all_files)} 个题库文件，其中 {len(files_to_load)} 个需要加载：")
+    for file in files_to_load:
         print(f"  - {file}")
+    if not files_to_load:
+        print("\n没有新增或变化的题库文件，主题库已是最新。")
+        return
+
+    # 2. 并行加载新文件
+    phase_start = time.perf_counter()
+    print(f"\n[步骤 2/4] 正在并行加载 {len(files_to_load)} 个文件...")
+    loaded = load_solution_files(files_to_load, max_workers)
+
+    if not full_rebuild:
+        # 已合并过的文件内容变化，或新文件排在已合并的文件之前时，无法保持"新答案覆盖旧答案"的时间顺序
+        merged_positions = [i for i, path in enumerate(all_files) if path in manifest]
+        last_merged = max(merged_positions, default=-1)
+        changed = [path for path, sha256, _, error in loaded
+                   if not error and path in manifest and manifest[path].get("sha256") != sha256]
+        to_load = set(files_to_load)
+        earlier = [path for i, path in enumerate(all_files)
+                   if path in to_load and path not in manifest and i < last_merged]
+        if changed or earlier:
+            for path in changed:
+                print(f"  - 已合并过的文件 '{path}' 内容发生了变化")
+            for path in earlier:
+                print(f"  - 新文件 '{path}' 比已合并的文件更早")
+            print("  为保持按时间顺序合并，改为完全重建。")
+            full_rebuild = True
+            manifest = {}
+            loaded_paths = {item[0] for item in loaded}
+            rest = [path for path in all_files if path not in loaded_paths]
+            by_path = {item[0]: item for item in loaded + load_solution_files(rest, max_workers)}
+            loaded = [by_path[path] for path in all_files]
+    timings["加载"] = time.perf_counter() - phase_start
+
+    # 3. 按时间顺序深度合并到主题库
+    phase_start = time.perf_counter()
+    print(f"\n[步骤 3/4] 正在深度合并题库...")
+    merged_qa_bank = {} if full_rebuild else load_json_or_default(OUTPUT_FILE, {})
+    merged_files = 0
+    for file_path, sha256, data, error in loaded:
+        if error:
+            print(f"  - 警告：文件 '{file_path}' {error}")
+            continue
+        old_record = manifest.get(file_path)
+        manifest[file_path] = dict(file_stats[file_path], sha256=sha256)
+        if not full_rebuild and old_record and old_record.get("sha256") == sha256:
+            print(f"  - 文件 '{file_path}' 仅修改时间变化，内容未变，已跳过。")
+            continue
+        if not data: # 跳过空文件
+            print(f"  - 警告：文件 '{file_path}' 为空，已跳过。")
+            continue
+
+        # 计算本次加载的变种数量
+        num_variants_in_file = sum(len(variants) for variants in data.values())
+        # 执行深度合并
+        deep_merge_qa(merged_qa_bank, data)
+        merged_files += 1
+        print(f"  - 已从 '{file_path}' 加载并合并 {len(data)} 个问题，共 {num_variants_in_file} 个变种。")
+    timings["合并"] = time.perf_counter() - phase_start
 
-    # 2. 深度合并
-    print(f"\n[步骤 2/3] 正在加载和深度合并题库...")
-    merged_qa_bank = {}
-    total_variants_loaded = 0
-    
-    for file_path in files_to_merge:
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                if not data: # 跳过空文件
-                    print(f"  - 警告：文件 '{file_path}' 为空，已跳过。")
-                    continue
-                
-                # 计算本次加载的变种数量
-                num_variants_in_file = sum(len(variants) for variants in data.values())
-                total_variants_loaded += num_variants_in_file
-                
-                # 执行深度合并
-                deep_merge_qa(merged_qa_bank, data)
-                
-                print(f"  - 已从 '{file_path}' 加载并合并 {len(data)} 个问题，共 {num_variants_in_file} 个变种。")
-        except json.JSONDecodeError:
-            print(f"  - 警告：文件 '{file_path}' 不是有效的JSON格式，已跳过。")
-        except Exception as e:
-            print(f"  - 错误：处理文件 '{file_path}' 时发生错误: {e}")
-
-    # 3. 保存最终的主题库
-    print(f"\n[步骤 3/3] 正在生成主主题库文件...")
-    
     final_question_count = len(merged_qa_bank)
     final_variant_count = sum(len(v) for v in merged_qa_bank.values())
-
     print(f"合并完成！")
-    print(f"  - 总共处理了 {len(files_to_merge)} 个文件。")
+    print(f"  - 本次合并了 {merged_files} 个文件。")
     print(f"  - 最终题库包含 {final_question_count} 个独立问题。")
     print(f"  - 共计 {final_variant_count} 个问题变种（问题+选项组合）。")
 
+    # 4. 原子地保存主题库和清单
+    phase_start = time.perf_counter()
+    print(f"\n[步骤 4/4] 正在生成主主题库文件...")
     try:
-        with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-            json.dump(merged_qa_bank, f, ensure_ascii=False, indent=4)
-        print(f"\n✅ 成功生成主主题库文件: {os.path.abspath(OUTPUT_FILE)}")
+        if merged_files:
+            atomic_write_json(merged_qa_bank, OUTPUT_FILE)
+            print(f"\n✅ 成功生成主主题库文件: {os.path.abspath(OUTPUT_FILE)}")
+        else:
+            print("\n题库内容没有变化，仅更新合并清单。")
+        atomic_write_json(manifest, MANIFEST_FILE, indent=2)
     except Exception as e:
         print(f"\n❌ 错误：写入主主题库文件时失败: {e}")
+    timings["写入"] = time.perf_counter() - phase_start
+
+    print("\n各阶段耗时：")
+    for phase, seconds in timings.items():
+        print(f"  - {phase}: {seconds * 1000:.1f} ms")
 
 
 if __name__ == "__main__":
-    merge_qa_banks()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="智能题库合并工具")
+    parser.add_argument("--full", action="store_true", help="忽略合并清单和现有主题库，从头完全重建")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="并行加载文件的进程数")
+    args = parser.parse_args()
+    merge_qa_banks(full_rebuild=args.full, max_workers=args.workers)
@@ -0,0 +1,260 @@
+# tools/qa_bank_server.py
+"""
+本机题库服务：让同时运行的多个答题脚本共用一份题库。
+
+主脚本设置 QA_BANK_BACKEND = 'SERVER' 后会连接本服务 (地址见 QA_BANK_SERVER_ADDRESS)：
+- 查询：按 (规范化问题, 规范化选项集) 精确查找答案，以及多选题先验统计
+- 学习：脚本解出新题 (或在遍历中排除了错误的组合) 后提交给服务，服务立即加入索引，并推送给其他已连接的脚本
+- 写盘：新答案先放入队列，每隔 --flush-seconds 秒 (或攒够 --flush-count 条) 批量追加到服务自己的解题日志，
+  日志位于 screenshots/<时间戳>_bank_server/solution_journal.jsonl，主脚本启动时的日志回放和 merge_tool.py 都会读取它
+
+服务不在运行时，主脚本自动回退到本地 JSON 题库，不影响答题。
+协议为本机TCP上每行一个JSON (Windows 上没有 Unix socket，因此使用 127.0.0.1)。
+
+用法 (在项目根目录下运行)：
+    python tools/qa_bank_server.py
+    python tools/qa_bank_server.py --port 8765 --backend SQLITE --flush-seconds 2
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import socketserver
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+import auto_solver_refactored as solver
+
+
+class JournalWriter:
+    """把学到的答案攒成批，定期追加到解题日志 (SQLite 后端同时批量写入数据库)。"""
+
+    def __init__(self, journal_path, flush_seconds, flush_count):
+        self.journal_path = journal_path
+        self.flush_seconds = flush_seconds
+        self.flush_count = flush_count
+        self.pending = []
+        self.flushes = 0
+        self.written = 0
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="journal_writer", daemon=True)
+        self._thread.start()
+
+    def add(self, q_text, entry):
+        with self._cond:
+            self.pending.append((q_text, entry))
+            if len(self.pending) >= self.flush_count:
+                self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._stopped and len(self.pending) < self.flush_count:
+                    self._cond.wait(self.flush_seconds)
+                batch, self.pending = self.pending, []
+                stopped = self._stopped
+            if batch:
+                self._write(batch)
+            if stopped:
+                return
+
+    def _write(self, batch):
+        os.makedirs(os.path.dirname(self.journal_path), exist_ok=True)
+        stamp = time.strftime('%Y-%m-%d %H:%M:%S')
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            for q_text, entry in batch:
+                f.write(json.dumps(dict(entry, q_text=q_text, time=stamp), ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        if solver.qa_bank_store is not None:
+            with BankServer.bank_lock:
+                solver.qa_bank_store.conn.commit()
+        self.flushes += 1
+        self.written += len(batch)
+
+    def close(self):
+        """写出剩余的答案并停止写盘线程。"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join()
+
+
+class BankRequestHandler(socketserver.StreamRequestHandler):
+    """处理一个客户端连接：逐行读取请求并应答；subscribe 之后这条连接只用于推送。"""
+
+    def setup(self):
+        super().setup()
+        # 多个连接线程可能同时向同一个订阅者推送，一条消息的写入和刷新必须连续完成，否则消息会交错
+        self.write_lock = threading.Lock()
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                self._send({"ok": False, "error": "无法解析的请求"})
+                continue
+            if message.get("op") == "subscribe":
+                self.server.add_subscriber(self, message.get("client"))
+                # 订阅连接不再处理请求，保持打开直到客户端断开
+                self.rfile.read()
+                break
+            try:
+                reply = self.server.dispatch(message)
+            except Exception as e:
+                reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            self._send(reply)
+        self.server.remove_subscriber(self)
+
+    def _send(self, message):
+        self.send_bytes(json.dumps(message, ensure_ascii=False).encode('utf-8') + b"\n")
+
+    def send_bytes(self, data):
+        """向这条连接写入一条完整的消息。"""
+        with self.write_lock:
+            self.wfile.write(data)
+            self.wfile.flush()
+
+
+class BankServer(socketserver.ThreadingTCPServer):
+    """题库服务：每个连接一个线程，题库的读写由 bank_lock 串行化。"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+    bank_lock = threading.Lock()
+
+    def __init__(self, address, writer):
+        super().__init__(address, BankRequestHandler)
+        self.writer = writer
+        self.subscribers = {}  # 订阅连接的处理器 -> 客户端ID
+        self.subscribers_lock = threading.Lock()
+        self.stats = {"lookups": 0, "hits": 0, "learned": 0, "pushes": 0}
+        self.pushes_lock = threading.Lock()  # 推送在各个连接线程中进行，不在 bank_lock 之内
+
+    def add_subscriber(self, handler, client_id):
+        with self.subscribers_lock:
+            self.subscribers[handler] = client_id
+
+    def remove_subscriber(self, handler):
+        with self.subscribers_lock:
+            self.subscribers.pop(handler, None)
+
+    def broadcast(self, message, exclude_client=None):
+        """把消息推送给所有订阅者 (提交者自己除外)，写入失败的订阅者会被移除。"""
+        data = json.dumps(message, ensure_ascii=False).encode('utf-8') + b"\n"
+        with self.subscribers_lock:
+            targets = [(h, c) for h, c in self.subscribers.items() if c is None or c != exclude_client]
+        for handler, _ in targets:
+            try:
+                handler.send_bytes(data)
+            except OSError:
+                self.remove_subscriber(handler)
+                continue
+            with self.pushes_lock:
+                self.stats["pushes"] += 1
+
+    def dispatch(self, message):
+        op = message.get("op")
+        if op == "lookup":
+            key = (message["q_norm"], frozenset(message["options"]))
+            with self.bank_lock:
+                answer = solver.qa_bank_index.get(key)
+                if answer is None and solver.qa_bank_store is not None:
+                    answer = solver.qa_bank_store.lookup(key)
+                self.stats["lookups"] += 1
+                self.stats["hits"] += answer is not None
+            return {"ok": True, "answer": answer}
+        if op == "eliminated":
+            key = (message["q_norm"], frozenset(message["options"]))
+            with self.bank_lock:
+                combos = [sorted(combo) for combo in solver.qa_bank_eliminated.get(key, ())]
+                if solver.qa_bank_store is not None:
+                    combos.extend(solver.qa_bank_store.eliminated(key))
+            return {"ok": True, "eliminated": combos}
+        if op == "has_question":
+            with self.bank_lock:
+                return {"ok": True, "exists": solver.qa_bank_has_question(message["q_norm"])}
+        if op == "learn":
+            q_text, entry = message["q_text"], message["entry"]
+            variant = {"options": sorted(entry["options"]), "answer": entry["answer"]}
+            if entry.get("answer_letters"):
+                variant["answer_letters"] = entry["answer_letters"]
+            if entry.get("eliminated"):
+                variant["eliminated"] = entry["eliminated"]
+            with self.bank_lock:
+                solver.index_variant(q_text, variant)
+                if solver.qa_bank_store is not None:
+                    solver.qa_bank_store.upsert(q_text, variant, commit=False)
+                else:
+                    solver.merge_variant_into_bank(solver.qa_bank, q_text, variant)
+                self.stats["learned"] += 1
+            self.writer.add(q_text, variant)
+            self.broadcast({"event": "learned", "q_text": q_text, "entry": variant}, exclude_client=message.get("client"))
+            return {"ok": True}
+        if op == "prior":
+            with self.bank_lock:
+                prior = solver.answer_prior
+                return {"ok": True, "size_counts": dict(prior.get("size_counts", {})),
+                        "position_counts": dict(prior.get("position_counts", {})),
+                        "position_questions": prior.get("position_questions", 0)}
+        if op == "option_count":
+            if message["field"] not in ("text_answer_counts", "text_option_counts"):
+                return {"ok": False, "error": f"未知的统计字段: {message['field']}"}
+            with self.bank_lock:
+                return {"ok": True, "count": solver.answer_prior[message["field"]][message["text"]]}
+        if op == "stats":
+            with self.subscribers_lock:
+                subscribers = len(self.subscribers)
+            return {"ok": True, "subscribers": subscribers, "variants": len(solver.qa_bank_index),
+                    "pending": len(self.writer.pending), "flushes": self.writer.flushes,
+                    "written": self.writer.written, **self.stats}
+        if op == "shutdown":
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {"ok": True}
+        return {"ok": False, "error": f"未知的请求: {op}"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本机题库服务：多个答题脚本共用一份题库并互相推送新答案")
+    parser.add_argument("--host", default=solver.QA_BANK_SERVER_ADDRESS[0], help="监听地址 (默认只监听本机)")
+    parser.add_argument("--port", type=int, default=solver.QA_BANK_SERVER_ADDRESS[1], help="监听端口 (0 表示自动选择)")
+    parser.add_argument("--backend", choices=["JSON", "SQLITE"], default="JSON", help="服务端使用的题库存储后端")
+    parser.add_argument("--bank", default=solver.QA_BANK_FILE, help="JSON 题库文件")
+    parser.add_argument("--db", default=solver.QA_BANK_DB_FILE, help="SQLite 题库文件")
+    parser.add_argument("--journal-dir", default=os.path.join(solver.SCREENSHOT_BASE_DIR, f"{solver.RUN_TIMESTAMP}_bank_server"),
+                        help="保存学到的答案的目录 (其中的 solution_journal.jsonl 会被主脚本回放、被 merge_tool 合并)")
+    parser.add_argument("--flush-seconds", type=float, default=2.0, help="批量写盘的最长间隔 (秒)")
+    parser.add_argument("--flush-count", type=int, default=50, help="攒够多少条答案时立即写盘")
+    parser.add_argument("--no-replay", action="store_true", help="启动时不回放以往运行的解题日志")
+    args = parser.parse_args()
+
+    solver.setup_logging()
+    solver.QA_BANK_BACKEND = args.backend
+    solver.QA_BANK_FILE = args.bank
+    solver.QA_BANK_DB_FILE = args.db
+    solver.REPLAY_SOLUTION_JOURNALS = not args.no_replay
+    solver.SCREENSHOT_RUN_DIR = args.journal_dir  # 回放日志时跳过服务自己的日志
+    solver.load_qa_bank()
+
+    writer = JournalWriter(os.path.join(args.journal_dir, solver.SOLUTION_JOURNAL_FILENAME), args.flush_seconds, args.flush_count)
+    server = BankServer((args.host, args.port), writer)
+    host, port = server.server_address[:2]
+    print(f"✅ 题库服务已启动，监听 {host}:{port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        writer.close()
+        if solver.qa_bank_store is not None:
+            solver.qa_bank_store.close()
+        print(f"题库服务已停止。本次共学到 {server.stats['learned']} 条答案，分 {writer.flushes} 批写入 '{writer.journal_path}'。", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# tools/qa_bank_sqlite.py
+"""
+JSON 题库与 SQLite 题库之间的导入/导出工具。
+
+主脚本设置 QA_BANK_BACKEND = 'SQLITE' 时使用 SQLite 题库，按需查询，不必在启动时读入整个题库。
+
+用法 (在项目根目录下运行)：
+    # 把 master_qa_bank.json 合并导入 master_qa_bank.db (已存在的相同变种会被覆盖)
+    python tools/qa_bank_sqlite.py import
+    python tools/qa_bank_sqlite.py import --json other_bank.json --db master_qa_bank.db
+
+    # 把 SQLite 题库导出为 JSON (格式与 master_qa_bank.json 相同)
+    python tools/qa_bank_sqlite.py export --json exported_bank.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+import auto_solver_refactored as solver
+
+
+def import_json_to_sqlite(json_path, db_path):
+    with open(json_path, 'r', encoding='utf-8') as f:
+        bank = json.load(f)
+    start = time.perf_counter()
+    store = solver.SQLiteQABank(db_path)
+    try:
+        count = store.import_json(bank)
+        total = store.count_variants()
+    finally:
+        store.close()
+    print(f"✅ 已从 '{json_path}' 导入 {count} 个变种到 '{db_path}' (数据库现有 {total} 个变种)，"
+          f"耗时 {time.perf_counter() - start:.2f}s。")
+
+
+def export_sqlite_to_json(db_path, json_path):
+    if not os.path.exists(db_path):
+        print(f"❌ 错误：SQLite题库 '{db_path}' 不存在。")
+        return
+    store = solver.SQLiteQABank(db_path)
+    try:
+        bank = store.export_json()
+    finally:
+        store.close()
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(bank, f, ensure_ascii=False, indent=4)
+    print(f"✅ 已从 '{db_path}' 导出 {len(bank)} 个问题、{sum(len(v) for v in bank.values())} 个变种到 '{json_path}'。")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON 题库与 SQLite 题库之间的导入/导出工具")
+    parser.add_argument("command", choices=["import", "export"], help="import: JSON -> SQLite; export: SQLite -> JSON")
+    parser.add_argument("--json", default=solver.QA_BANK_FILE, help="JSON 题库文件")
+    parser.add_argument("--db", default=solver.QA_BANK_DB_FILE, help="SQLite 题库文件")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        import_json_to_sqlite(args.json, args.db)
+    else:
+        export_sqlite_to_json(args.db, args.json)
+
+
+if __name__ == "__main__":
+    main()
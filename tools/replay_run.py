@@ -0,0 +1,267 @@
+# tools/replay_run.py
+"""
+运行录制回放：在没有桌面的环境中，把主脚本录制的归档重新交给当前版本的解析器、模板匹配器和解题逻辑。
+
+主脚本在 RECORD_RUN = True 时 (或 tools/bench_main_loop.py --record) 会把剪贴板HTML、截图帧、模板匹配结果、
+点击/滚动和提交结果录制到 screenshots/<时间戳>/run_recording.jsonl.gz。本工具读取一个或多个归档，报告：
+- 总览：运行时长、各类事件数、点击/滚动/提交次数
+- 解析：每个剪贴板片段按录制顺序用当前的解析器 (含解析缓存) 重新解析，与录制时的解析结果比较，并对比耗时
+- 匹配：每次模板匹配按录制顺序在录制的帧上重做 (区域缓存和缩放比例的状态与录制时一样逐步建立)，
+  比较找到的位置，并对比耗时
+- 解题：按录制顺序，对每道解出的题目用当前的题库查找和遍历顺序估算需要的提交次数，与录制时实际的提交次数比较。
+  估算时每解出一题就把答案加入索引，与真实运行一致。归档中的答案已经合并进题库时，请用 --no-bank 或 --bank 指定当时的题库。
+
+模拟后端 (bench_main_loop.py --record) 录制的归档中，流水线后台线程的匹配耗时包含了主线程同时进行的虚拟 sleep，
+录制时的匹配耗时会明显偏大；对比匹配器性能时请以真实运行的录制为准。
+
+用法 (在项目根目录下运行)：
+    python tools/replay_run.py screenshots/20250101_120000/run_recording.jsonl.gz
+    python tools/replay_run.py "screenshots/2025*/run_recording.jsonl.gz" --no-bank --json replay.json
+"""
+import os
+import sys
+import glob
+import gzip
+import json
+import time
+import base64
+import logging
+import argparse
+from collections import Counter
+
+import cv2
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+import auto_solver_refactored as solver
+
+PARSED_FIELDS = ("q_num", "q_type", "q_text", "options", "selected_options")
+
+
+def load_events(path):
+    """读取归档中的事件。运行被强制结束时最后一段压缩流可能不完整，之前的完整行都会保留。"""
+    events = []
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        try:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    break
+        except (EOFError, OSError):
+            pass
+    return events
+
+
+class FrameStore:
+    """按帧编号解码归档中的截图，只缓存最近一帧 (同一帧上的多次匹配连续出现)。"""
+
+    def __init__(self, events):
+        self.data = {e['id']: e['data'] for e in events if e['kind'] == 'frame' and 'data' in e}
+        self._last = (None, None)
+
+    def get(self, frame_id):
+        if frame_id not in self.data:
+            return None
+        if self._last[0] != frame_id:
+            buffer = np.frombuffer(base64.b64decode(self.data[frame_id]), dtype=np.uint8)
+            self._last = (frame_id, cv2.imdecode(buffer, cv2.IMREAD_COLOR))
+        return self._last[1]
+
+
+def summarize_run(path, events):
+    kinds = Counter(e['kind'] for e in events)
+    config = next((e for e in events if e['kind'] == 'config'), {})
+    return {
+        "path": path,
+        "run": config.get("run"),
+        "duration": events[-1]['t'] if events else 0.0,
+        "events": len(events),
+        "frames": sum(1 for e in events if e['kind'] == 'frame' and 'data' in e),
+        "frames_dropped": sum(1 for e in events if e['kind'] == 'frame' and e.get('dropped')),
+        "clicks": kinds['click'],
+        "scrolls": kinds['scroll'],
+        "clipboard_reads": kinds['clipboard'],
+        "submits": kinds['submit_result'],
+        "solved": kinds['solved'],
+    }
+
+
+def replay_parser(events):
+    """用当前的解析器 (含解析缓存) 重新解析每个剪贴板片段，返回比较结果。"""
+    solver._parse_cache.clear()
+    result = {"fragments": 0, "recorded_seconds": 0.0, "replay_seconds": 0.0, "mismatches": []}
+    for event in events:
+        if event['kind'] != 'clipboard' or not event.get('html'):
+            continue
+        start = time.perf_counter()
+        parsed, _ = solver._parse_html_data_cached(event['html'])
+        result["replay_seconds"] += time.perf_counter() - start
+        result["recorded_seconds"] += event.get('parse_dur', 0.0)
+        result["fragments"] += 1
+        recorded = event.get('parsed')
+        if (parsed is None) != (recorded is None) or (
+                parsed and any(parsed[k] != recorded.get(k) for k in PARSED_FIELDS)):
+            result["mismatches"].append({"t": event['t'], "q": event.get('q'),
+                                         "recorded": recorded, "replayed": parsed})
+    return result
+
+
+def replay_matches(events, frames, tolerance):
+    """在录制的帧上按原来的顺序重做每次模板匹配，返回比较结果。"""
+    templates = {os.path.basename(t.filename): t
+                 for t in [solver.TEMPLATE_SUBMIT] + [t for ts in solver.TEMPLATE_OPTIONS.values() for t in ts]}
+    solver.reset_template_scale()
+    sessions = {}
+    result = {"matches": 0, "skipped": 0, "recorded_seconds": 0.0, "replay_seconds": 0.0, "mismatches": []}
+    for event in events:
+        if event['kind'] != 'match':
+            continue
+        template = templates.get(event['template'])
+        image = frames.get(event['frame']) if event.get('frame') is not None else None
+        if template is None or image is None:
+            # 模板已被删除/改名，或帧超过了归档大小上限没有保存
+            result["skipped"] += 1
+            continue
+        solver.use_session(sessions.setdefault(event['session'], solver.SolverSession(event['session'])))
+        start = time.perf_counter()
+        pos = solver.match_template(template, image)
+        result["replay_seconds"] += time.perf_counter() - start
+        result["recorded_seconds"] += event.get('dur', 0.0)
+        result["matches"] += 1
+        recorded = event.get('pos')
+        same = (pos is None and recorded is None) or (
+            pos is not None and recorded is not None
+            and abs(pos[0] - recorded[0]) <= tolerance and abs(pos[1] - recorded[1]) <= tolerance)
+        if not same:
+            result["mismatches"].append({"t": event['t'], "q": event.get('q'), "template": event['template'],
+                                         "recorded": recorded, "replayed": [float(pos[0]), float(pos[1])] if pos else None})
+    solver.use_session(None)
+    return result
+
+
+def estimate_submits(q_info, answer_letters):
+    """
+    用当前的题库查找和遍历顺序，估算解出这道题需要的提交次数。
+
+    Returns:
+        tuple: (提交次数或None, 解题方式)。正确答案不在候选组合中时提交次数为None。
+    """
+    _, answer = solver.lookup_qa_answer(q_info['q_text'], q_info['options'].values())
+    bank_submits = 0
+    if answer is not None:
+        if sorted(solver.map_answers_to_letters(q_info, answer)) == answer_letters:
+            return 1, "题库"
+        bank_submits = 1  # 题库答案错误，提交一次后回退到遍历模式
+    option_letters = sorted(q_info['options'])
+    if q_info['q_type'] == "单选题":
+        candidates = solver.skip_eliminated_combos(q_info, [[letter] for letter in option_letters])
+    else:
+        candidates = solver.multi_choice_candidates(q_info, option_letters)
+    if answer_letters not in candidates:
+        return None, "无法复现"
+    return bank_submits + candidates.index(answer_letters) + 1, "遍历"
+
+
+def replay_decisions(events):
+    """对每道解出的题目估算当前逻辑需要的提交次数，与录制时实际的提交次数比较。"""
+    recorded_submits = Counter((e['session'], e.get('q')) for e in events if e['kind'] == 'submit_result')
+    rows = []
+    for event in events:
+        if event['kind'] != 'solved':
+            continue
+        q_info = event['q_info']
+        estimated, mode = estimate_submits(q_info, sorted(event['answer_letters']))
+        rows.append({"q": q_info['q_num'], "session": event['session'], "q_type": q_info['q_type'], "mode": mode,
+                     "recorded": recorded_submits[(event['session'], event.get('q'))], "replayed": estimated})
+        solver.add_to_qa_bank_index(q_info['q_text'], sorted(q_info['options'].values()), event['answer'])
+    return rows
+
+
+def print_report(runs, parser_result, match_result, decisions, max_rows):
+    print("=============================================")
+    print("==              运行录制回放               ==")
+    print("=============================================")
+    print(f"{'运行':<17}{'时长(s)':>9}{'事件':>8}{'帧':>6}{'丢帧':>6}{'剪贴板':>8}{'点击':>6}{'滚动':>6}{'提交':>6}{'解出':>6}")
+    for run in runs:
+        print(f"{str(run['run']):<17}{run['duration']:>9.1f}{run['events']:>8}{run['frames']:>6}{run['frames_dropped']:>6}"
+              f"{run['clipboard_reads']:>8}{run['clicks']:>6}{run['scrolls']:>6}{run['submits']:>6}{run['solved']:>6}")
+
+    print(f"\n[解析] {parser_result['fragments']} 个剪贴板片段，结果不同: {len(parser_result['mismatches'])}")
+    print(f"  耗时: 录制时 {parser_result['recorded_seconds'] * 1000:.1f} ms / 回放 {parser_result['replay_seconds'] * 1000:.1f} ms")
+    for item in parser_result['mismatches'][:max_rows]:
+        recorded = (item['recorded'] or {}).get('q_num')
+        replayed = (item['replayed'] or {}).get('q_num')
+        print(f"  - t={item['t']:.2f}s 题号 {item['q']}: 录制时 {recorded or '解析失败'} / 回放 {replayed or '解析失败'}")
+
+    print(f"\n[匹配] {match_result['matches']} 次模板匹配 (跳过 {match_result['skipped']} 次没有帧的匹配)，"
+          f"位置不同: {len(match_result['mismatches'])}")
+    print(f"  耗时: 录制时 {match_result['recorded_seconds'] * 1000:.1f} ms / 回放 {match_result['replay_seconds'] * 1000:.1f} ms")
+    for item in match_result['mismatches'][:max_rows]:
+        print(f"  - t={item['t']:.2f}s 题号 {item['q']} {item['template']}: 录制时 {item['recorded']} / 回放 {item['replayed']}")
+
+    recorded_total = sum(row['recorded'] for row in decisions)
+    replayed_total = sum(row['replayed'] or 0 for row in decisions)
+    unknown = sum(1 for row in decisions if row['replayed'] is None)
+    print(f"\n[解题] {len(decisions)} 道解出的题目，提交次数: 录制时 {recorded_total} / 当前逻辑估算 {replayed_total}"
+          + (f" (另有 {unknown} 道无法复现)" if unknown else ""))
+    changed = [row for row in decisions if row['replayed'] != row['recorded']]
+    if changed:
+        print(f"{'会话':<6}{'题号':<10}{'题型':<8}{'方式':<8}{'录制时':>8}{'估算':>8}")
+        for row in changed[:max_rows]:
+            replayed = "-" if row['replayed'] is None else row['replayed']
+            print(f"{row['session']:<6}{row['q']:<10}{row['q_type']:<8}{row['mode']:<8}{row['recorded']:>8}{replayed:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把录制的运行回放给当前的解析器、模板匹配器和解题逻辑")
+    parser.add_argument("paths", nargs="+", help="录制归档 (run_recording.jsonl.gz) 或通配符")
+    parser.add_argument("--bank", default=solver.QA_BANK_FILE, help="估算提交次数时使用的 JSON 题库")
+    parser.add_argument("--no-bank", action="store_true", help="不使用题库，只评估遍历顺序")
+    parser.add_argument("--tolerance", type=float, default=3.0, help="判定匹配位置相同的最大偏差 (像素)")
+    parser.add_argument("--rows", type=int, default=10, help="每类差异最多列出的条数")
+    parser.add_argument("--json", help="将回放结果以JSON格式写入此文件")
+    args = parser.parse_args()
+
+    paths = sorted(os.path.abspath(p) for pattern in args.paths for p in glob.glob(pattern))
+    if not paths:
+        print(f"❌ 没有找到任何录制归档: {args.paths}")
+        sys.exit(1)
+    bank_path = os.path.abspath(args.bank)
+    os.chdir(REPO_ROOT)
+    solver.logger.setLevel(logging.WARNING)
+    solver.load_templates()
+    # airtest 在加载模板时才被导入，其自带的DEBUG日志会刷屏并拖慢匹配
+    logging.getLogger("airtest").setLevel(logging.WARNING)
+    if not args.no_bank:
+        solver.QA_BANK_FILE = bank_path
+        solver.REPLAY_SOLUTION_JOURNALS = False
+        solver.load_qa_bank(backend='JSON')
+
+    runs, events_by_run = [], []
+    for path in paths:
+        events = load_events(path)
+        runs.append(summarize_run(path, events))
+        events_by_run.append(events)
+
+    parser_result = {"fragments": 0, "recorded_seconds": 0.0, "replay_seconds": 0.0, "mismatches": []}
+    match_result = {"matches": 0, "skipped": 0, "recorded_seconds": 0.0, "replay_seconds": 0.0, "mismatches": []}
+    decisions = []
+    for events in events_by_run:
+        for total, part in ((parser_result, replay_parser(events)),
+                            (match_result, replay_matches(events, FrameStore(events), args.tolerance))):
+            for key, value in part.items():
+                total[key] += value
+        decisions.extend(replay_decisions(events))
+
+    print_report(runs, parser_result, match_result, decisions, args.rows)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"runs": runs, "parser": parser_result, "matches": match_result, "decisions": decisions},
+                      f, ensure_ascii=False, indent=4)
+        print(f"\n结果已写入: {os.path.abspath(args.json)}")
+
+
+if __name__ == "__main__":
+    main()
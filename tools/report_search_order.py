@@ -0,0 +1,92 @@
+# tools/report_search_order.py
+"""
+多选题遍历顺序离线评估报告。
+
+对题库中的每道多选题变种做"留一法"评估：去掉这道题的所有变种，用题库中其余题目统计先验，
+分别计算按先验排序 (PRIOR) 和旧版字典序 (LEXICOGRAPHIC) 时，找到正确答案需要的提交次数。
+题库中的选项是排好序保存的，因此评估时会随机打乱选项顺序来模拟屏幕上的真实排列。
+
+用法 (在项目根目录下运行)：
+    python tools/report_search_order.py
+    python tools/report_search_order.py --bank master_qa_bank.json --shuffles 20
+"""
+import os
+import sys
+import json
+import random
+import argparse
+from collections import Counter
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+import auto_solver_refactored as solver
+
+
+def evaluate(bank, shuffles, seed):
+    """返回每个 (题目, 打乱方式) 的 (先验顺序提交次数, 字典序提交次数, 先验期望, 字典序期望) 列表。"""
+    rng = random.Random(seed)
+    results = []
+    for q_text, variants in bank.items():
+        for variant in variants:
+            if len(variant['answer']) < 2:
+                continue
+            # 留一法：从题库中去掉整道题 (包括它的其他变种，它们的答案相同) 后统计先验
+            rest = dict(bank)
+            del rest[q_text]
+            prior = solver.build_answer_prior(rest)
+
+            for _ in range(shuffles):
+                option_texts = list(variant['options'])
+                rng.shuffle(option_texts)
+                letters = "ABCD"[:len(option_texts)]
+                q_info = {"q_text": q_text, "options": dict(zip(letters, option_texts))}
+                answer = sorted(l for l, t in q_info['options'].items() if t in variant['answer'])
+
+                ranked = solver.rank_multi_choice_combinations(q_info, list(letters), prior)
+                lexicographic = sorted(ranked, key=lambda item: (len(item[0]), item[0]))
+                prior_rank = [combo for combo, _ in ranked].index(answer) + 1
+                lex_rank = [combo for combo, _ in lexicographic].index(answer) + 1
+                results.append((
+                    prior_rank, lex_rank,
+                    solver.expected_submits([p for _, p in ranked]),
+                    solver.expected_submits([p for _, p in lexicographic]),
+                ))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多选题遍历顺序离线评估报告")
+    parser.add_argument("--bank", default=solver.QA_BANK_FILE, help="题库文件")
+    parser.add_argument("--shuffles", type=int, default=10, help="每道题随机打乱选项顺序的次数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    with open(args.bank, 'r', encoding='utf-8') as f:
+        bank = json.load(f)
+    results = evaluate(bank, args.shuffles, args.seed)
+
+    print("=============================================")
+    print("==        多选题遍历顺序离线评估报告       ==")
+    print("=============================================")
+    if not results:
+        print("题库中没有多选题 (答案数>=2)，无法评估。")
+        return
+
+    count = len(results)
+    prior_mean = sum(r[0] for r in results) / count
+    lex_mean = sum(r[1] for r in results) / count
+    print(f"评估样本: {count} (多选题变种 × {args.shuffles} 种选项排列)")
+    print(f"\n{'顺序':<16}{'实际平均提交':>12}{'模型期望提交':>12}{'最坏提交':>10}")
+    print(f"{'PRIOR':<16}{prior_mean:>12.2f}{sum(r[2] for r in results) / count:>12.2f}{max(r[0] for r in results):>10}")
+    print(f"{'LEXICOGRAPHIC':<16}{lex_mean:>12.2f}{sum(r[3] for r in results) / count:>12.2f}{max(r[1] for r in results):>10}")
+    if prior_mean:
+        print(f"\n平均每道多选题节省提交: {lex_mean - prior_mean:.2f} 次 ({1 - prior_mean / lex_mean:.1%})")
+
+    print("\n提交次数分布 (次数: PRIOR / LEXICOGRAPHIC):")
+    prior_hist, lex_hist = Counter(r[0] for r in results), Counter(r[1] for r in results)
+    for k in sorted(set(prior_hist) | set(lex_hist)):
+        print(f"  {k:>2}: {prior_hist[k]:>5} / {lex_hist[k]:>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+# tools/report_spans.py
+"""
+运行性能报告：汇总主脚本写出的阶段计时文件 (logs/<时间戳>_spans.jsonl)。
+
+主脚本在 RECORD_TIMING_SPANS = True 时，会把剪贴板读取 (clipboard)、HTML解析 (parse)、截图 (capture)、
+模板匹配 (match)、点击验证 (click)、滚动 (scroll)、提交后等待 (post_submit_wait) 的每次调用写成一行JSON。
+本工具可以汇总一次或多次运行，输出：
+- 各阶段的次数、总耗时、自身耗时 (扣除嵌套在内的子阶段)、p50/p95/最大耗时
+- 每次运行的总览
+- 每道题各阶段的自身耗时 (最慢的若干道题)
+
+后台线程 (流水线模式下的截图匹配) 中的区间与主线程重叠，单独列为 "阶段 (后台)"。
+多窗口运行时，各会话线程 (session-S1 等) 都按主线程统计，每道题按 (会话, 题号) 区分。
+
+用法 (在项目根目录下运行)：
+    python tools/report_spans.py                      # 汇总 logs/ 下所有运行
+    python tools/report_spans.py logs/20250101_120000_spans.jsonl
+    python tools/report_spans.py "logs/2025*_spans.jsonl" --questions 20 --json report.json
+"""
+import os
+import sys
+import glob
+import json
+import math
+import argparse
+from collections import defaultdict
+
+MAIN_THREAD = "MainThread"
+SESSION_THREAD_PREFIX = "session-"  # 多窗口运行时各会话的主循环线程
+
+
+def load_spans(patterns):
+    """读取计时文件，跳过无法解析的行 (例如运行被强制结束时写了一半的最后一行)。"""
+    spans = []
+    for pattern in patterns:
+        paths = [os.path.join(pattern, "*_spans.jsonl")] if os.path.isdir(pattern) else [pattern]
+        for path in sorted(p for item in paths for p in glob.glob(item)):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        spans.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+    return spans
+
+
+def is_background(span):
+    thread = span.get('thread', MAIN_THREAD)
+    return thread != MAIN_THREAD and not thread.startswith(SESSION_THREAD_PREFIX)
+
+
+def phase_name(span):
+    return f"{span['span']} (后台)" if is_background(span) else span['span']
+
+
+def add_self_time(spans):
+    """为每个区间计算自身耗时 = 耗时 - 直接子区间的耗时之和。"""
+    child_time = defaultdict(float)
+    for span in spans:
+        if span.get('parent') is not None:
+            child_time[(span['run'], span['parent'])] += span['dur']
+    for span in spans:
+        span['self'] = max(0.0, span['dur'] - child_time[(span['run'], span['id'])])
+
+
+def percentile(sorted_values, q):
+    """最近秩法百分位数。"""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(q / 100.0 * len(sorted_values))
+    return sorted_values[min(len(sorted_values), max(rank, 1)) - 1]
+
+
+def summarize_phases(spans):
+    groups = defaultdict(list)
+    for span in spans:
+        groups[phase_name(span)].append(span)
+    rows = []
+    for name, items in groups.items():
+        durations = sorted(s['dur'] for s in items)
+        rows.append({
+            "phase": name,
+            "count": len(items),
+            "total": sum(durations),
+            "self_total": sum(s['self'] for s in items),
+            "p50": percentile(durations, 50),
+            "p95": percentile(durations, 95),
+            "max": durations[-1],
+        })
+    return sorted(rows, key=lambda row: row['self_total'], reverse=True)
+
+
+def summarize_runs(spans):
+    runs = defaultdict(list)
+    for span in spans:
+        runs[span['run']].append(span)
+    rows = []
+    for run, items in sorted(runs.items()):
+        main = [s for s in items if not is_background(s)]
+        questions = {(s.get('session'), s['q']) for s in items if s.get('q') is not None}
+        end = max((s['start'] + s['dur'] for s in items), default=0.0)
+        rows.append({
+            "run": run,
+            "questions": len(questions),
+            "spans": len(items),
+            "duration": end,
+            "timed": sum(s['self'] for s in main),
+        })
+    return rows
+
+
+def summarize_questions(spans):
+    questions = defaultdict(lambda: defaultdict(float))
+    for span in spans:
+        if span.get('q') is None or is_background(span):
+            continue
+        questions[(span['run'], span.get('session'), span['q'])][span['span']] += span['self']
+    rows = []
+    for (run, session, q), phases in questions.items():
+        rows.append({"run": run, "session": session, "q": q, "total": sum(phases.values()), "phases": dict(phases)})
+    return sorted(rows, key=lambda row: row['total'], reverse=True)
+
+
+def print_report(phases, runs, questions, max_questions):
+    print("=============================================")
+    print("==            运行性能报告 (阶段计时)       ==")
+    print("=============================================")
+    print(f"{'运行':<17}{'题目数':>7}{'区间数':>8}{'时长(s)':>10}{'已计时(s)':>11}")
+    for run in runs:
+        print(f"{run['run']:<17}{run['questions']:>7}{run['spans']:>8}{run['duration']:>10.2f}{run['timed']:>11.2f}")
+
+    print(f"\n{'阶段':<26}{'次数':>7}{'总计(s)':>10}{'自身(s)':>10}{'p50(ms)':>10}{'p95(ms)':>10}{'最大(ms)':>10}")
+    for row in phases:
+        print(f"{row['phase']:<26}{row['count']:>7}{row['total']:>10.2f}{row['self_total']:>10.2f}"
+              f"{row['p50'] * 1000:>10.1f}{row['p95'] * 1000:>10.1f}{row['max'] * 1000:>10.1f}")
+
+    if not questions or max_questions <= 0:
+        return
+    names = [row['phase'] for row in phases if "(后台)" not in row['phase']]
+    print(f"\n最慢的 {min(max_questions, len(questions))} 道题 (各阶段自身耗时，秒):")
+    print(f"{'运行':<17}{'会话':<6}{'题号':<10}{'合计':>8}" + "".join(f"{name:>18}" for name in names))
+    for row in questions[:max_questions]:
+        print(f"{row['run']:<17}{str(row['session'] or '-'):<6}{str(row['q']):<10}{row['total']:>8.2f}"
+              + "".join(f"{row['phases'].get(name, 0.0):>18.3f}" for name in names))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="汇总阶段计时文件，生成运行性能报告")
+    parser.add_argument("paths", nargs="*", default=["logs"], help="计时文件、目录或通配符 (默认 logs/)")
+    parser.add_argument("--questions", type=int, default=10, help="列出最慢的题目数量 (0 表示不列出)")
+    parser.add_argument("--json", help="将汇总结果以JSON格式写入此文件")
+    args = parser.parse_args()
+
+    spans = load_spans(args.paths)
+    if not spans:
+        print(f"❌ 没有找到任何计时区间: {args.paths}")
+        sys.exit(1)
+    add_self_time(spans)
+    phases, runs, questions = summarize_phases(spans), summarize_runs(spans), summarize_questions(spans)
+    print_report(phases, runs, questions, args.questions)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"runs": runs, "phases": phases, "questions": questions}, f, ensure_ascii=False, indent=4)
+        print(f"\n结果已写入: {os.path.abspath(args.json)}")
+
+
+if __name__ == "__main__":
+    main()
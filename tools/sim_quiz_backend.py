@@ -0,0 +1,431 @@
+# tools/sim_quiz_backend.py
+"""
+本地模拟答题后端 (无需微信窗口，无需真实桌面)。
+
+它模拟了主脚本依赖的全部"桌面能力"：
+1. 一个答题服务 (SimQuizServer)：按题目列表出题、记录选中状态、判分并在答对后延迟切换到下一题。
+2. 一个假的 pyautogui：截图时使用 templates/ 中的图片渲染出选项和提交按钮，点击/滚动/热键会作用到模拟页面上。
+   可以同时模拟多个并排的答题窗口，热键只发给最后被点击的窗口，用于测试多窗口会话。
+3. 一个假的 win32clipboard：Ctrl+A/Ctrl+C 后返回与真实小程序相同结构的 HTML
+   (ts_title_count / ts_title_text / options-wrapper)。
+4. 一个虚拟时钟 (SimClock)：time.sleep 只推进虚拟时间，不真正等待，使基准测试结果可复现。
+
+用法 (在项目根目录下)：
+    from tools.sim_quiz_backend import SimQuizServer, build_questions_from_bank, load_solver_with_fake_desktop
+"""
+import os
+import sys
+import time
+import types
+import random
+import threading
+import importlib
+from collections import Counter
+
+import numpy as np
+import cv2
+
+# 项目根目录，保证无论从哪里运行都能找到主脚本和模板
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# --- 模拟页面布局配置 (页面坐标，单位：像素) ---
+PAGE_WIDTH = 828
+VIEWPORT_HEIGHT = 2062
+TITLE_BAND = (80, 200)          # 题目区域的色带 (随题目变化，保证不同题目的截图不同)
+OPTION_FIRST_ROW_Y = 600        # 第一个选项行的顶部
+OPTION_ROW_PITCH = 150          # 选项行间距
+OPTION_ROW_HEIGHT = 110         # 选项行高度
+OPTION_ICON_X = 60              # 选项图标的左侧x坐标
+SUBMIT_Y = 1300                 # 提交按钮的顶部
+LONG_PAGE_EXTRA = 900           # "长题目"会把选项和提交按钮整体下移，需要滚动才能看到提交按钮
+WHEEL_PIXELS_PER_CLICK = 1.2    # pyautogui.scroll(-500) 会滚动 600 像素
+
+
+class SimClock:
+    """虚拟时钟：真实耗时 + 所有 sleep 请求的累计时长。"""
+
+    def __init__(self):
+        self._t0 = time.perf_counter()
+        self.slept = 0.0
+
+    def now(self):
+        return (time.perf_counter() - self._t0) + self.slept
+
+    def sleep(self, seconds):
+        if seconds and seconds > 0:
+            self.slept += seconds
+
+
+class SimTimeModule(types.ModuleType):
+    """替换主脚本中 `time` 模块的对象：sleep/time/perf_counter 走虚拟时钟，其余函数透传给真实 time 模块。"""
+
+    def __init__(self, clock):
+        super().__init__("time")
+        self._clock = clock
+        self._epoch0 = time.time()
+
+    def sleep(self, seconds):
+        self._clock.sleep(seconds)
+
+    def time(self):
+        return self._epoch0 + self._clock.now()
+
+    def perf_counter(self):
+        return self._clock.now()
+
+    def monotonic(self):
+        return self._clock.now()
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+def load_template_images(templates_dir=None):
+    """读取 templates/ 下的选项图标 (每个选项取第一张) 和提交按钮图片。"""
+    templates_dir = templates_dir or os.path.join(REPO_ROOT, "templates")
+    icons = {}
+    for letter in "ABCD":
+        icons[letter] = cv2.imread(os.path.join(templates_dir, f"option_{letter}_1.png"))
+    submit = cv2.imread(os.path.join(templates_dir, "submit_button.png"))
+    return icons, submit
+
+
+def build_questions_from_bank(bank, count, unknown_ratio=0.25, long_page_ratio=0.1, seed=0):
+    """
+    从题库中生成 count 道合成题目。
+
+    - 选项顺序被随机打乱，模拟真实题目的选项变种。
+    - 按 unknown_ratio 的比例把题目文本改写为题库中不存在的新题，迫使脚本进入遍历模式。
+    - 按 long_page_ratio 的比例生成需要滚动才能看到提交按钮的长页面。
+
+    Returns:
+        list: 题目字典列表，每项包含 q_num/q_type/q_text/options(按字母)/answer(字母集合)/long_page。
+    """
+    rng = random.Random(seed)
+    # 只记录了排除组合、还没有答案的变种无法生成题目
+    entries = [(q_text, variant) for q_text, variants in bank.items() for variant in variants if variant['answer']]
+    rng.shuffle(entries)
+    questions = []
+    for i in range(count):
+        q_text, variant = entries[i % len(entries)]
+        option_texts = list(variant['options'])
+        rng.shuffle(option_texts)
+        letters = "ABCD"[:len(option_texts)]
+        options = dict(zip(letters, option_texts))
+        answer = {letter for letter, text in options.items() if text in variant['answer']}
+        if rng.random() < unknown_ratio:
+            q_text = f"{q_text}（模拟新题{i + 1}）"
+        questions.append({
+            "q_num": f"第{i + 1}题",
+            "q_type": "单选" if len(answer) == 1 else "多选",
+            "q_text": q_text,
+            "options": options,
+            "answer": answer,
+            "long_page": rng.random() < long_page_ratio,
+        })
+    return questions
+
+
+def make_stop_question(index):
+    """生成终止哨兵题目，配合主脚本的 STOP_AT_QUESTION_NUM 让 main_loop 正常退出。"""
+    return {
+        "q_num": f"第{index}题",
+        "q_type": "单选",
+        "q_text": "模拟答题结束",
+        "options": {"A": "结束"},
+        "answer": {"A"},
+        "long_page": False,
+    }
+
+
+class SimQuizServer:
+    """
+    模拟答题服务：维护当前题目、选中状态和滚动位置，渲染截图并生成剪贴板HTML。
+
+    Args:
+        questions (list): build_questions_from_bank 生成的题目列表。
+        clock (SimClock): 虚拟时钟。
+        advance_latency (float): 答对提交后，页面切换到下一题需要的(虚拟)秒数。
+        ui_latency (float): 点击选项、滚动后，界面 (截图和剪贴板HTML) 作出反应需要的(虚拟)秒数。
+    """
+
+    def __init__(self, questions, clock, advance_latency=0.3, region=(0, 0, PAGE_WIDTH, VIEWPORT_HEIGHT), ui_latency=0.0):
+        self.questions = questions
+        self.clock = clock
+        self.advance_latency = advance_latency
+        self.ui_latency = ui_latency
+        self._pending = []  # 尚未反映到界面上的操作: [(生效时间, 函数)]
+        self.region = region
+        self.icons, self.submit_img = load_template_images()
+        self.index = 0
+        self.selected = set()
+        self.scroll_offset = 0
+        self._advance_at = None
+        self._frame_cache_key = None
+        self._frame_cache = None
+        self.copy_threads = Counter()  # 向本窗口发送 Ctrl+C 的线程名 -> 次数，用于检查多窗口运行时焦点是否正确
+        self.stats = {
+            "screenshots": 0,
+            "clipboard_copies": 0,
+            "clicks": 0,
+            "scrolls": 0,
+            "submits": 0,
+            "correct_submits": 0,
+        }
+
+    # ---------- 页面状态 ----------
+
+    def _tick(self):
+        """处理到期的界面反应和题目切换。"""
+        now = self.clock.now()
+        while self._pending and self._pending[0][0] <= now:
+            self._pending.pop(0)[1]()
+        if self._advance_at is not None and now >= self._advance_at:
+            self._advance_at = None
+            if self.index < len(self.questions) - 1:
+                self.index += 1
+            self.selected = set()
+            self.scroll_offset = 0
+            self._pending = []
+
+    def _react(self, action):
+        """在 ui_latency 秒后把操作反映到界面上。"""
+        if self.ui_latency <= 0:
+            action()
+        else:
+            self._pending.append((self.clock.now() + self.ui_latency, action))
+
+    @property
+    def current(self):
+        self._tick()
+        return self.questions[self.index]
+
+    def _layout(self, question):
+        """返回当前题目的页面布局：选项行矩形、提交按钮矩形、页面总高度。"""
+        extra = LONG_PAGE_EXTRA if question['long_page'] else 0
+        rows = {}
+        for i, letter in enumerate(sorted(question['options'])):
+            top = OPTION_FIRST_ROW_Y + extra + i * OPTION_ROW_PITCH
+            rows[letter] = (40, top, PAGE_WIDTH - 40, top + OPTION_ROW_HEIGHT)
+        sh, sw = self.submit_img.shape[:2]
+        sx = (PAGE_WIDTH - sw) // 2
+        sy = SUBMIT_Y + extra
+        submit = (sx, sy, sx + sw, sy + sh)
+        page_height = max(self.region[3], submit[3] + 200)
+        return rows, submit, page_height
+
+    # ---------- 渲染 ----------
+
+    def render_frame(self):
+        """渲染当前视口的BGR图像 (与 SCREEN_REGION 同尺寸)。"""
+        question = self.current
+        key = (self.index, frozenset(self.selected), self.scroll_offset)
+        if key == self._frame_cache_key:
+            return self._frame_cache.copy()
+
+        rows, submit, page_height = self._layout(question)
+        page = np.zeros((page_height, PAGE_WIDTH, 3), dtype=np.uint8)
+        # 题目色带：颜色由题号决定，保证不同题目的截图不同
+        shade = 60 + (self.index * 37) % 150
+        page[TITLE_BAND[0]:TITLE_BAND[1], 40:PAGE_WIDTH - 40] = (shade, shade // 2, 255 - shade)
+        for letter, (x1, y1, x2, y2) in rows.items():
+            if letter in self.selected:
+                page[y1:y2, x1:x2] = (90, 60, 30)
+            icon = self.icons[letter]
+            ih, iw = icon.shape[:2]
+            iy = y1 + (OPTION_ROW_HEIGHT - ih) // 2
+            page[iy:iy + ih, OPTION_ICON_X:OPTION_ICON_X + iw] = icon
+        x1, y1, x2, y2 = submit
+        page[y1:y2, x1:x2] = self.submit_img
+
+        top = self.scroll_offset
+        frame = page[top:top + self.region[3], :self.region[2]]
+        if frame.shape[0] < self.region[3]:
+            pad = np.zeros((self.region[3] - frame.shape[0], frame.shape[1], 3), dtype=np.uint8)
+            frame = np.vstack([frame, pad])
+        self._frame_cache_key, self._frame_cache = key, frame
+        return frame.copy()
+
+    def render_html(self):
+        """生成与真实小程序结构一致的HTML片段。"""
+        question = self.current
+        items = []
+        for letter in sorted(question['options']):
+            text = question['options'][letter]
+            css = "option-item active" if letter in self.selected else "option-item"
+            if text.startswith("http"):
+                body = f'<span>{letter}.</span><img src="{text}">'
+            else:
+                body = f'<span>{letter}.</span>{text}'
+            items.append(f'<li class="{css}">{body}</li>')
+        return (
+            '<div class="ts_title">'
+            f'<div class="ts_title_count"><i>{question["q_num"]}</i><em>{question["q_type"]}</em></div>'
+            f'<div class="ts_title_text">{question["q_text"]}</div>'
+            '</div>'
+            f'<div class="options-wrapper"><ul>{"".join(items)}</ul></div>'
+        )
+
+    # ---------- 交互 ----------
+
+    def click(self, region_x, region_y):
+        """处理视口内相对坐标的一次点击。"""
+        self.stats["clicks"] += 1
+        question = self.current
+        rows, submit, _ = self._layout(question)
+        page_y = region_y + self.scroll_offset
+        for letter, (x1, y1, x2, y2) in rows.items():
+            if x1 <= region_x <= x2 and y1 <= page_y <= y2:
+                if question['q_type'] == "单选":
+                    self._react(lambda: setattr(self, "selected", {letter}))
+                else:
+                    self._react(lambda: setattr(self, "selected", self.selected ^ {letter}))
+                return
+        x1, y1, x2, y2 = submit
+        if x1 <= region_x <= x2 and y1 <= page_y <= y2:
+            self._submit(question)
+
+    def _submit(self, question):
+        self.stats["submits"] += 1
+        if self._advance_at is None and self.selected == question['answer']:
+            self.stats["correct_submits"] += 1
+            self._advance_at = self.clock.now() + self.advance_latency
+
+    def scroll(self, pixels):
+        """页面向下滚动 pixels 像素 (负数表示向上)。"""
+        self.stats["scrolls"] += 1
+        _, _, page_height = self._layout(self.current)
+        max_offset = max(0, page_height - self.region[3])
+        self._react(lambda: setattr(self, "scroll_offset", int(min(max_offset, max(0, self.scroll_offset + pixels)))))
+
+
+class FakeClipboard(types.ModuleType):
+    """模拟 win32clipboard 模块，只支持主脚本用到的 'HTML Format'。"""
+
+    HTML_FORMAT_ID = 49381
+
+    def __init__(self):
+        super().__init__("win32clipboard")
+        self.html = None
+
+    def set_html(self, fragment):
+        self.html = fragment
+
+    def OpenClipboard(self):
+        pass
+
+    def CloseClipboard(self):
+        pass
+
+    def RegisterClipboardFormat(self, name):
+        return self.HTML_FORMAT_ID
+
+    def IsClipboardFormatAvailable(self, fmt):
+        return fmt == self.HTML_FORMAT_ID and self.html is not None
+
+    def GetClipboardData(self, fmt):
+        # 与Windows的 CF_HTML 一致：头部记录片段起止偏移
+        prefix = "<html><body><!--StartFragment-->"
+        suffix = "<!--EndFragment--></body></html>"
+        header_tpl = "Version:0.9\r\nStartHTML:{:08d}\r\nEndHTML:{:08d}\r\nStartFragment:{:08d}\r\nEndFragment:{:08d}\r\n"
+        header_len = len(header_tpl.format(0, 0, 0, 0))
+        body = (prefix + self.html + suffix).encode('utf-8')
+        start_fragment = header_len + len(prefix.encode('utf-8'))
+        end_fragment = header_len + len(body) - len(suffix.encode('utf-8'))
+        header = header_tpl.format(header_len, header_len + len(body), start_fragment, end_fragment)
+        return header.encode('ascii') + body
+
+
+class FakePyAutoGUI(types.ModuleType):
+    """
+    模拟 pyautogui 模块：截图、点击、滚动和热键都转发给 SimQuizServer。
+    可以同时模拟多个并排的答题窗口 (每个 SimQuizServer 占据自己的 region)：
+    截图按区域、点击和滚轮按鼠标位置转发给对应窗口，热键发给最后一次被点击 (获得焦点) 的窗口。
+    """
+
+    class FailSafeException(Exception):
+        pass
+
+    def __init__(self, servers, clipboard):
+        super().__init__("pyautogui")
+        self.servers = list(servers) if isinstance(servers, (list, tuple)) else [servers]
+        self.server = self.servers[0]  # 获得键盘焦点的窗口
+        self.clipboard = clipboard
+        self._pos = (0, 0)
+        self._drag_start = None
+
+    def _server_at(self, x, y):
+        for server in self.servers:
+            rx, ry, rw, rh = server.region
+            if rx <= x < rx + rw and ry <= y < ry + rh:
+                return server
+        return None
+
+    def screenshot(self, region=None):
+        from PIL import Image
+        server = next((s for s in self.servers if region is not None and tuple(s.region) == tuple(region)), self.server)
+        server.stats["screenshots"] += 1
+        frame = server.render_frame()
+        return Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+
+    def click(self, x=None, y=None, **kwargs):
+        if x is not None and y is not None:
+            self._pos = (x, y)
+        server = self._server_at(*self._pos)
+        if server is not None:
+            self.server = server
+            server.click(self._pos[0] - server.region[0], self._pos[1] - server.region[1])
+
+    def moveTo(self, x, y, duration=0.0, **kwargs):
+        self.server.clock.sleep(duration)
+        self._pos = (x, y)
+
+    def mouseDown(self, *args, **kwargs):
+        self._drag_start = self._pos
+
+    def mouseUp(self, *args, **kwargs):
+        server = self._server_at(*self._drag_start) if self._drag_start is not None else None
+        if server is not None:
+            server.scroll(self._drag_start[1] - self._pos[1])
+        self._drag_start = None
+
+    def scroll(self, clicks, *args, **kwargs):
+        server = self._server_at(*self._pos)
+        if server is not None:
+            server.scroll(-clicks * WHEEL_PIXELS_PER_CLICK)
+
+    def hotkey(self, *keys, **kwargs):
+        if keys == ('ctrl', 'c'):
+            self.server.stats["clipboard_copies"] += 1
+            self.server.copy_threads[threading.current_thread().name] += 1
+            self.clipboard.set_html(self.server.render_html())
+
+    def position(self):
+        return self._pos
+
+
+def load_solver_with_fake_desktop(server):
+    """
+    安装假的 pyautogui/win32clipboard 后导入主脚本，并把主脚本的 time 模块替换为虚拟时钟。
+    主脚本中的 pyautogui/win32clipboard 都是延迟导入的，只要在第一次使用前安装假模块即可。
+    调用方需要在修改运行目录等配置后自行调用 solver.setup_runtime()。
+
+    Args:
+        server (SimQuizServer or list): 模拟答题窗口。传入列表时模拟多个窗口 (共用同一个虚拟时钟)，
+            SCREEN_REGION 设为第一个窗口的区域。
+
+    Returns:
+        module: 已接入模拟后端的 auto_solver_refactored 模块。
+    """
+    clipboard = FakeClipboard()
+    fake_pyautogui = FakePyAutoGUI(server, clipboard)
+    server = fake_pyautogui.servers[0]
+    sys.modules['pyautogui'] = fake_pyautogui
+    sys.modules['win32clipboard'] = clipboard
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    solver = importlib.import_module("auto_solver_refactored")
+    solver.IS_WINDOWS = True
+    solver.time = SimTimeModule(server.clock)
+    solver.SCREEN_REGION = server.region
+    return solver